@@ -0,0 +1,120 @@
+"""
+Benchmark Helpers
+Timing summaries, memory usage and result files shared by the benchmark scripts
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+from datetime import datetime
+
+
+def percentile(values, pct):
+    # Linear interpolation between the closest ranks, like numpy's default
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * pct / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def summarize_times(times, audio_seconds=None):
+    """
+    Summary of a list of timings (seconds)
+
+    Args:
+        times: How long each run took
+        audio_seconds: Length of the audio each run processed, for the real-time factor
+
+    Returns:
+        Dictionary with count, mean, p50, p95, min, max (and rtf if audio_seconds is given)
+    """
+    summary = {
+        'count': len(times),
+        'mean': round(sum(times) / len(times), 4),
+        'p50': round(percentile(times, 50), 4),
+        'p95': round(percentile(times, 95), 4),
+        'min': round(min(times), 4),
+        'max': round(max(times), 4),
+    }
+    if audio_seconds:
+        # Seconds of work per second of audio, below 1.0 is faster than real time
+        summary['rtf'] = round(summary['p50'] / audio_seconds, 4)
+    return summary
+
+
+def peak_rss_mb():
+    # Highest memory use of this process so far (None where the resource module is missing)
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return round(peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+def timed(fn, *args, **kwargs):
+    # Run fn and return (result, seconds)
+    start_time = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start_time
+
+
+def environment_info():
+    # What the numbers were measured on, so comparisons across machines make sense
+    info = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+    for package in ['torch', 'whisper', 'numpy']:
+        try:
+            module = __import__(package)
+            info[package] = getattr(module, '__version__', 'unknown')
+        except ImportError:
+            info[package] = None
+    return info
+
+
+def save_results(results, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved results to {path}")
+
+
+def compare_results(baseline, current, metric='p50', threshold=0.10):
+    """
+    Compare two result files stage by stage
+
+    Args:
+        baseline: Results dict from an earlier run
+        current: Results dict from this run
+        metric: Which timing to compare
+        threshold: Slowdown (0.10 = 10%) that counts as a regression
+
+    Returns:
+        List of (stage, old, new, change, regressed) tuples, for stages in both runs
+    """
+    rows = []
+    for stage, summary in current.get('stages', {}).items():
+        old = baseline.get('stages', {}).get(stage, {}).get(metric)
+        new = summary.get(metric)
+        if old is None or new is None:
+            continue
+        change = (new - old) / old if old else 0.0
+        rows.append((stage, old, new, change, change > threshold))
+    return rows
+
+
+def print_comparison(rows, metric='p50'):
+    print(f"\n{'stage':<40}{'old ' + metric:>12}{'new ' + metric:>12}{'change':>10}")
+    for stage, old, new, change, regressed in rows:
+        flag = "  SLOWER" if regressed else ""
+        print(f"{stage:<40}{old:>12.4f}{new:>12.4f}{change:>+10.1%}{flag}")
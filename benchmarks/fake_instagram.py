@@ -0,0 +1,129 @@
+"""
+Fake Instagram Server
+A local HTTP stand-in that serves one media file at every /reel/<id>/ URL
+"""
+
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+CONTENT_TYPES = {
+    '.wav': 'audio/wav',
+    '.mp3': 'audio/mpeg',
+    '.m4a': 'audio/mp4',
+    '.mp4': 'video/mp4',
+    '.webm': 'video/webm',
+}
+REEL_PATH = re.compile(r'^/(?:reel|reels)/([A-Za-z0-9_-]+)/?$')
+RANGE_HEADER = re.compile(r'bytes=(\d*)-(\d*)')
+
+
+class FakeInstagramServer:
+    """
+    Serves media at Instagram-shaped paths on 127.0.0.1
+
+    yt-dlp sees a direct media link (through its generic extractor), so the
+    real download and decode code runs against it without the network.
+    """
+
+    def __init__(self, media_path, port=0, delay_ms=0):
+        """
+        Args:
+            media_path: File served for every reel
+            port: Port to listen on (0 = pick a free one)
+            delay_ms: Extra wait before each response, to act like a far away CDN
+        """
+        self.media = Path(media_path).read_bytes()
+        self.content_type = CONTENT_TYPES.get(Path(media_path).suffix.lower(), 'application/octet-stream')
+        self.delay = delay_ms / 1000
+        self.stats = {'requests': 0, 'bytes_sent': 0}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def reel_url(self, reel_id):
+        return f"{self.base_url}/reel/{reel_id}/"
+
+    def reel_pattern(self):
+        # INSTAGRAM_REEL_PATTERN that accepts this server's URLs
+        return rf'https?://127\.0\.0\.1:{self.port}/(?:reel|reels)/([A-Za-z0-9_-]+)'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-instagram", daemon=True)
+        self._thread.start()
+        print(f"Fake Instagram serving {len(self.media) / 1024:.0f} KB of {self.content_type} at {self.base_url}")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _count(self, sent):
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats['bytes_sent'] += sent
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_HEAD(self):
+                self._respond(send_body=False)
+
+            def do_GET(self):
+                self._respond(send_body=True)
+
+            def _respond(self, send_body):
+                if server.delay:
+                    time.sleep(server.delay)
+                if not REEL_PATH.match(self.path.split('?')[0]):
+                    self.send_error(404)
+                    server._count(0)
+                    return
+
+                body = server.media
+                status = 200
+                # yt-dlp sometimes asks for byte ranges
+                match = RANGE_HEADER.match(self.headers.get('Range', ''))
+                if match and (match.group(1) or match.group(2)):
+                    start = int(match.group(1) or 0)
+                    end = int(match.group(2)) if match.group(2) else len(body) - 1
+                    end = min(end, len(body) - 1)
+                    if start >= len(body):
+                        self.send_error(416)
+                        server._count(0)
+                        return
+                    body = body[start:end + 1]
+                    status = 206
+
+                self.send_response(status)
+                self.send_header('Content-Type', server.content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('Accept-Ranges', 'bytes')
+                if status == 206:
+                    self.send_header('Content-Range', f"bytes {start}-{end}/{len(server.media)}")
+                self.end_headers()
+                sent = 0
+                if send_body:
+                    try:
+                        self.wfile.write(body)
+                        sent = len(body)
+                    except (BrokenPipeError, ConnectionResetError):
+                        pass
+                server._count(sent)
+
+            def log_message(self, format, *args):
+                pass  # Too noisy under load
+
+        return Handler
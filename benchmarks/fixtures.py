@@ -0,0 +1,82 @@
+"""
+Synthetic Audio Fixtures
+Speech-like test audio generated on the fly, so benchmarks need no downloads
+"""
+
+import wave
+from pathlib import Path
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+def synthetic_speech(seconds, sample_rate=SAMPLE_RATE, seed=0):
+    """
+    Make audio that looks like speech to VAD and to Whisper's encoder
+
+    Voiced "syllables" (a pitch that drifts, with harmonics and a short noise
+    burst for the consonant) grouped into words, with short gaps between
+    words and longer ones between sentences, over faint background noise.
+    It's not real words, so the transcript means nothing, but the timing does.
+
+    Returns:
+        float32 mono samples in [-1, 1]
+    """
+    rng = np.random.default_rng(seed)
+    total = int(seconds * sample_rate)
+    audio = np.zeros(total, dtype=np.float32)
+
+    position = 0
+    words = 0
+    while position < total:
+        for _ in range(rng.integers(1, 4)):
+            length = int(rng.uniform(0.12, 0.3) * sample_rate)
+            t = np.arange(length) / sample_rate
+            pitch = rng.uniform(100, 220) * (1 + 0.08 * np.sin(2 * np.pi * rng.uniform(2, 5) * t))
+            phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+            syllable = sum(np.sin(k * phase) / k for k in range(1, 11))
+            # Consonant: a little noise at the start
+            burst = min(length, int(0.02 * sample_rate))
+            syllable[:burst] += rng.normal(0, 0.5, burst)
+            syllable *= np.hanning(length)
+
+            end = min(total, position + length)
+            audio[position:end] += syllable[:end - position].astype(np.float32)
+            position = end
+        words += 1
+        # Longer pause every few words, like the end of a sentence
+        pause = rng.uniform(0.6, 1.0) if words % 8 == 0 else rng.uniform(0.05, 0.25)
+        position += int(pause * sample_rate)
+
+    peak = np.abs(audio).max()
+    if peak > 0:
+        audio *= 0.5 / peak
+    audio += rng.normal(0, 0.003, total).astype(np.float32)
+    return np.clip(audio, -1, 1)
+
+
+def write_wav(path, samples, sample_rate=SAMPLE_RATE):
+    # 16-bit mono WAV, readable by FFmpeg and every audio tool
+    with wave.open(str(path), 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes((samples * 32767).astype(np.int16).tobytes())
+
+
+def make_fixtures(folder, lengths, sample_rate=SAMPLE_RATE):
+    """
+    Write one WAV per length into folder (reusing files that are already there)
+
+    Returns:
+        List of (name, path, seconds)
+    """
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    fixtures = []
+    for seconds in lengths:
+        path = folder / f"speech_{seconds}s.wav"
+        if not path.exists():
+            write_wav(path, synthetic_speech(seconds, sample_rate, seed=int(seconds)), sample_rate)
+        fixtures.append((path.stem, path, seconds))
+    return fixtures
@@ -0,0 +1,228 @@
+"""
+Load Test
+Drives the API at a set concurrency against a local fake Instagram, no network needed
+
+Usage:
+    # Full pipeline with the real model
+    python benchmarks/load_test.py -n 40 -c 4 -m base
+
+    # Download + decode path only, the model is replaced by a stub engine
+    python benchmarks/load_test.py -n 200 -c 16 --stub
+
+    # Against an API you started yourself (it needs INSTAGRAM_REEL_PATTERN set, see the output)
+    python benchmarks/load_test.py --api-url http://127.0.0.1:8000 --port 9000
+
+By default the harness starts the API itself (uvicorn, in a subprocess) with
+INSTAGRAM_REEL_PATTERN pointed at the fake server and a throwaway transcript
+cache. Every request uses a new reel ID unless --same-reel is given.
+"""
+
+import os
+import sys
+import time
+import tempfile
+import argparse
+import subprocess
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import requests
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.bench_utils import percentile, peak_rss_mb, environment_info, save_results
+from benchmarks.fake_instagram import FakeInstagramServer
+from benchmarks.fixtures import make_fixtures
+
+PROJECT_ROOT = Path(__file__).parent.parent
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def model_to_request(args):
+    return f"stub:{args.model}" if args.stub else args.model
+
+
+def start_api(port, server, args, log_path):
+    # uvicorn in a subprocess, so its config is read with our environment
+    env = {
+        **os.environ,
+        'INSTAGRAM_REEL_PATTERN': server.reel_pattern(),
+        'TRANSCRIPT_CACHE_PATH': os.path.join(tempfile.mkdtemp(prefix="insta-loadtest-"), "transcripts.db"),
+        'JOB_WORKERS': str(args.job_workers),
+        'AUDIO_PIPELINE': args.pipeline,
+        # The warmup loads the model we're about to request, so it isn't counted in the latencies
+        'WHISPER_MODEL': model_to_request(args),
+        'PRELOAD_MODELS': "",
+        # Every request comes from this one client, so only the queue bound applies
+        'JOB_MAX_PER_CLIENT': "0",
+        'JOB_QUEUE_MAX': str(args.queue_max),
+    }
+    if args.stub:
+        env['STUB_ENGINE_ENABLED'] = "true"
+        env['STUB_ENGINE_RTF'] = str(args.stub_rtf)
+
+    log = open(log_path, 'w', encoding='utf-8')
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.api:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=str(PROJECT_ROOT), env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+    api_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + args.startup_timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"API exited during startup, see {log_path}")
+        try:
+            # /ready waits for the model warmup, not just for the server
+            response = requests.get(f"{api_url}/ready", timeout=1)
+            if response.status_code == 200:
+                return process, api_url
+            if response.json().get('detail', {}).get('status') == "failed":
+                process.terminate()
+                raise RuntimeError(f"API warmup failed: {response.json()['detail'].get('error')}")
+        except (requests.exceptions.RequestException, ValueError):
+            pass
+        time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError(f"API didn't start within {args.startup_timeout} seconds, see {log_path}")
+
+
+def send_request(api_url, reel_url, model, timeout):
+    """
+    One POST /api/transcribe
+
+    Returns:
+        Tuple of (latency, ok, error)
+    """
+    start_time = time.perf_counter()
+    try:
+        response = requests.post(f"{api_url}/api/transcribe", json={'reel_url': reel_url, 'model': model},
+                                 timeout=timeout)
+        latency = time.perf_counter() - start_time
+        if response.status_code != 200:
+            return latency, False, f"HTTP {response.status_code}"
+        body = response.json()
+        if body.get('status') != "success":
+            return latency, False, (body.get('message') or "Unknown error")[:120]
+        return latency, True, ""
+    except requests.exceptions.RequestException as e:
+        return time.perf_counter() - start_time, False, type(e).__name__
+
+
+def run_load(api_url, server, args):
+    run_id = f"LT{int(time.time()) % 100000}"
+    urls = [
+        server.reel_url(f"{run_id}same" if args.same_reel else f"{run_id}n{i:06d}")
+        for i in range(args.requests)
+    ]
+    model = model_to_request(args)
+
+    print(f"Sending {len(urls)} requests, {args.concurrency} at a time (model {model})...")
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda url: send_request(api_url, url, model, args.timeout), urls))
+    wall_time = time.perf_counter() - start_time
+
+    latencies = [latency for latency, _, _ in results]
+    ok_latencies = [latency for latency, ok, _ in results if ok]
+    errors = Counter(error for _, ok, error in results if not ok)
+    return {
+        'requests': len(results),
+        'succeeded': len(ok_latencies),
+        'failed': len(results) - len(ok_latencies),
+        'error_rate': round((len(results) - len(ok_latencies)) / len(results), 4),
+        'wall_time': round(wall_time, 3),
+        'throughput_rps': round(len(results) / wall_time, 3),
+        'latency': {
+            name: round(percentile(latencies, pct), 4)
+            for name, pct in [('p50', 50), ('p90', 90), ('p95', 95), ('p99', 99), ('max', 100)]
+        },
+        'success_latency_p50': round(percentile(ok_latencies, 50), 4) if ok_latencies else None,
+        'errors': dict(errors.most_common()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the API against a local fake Instagram')
+    parser.add_argument('-n', '--requests', type=int, default=40, help='Total requests (default: 40)')
+    parser.add_argument('-c', '--concurrency', type=int, default=4, help='Requests in flight (default: 4)')
+    parser.add_argument('-m', '--model', default='base', help='Model to request (default: base)')
+    parser.add_argument('--stub', action='store_true',
+                        help='Replace the model with a stub engine to measure the I/O path alone')
+    parser.add_argument('--stub-rtf', type=float, default=0.05,
+                        help='Stub engine seconds of work per second of audio (default: 0.05)')
+    parser.add_argument('--media', help='Media file to serve (default: a generated speech-like WAV)')
+    parser.add_argument('--media-seconds', type=int, default=30, help='Length of the generated WAV (default: 30)')
+    parser.add_argument('--media-delay-ms', type=int, default=0, help='Extra latency per media request')
+    parser.add_argument('--same-reel', action='store_true',
+                        help='Request the same reel every time (exercises the cache and request coalescing)')
+    parser.add_argument('--port', type=int, default=0, help='Fake Instagram port (default: any free port)')
+    parser.add_argument('--api-url', help='Use an API that is already running instead of starting one')
+    parser.add_argument('--api-port', type=int, default=8765, help='Port for the API we start (default: 8765)')
+    parser.add_argument('--job-workers', type=int, default=2, help='JOB_WORKERS for the API we start')
+    parser.add_argument('--queue-max', type=int, default=0,
+                        help='JOB_QUEUE_MAX for the API we start, 429s count as errors (default: 0 = no limit)')
+    parser.add_argument('--pipeline', default='memory', choices=['memory', 'wav', 'stream'],
+                        help='AUDIO_PIPELINE for the API we start (default: memory)')
+    parser.add_argument('--timeout', type=float, default=600, help='Per-request timeout in seconds')
+    parser.add_argument('--startup-timeout', type=float, default=120, help='Seconds to wait for the API')
+    parser.add_argument('-o', '--output', help='Results JSON (default: benchmarks/results/load-<timestamp>.json)')
+    args = parser.parse_args()
+
+    if args.media:
+        media_path = args.media
+    else:
+        fixtures_dir = os.path.join(tempfile.gettempdir(), "insta-bench-fixtures")
+        _, media_path, _ = make_fixtures(fixtures_dir, [args.media_seconds])[0]
+
+    server = FakeInstagramServer(media_path, port=args.port, delay_ms=args.media_delay_ms).start()
+    process = None
+    try:
+        if args.api_url:
+            api_url = args.api_url.rstrip('/')
+            print(f"Using running API at {api_url}, it needs:")
+            print(f"  INSTAGRAM_REEL_PATTERN='{server.reel_pattern()}'")
+            if args.stub:
+                print("  STUB_ENGINE_ENABLED=true")
+        else:
+            log_path = os.path.join(tempfile.gettempdir(), "insta-loadtest-api.log")
+            print(f"Starting API on port {args.api_port} (log: {log_path})...")
+            process, api_url = start_api(args.api_port, server, args, log_path)
+
+        summary = run_load(api_url, server, args)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+        server.stop()
+
+    summary['server'] = dict(server.stats)
+    results = {
+        'environment': environment_info(),
+        'settings': {key: value for key, value in vars(args).items() if key != 'output'},
+        'results': summary,
+        'harness_peak_rss_mb': peak_rss_mb(),
+    }
+
+    print("\n" + "="*60)
+    print("LOAD TEST")
+    print("="*60)
+    print(f"Requests: {summary['requests']} ({summary['succeeded']} ok, {summary['failed']} failed, "
+          f"{summary['error_rate']:.1%} errors)")
+    print(f"Throughput: {summary['throughput_rps']:.2f} requests/second over {summary['wall_time']:.1f} seconds")
+    latency = summary['latency']
+    print(f"Latency: p50 {latency['p50']:.2f}s  p90 {latency['p90']:.2f}s  p95 {latency['p95']:.2f}s  "
+          f"p99 {latency['p99']:.2f}s  max {latency['max']:.2f}s")
+    for error, count in summary['errors'].items():
+        print(f"  {count} x {error}")
+    print(f"Fake Instagram: {summary['server']['requests']} requests, "
+          f"{summary['server']['bytes_sent'] / 1024 / 1024:.1f} MB sent")
+
+    output = args.output or str(RESULTS_DIR / f"load-{results['environment']['timestamp'].replace(':', '')}.json")
+    save_results(results, output)
+    return 0 if summary['failed'] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""
+Quantization Benchmark
+Compares the fp32 whisper engine with the int8 quantized one on a folder of audio files
+
+Usage:
+    python benchmarks/quantization_benchmark.py path/to/fixtures -m base
+
+Every audio file in the folder gets transcribed by both engines. If there's a
+.txt file with the same name next to it, that's the reference transcript for
+word error rate. Without one, the fp32 transcript is used as the reference,
+so the WER shows how much the int8 output differs from fp32.
+"""
+
+import re
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import engines
+from src.audio_decoder import decode_audio
+from config import AUDIO_SAMPLE_RATE
+
+AUDIO_EXTENSIONS = ['.wav', '.mp3', '.m4a', '.mp4', '.flac', '.ogg', '.webm']
+
+
+def normalize_words(text):
+    # Lowercase words without punctuation, so "Hello," and "hello" match
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_error_rate(reference, hypothesis):
+    """
+    Word error rate: (substitutions + deletions + insertions) / reference words
+
+    Returns:
+        WER as a float (0.0 is a perfect match, can go above 1.0)
+    """
+    ref = normalize_words(reference)
+    hyp = normalize_words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+
+    # Edit distance over words, one row at a time
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(
+                previous[j] + 1,  # deletion
+                current[j - 1] + 1,  # insertion
+                previous[j - 1] + (ref_word != hyp_word),  # substitution
+            ))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def load_fixtures(folder):
+    # (name, samples, reference text or None) for each audio file in the folder
+    fixtures = []
+    for path in sorted(Path(folder).iterdir()):
+        if path.suffix.lower() not in AUDIO_EXTENSIONS:
+            continue
+        success, samples, error = decode_audio(str(path))
+        if not success:
+            print(f"Skipping {path.name}: {error}")
+            continue
+        reference_path = path.with_suffix('.txt')
+        reference = reference_path.read_text(encoding='utf-8') if reference_path.exists() else None
+        fixtures.append((path.name, samples, reference))
+    return fixtures
+
+
+def run_engine(engine_name, model_name, fixtures, runs):
+    """
+    Load a model with one engine and transcribe every fixture
+
+    Returns:
+        Dictionary with load time, per-file texts and timings
+    """
+    engine = engines.get_engine(engine_name)
+    print(f"\nLoading {model_name} with the {engine_name} engine...")
+    start_time = time.time()
+    model = engine.load(model_name)
+    load_time = time.time() - start_time
+
+    options = {'fp16': False, 'language': None}
+    texts = {}
+    times = {}
+    for name, samples, _ in fixtures:
+        # First run also warms up, so keep the fastest one
+        best = None
+        for _ in range(runs):
+            start_time = time.time()
+            result = engine.transcribe(model, samples, options)
+            elapsed = time.time() - start_time
+            best = elapsed if best is None else min(best, elapsed)
+        texts[name] = result['text'].strip()
+        times[name] = best
+        print(f"  {name}: {best:.2f} seconds")
+
+    return {
+        'engine': engine_name,
+        'load_time': load_time,
+        'model_mb': engine.model_size(model, model_name) / 1024 / 1024,
+        'texts': texts,
+        'times': times,
+    }
+
+
+def summarize(run, fixtures, reference_texts):
+    audio_seconds = sum(len(samples) for _, samples, _ in fixtures) / AUDIO_SAMPLE_RATE
+    total_time = sum(run['times'].values())
+    wers = [word_error_rate(reference_texts[name], run['texts'][name]) for name, _, _ in fixtures]
+    return {
+        'engine': run['engine'],
+        'load_time': round(run['load_time'], 2),
+        'model_mb': round(run['model_mb'], 1),
+        'transcribe_time': round(total_time, 2),
+        # Real-time factor: seconds of work per second of audio (lower is faster)
+        'rtf': round(total_time / audio_seconds, 3) if audio_seconds else None,
+        'wer': round(sum(wers) / len(wers), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare fp32 and int8 Whisper speed and accuracy')
+    parser.add_argument('fixtures', help='Folder of audio files (with optional .txt references)')
+    parser.add_argument('-m', '--model', default='base', help='Whisper model name (default: base)')
+    parser.add_argument('--runs', type=int, default=2,
+                        help='Transcribe each file this many times and keep the fastest (default: 2)')
+    parser.add_argument('-o', '--output', help='Save the results as JSON')
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        print(f"No audio files found in {args.fixtures}")
+        return 1
+
+    fp32 = run_engine('whisper', args.model, fixtures, args.runs)
+    int8 = run_engine('whisper-int8', args.model, fixtures, args.runs)
+
+    # Files without a reference are compared against the fp32 output
+    reference_texts = {
+        name: reference if reference is not None else fp32['texts'][name]
+        for name, _, reference in fixtures
+    }
+    with_references = sum(1 for _, _, reference in fixtures if reference is not None)
+
+    results = [summarize(fp32, fixtures, reference_texts), summarize(int8, fixtures, reference_texts)]
+    speedup = results[0]['transcribe_time'] / results[1]['transcribe_time'] if results[1]['transcribe_time'] else None
+
+    print("\n" + "="*60)
+    print(f"QUANTIZATION BENCHMARK ({args.model}, {len(fixtures)} files, "
+          f"{with_references} with reference transcripts)")
+    print("="*60)
+    print(f"{'engine':<14}{'load (s)':>10}{'size (MB)':>11}{'time (s)':>10}{'RTF':>8}{'WER':>9}")
+    for r in results:
+        print(f"{r['engine']:<14}{r['load_time']:>10.2f}{r['model_mb']:>11.1f}"
+              f"{r['transcribe_time']:>10.2f}{r['rtf']:>8.3f}{r['wer']:>9.2%}")
+    if speedup:
+        print(f"\nint8 speedup: {speedup:.2f}x, WER change: {results[1]['wer'] - results[0]['wer']:+.2%}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'model': args.model, 'files': len(fixtures), 'speedup': speedup,
+                       'results': results}, f, indent=2)
+        print(f"Saved results to {args.output}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
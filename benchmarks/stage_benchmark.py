@@ -0,0 +1,206 @@
+"""
+Stage Benchmark
+Times each step of transcribe_reel on synthetic audio, without touching the network
+
+Usage:
+    python benchmarks/stage_benchmark.py -m tiny base --lengths 15 30 60
+    python benchmarks/stage_benchmark.py -o after.json --compare before.json
+
+Stages:
+    url_validation          URLValidator.validate (the HEAD request is faked)
+    decode/<fixture>        FFmpeg decode of a WAV fixture into samples
+    vad/<fixture>           Voice activity detection on the decoded samples
+    model_load/<model>      Loading the model from the local Whisper cache
+    transcribe/<model>/<fixture>  SpeechRecognizer.transcribe, VAD included
+
+Models that aren't downloaded yet are skipped rather than fetched.
+Results (p50/p95 latency, real-time factor, peak RSS) are saved as JSON and
+--compare prints the change against an earlier run.
+"""
+
+import os
+import sys
+import json
+import wave
+import tempfile
+import argparse
+from pathlib import Path
+from unittest import mock
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.bench_utils import (
+    summarize_times, peak_rss_mb, timed, environment_info, save_results, compare_results, print_comparison,
+)
+from benchmarks.fixtures import make_fixtures
+from src.url_validator import URLValidator
+from src.audio_decoder import decode_audio
+from src.vad import keep_speech
+from src.speech_recognizer import SpeechRecognizer
+from src import engines
+from config import DECODING_PRESET, DECODING_PRESETS
+
+DEFAULT_LENGTHS = [15, 30, 60, 90]  # Typical reel lengths, in seconds
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def model_available(spec):
+    # True if loading the model won't need the network
+    engine_name, model_name = engines.parse_model_spec(spec)
+    if engine_name not in ('whisper', 'whisper-int8'):
+        return True  # Other engines manage their own downloads, just try it
+    import whisper
+    url = whisper._MODELS.get(model_name)
+    if url is None:
+        return False
+    download_root = os.path.join(os.getenv("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "whisper")
+    return os.path.exists(os.path.join(download_root, os.path.basename(url)))
+
+
+def read_wav(path):
+    # Fallback when FFmpeg isn't installed, our fixtures are plain 16-bit WAVs
+    with wave.open(str(path), 'rb') as f:
+        frames = f.readframes(f.getnframes())
+    return np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def bench_url_validation(runs):
+    validator = URLValidator()
+    url = "https://www.instagram.com/reel/C0ffeeBench1/"
+    # Only the parsing and checks are measured, the HEAD request gets a canned 200
+    with mock.patch('src.url_validator.requests.head', return_value=mock.Mock(status_code=200)):
+        times = [timed(validator.validate, url)[1] for _ in range(runs)]
+    return summarize_times(times)
+
+
+def bench_decode(fixtures, runs, stages, skipped):
+    # Returns {fixture name: samples} for the later stages
+    decoded = {}
+    for name, path, seconds in fixtures:
+        times = []
+        for _ in range(runs):
+            (success, samples, error), elapsed = timed(decode_audio, path)
+            if not success:
+                break
+            times.append(elapsed)
+        if times:
+            stages[f"decode/{name}"] = summarize_times(times, seconds)
+            decoded[name] = samples
+        else:
+            skipped[f"decode/{name}"] = error
+            decoded[name] = read_wav(path)
+    return decoded
+
+
+def bench_vad(fixtures, decoded, runs, stages):
+    for name, _, seconds in fixtures:
+        times = [timed(keep_speech, decoded[name])[1] for _ in range(runs)]
+        stages[f"vad/{name}"] = summarize_times(times, seconds)
+
+
+def bench_model(spec, fixtures, decoded, runs, preset, use_vad, stages, skipped):
+    if not model_available(spec):
+        skipped[f"model_load/{spec}"] = "Model not downloaded (the benchmark stays offline)"
+        return
+
+    engine_name, model_name = engines.parse_model_spec(spec)
+    engine = engines.get_engine(engine_name)
+    try:
+        model, load_time = timed(engine.load, model_name)
+    except Exception as e:
+        skipped[f"model_load/{spec}"] = str(e)
+        return
+    stages[f"model_load/{spec}"] = {**summarize_times([load_time]), 'peak_rss_mb': peak_rss_mb()}
+
+    recognizer = SpeechRecognizer(spec, use_vad=use_vad, parallel=False, batched=False, preset=preset)
+    recognizer.model = model
+    for name, _, seconds in fixtures:
+        times = []
+        for _ in range(runs):
+            (success, _, _, error), elapsed = timed(recognizer.transcribe, decoded[name])
+            times.append(elapsed)
+        stages[f"transcribe/{spec}/{name}"] = {**summarize_times(times, seconds), 'peak_rss_mb': peak_rss_mb()}
+        print(f"  {spec} {name}: p50 {stages[f'transcribe/{spec}/{name}']['p50']:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline per-stage benchmark of the transcription pipeline')
+    parser.add_argument('-m', '--models', nargs='+', default=['tiny', 'base'],
+                        help='Model specs to benchmark, like base or whisper-int8:base (default: tiny base)')
+    parser.add_argument('--lengths', nargs='+', type=int, default=DEFAULT_LENGTHS,
+                        help='Fixture lengths in seconds (default: 15 30 60 90)')
+    parser.add_argument('--runs', type=int, default=3, help='Repeats per stage (default: 3)')
+    parser.add_argument('--preset', default=DECODING_PRESET, choices=list(DECODING_PRESETS),
+                        help=f'Decoding preset (default: {DECODING_PRESET})')
+    parser.add_argument('--no-vad', action='store_true', help='Transcribe without voice activity detection')
+    parser.add_argument('--fixtures-dir', default=os.path.join(tempfile.gettempdir(), "insta-bench-fixtures"),
+                        help='Where the generated WAV fixtures are kept')
+    parser.add_argument('-o', '--output', help='Results JSON (default: benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--compare', metavar='BASELINE', help='Earlier results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Slowdown that counts as a regression with --compare (default: 0.10)')
+    args = parser.parse_args()
+
+    fixtures = make_fixtures(args.fixtures_dir, args.lengths)
+    print(f"Fixtures: {', '.join(name for name, _, _ in fixtures)} in {args.fixtures_dir}")
+
+    stages = {}
+    skipped = {}
+
+    print("\nURL validation...")
+    stages['url_validation'] = bench_url_validation(max(args.runs, 100))
+
+    print("Audio decode...")
+    decoded = bench_decode(fixtures, args.runs, stages, skipped)
+
+    print("Voice activity detection...")
+    bench_vad(fixtures, decoded, args.runs, stages)
+
+    for spec in args.models:
+        print(f"Model {spec}...")
+        bench_model(spec, fixtures, decoded, args.runs, args.preset, not args.no_vad, stages, skipped)
+
+    results = {
+        'environment': environment_info(),
+        'settings': {
+            'models': args.models,
+            'lengths': args.lengths,
+            'runs': args.runs,
+            'preset': args.preset,
+            'vad': not args.no_vad,
+        },
+        'stages': stages,
+        'skipped': skipped,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+    print("\n" + "="*60)
+    print("STAGE BENCHMARK")
+    print("="*60)
+    print(f"{'stage':<40}{'p50 (s)':>10}{'p95 (s)':>10}{'RTF':>8}")
+    for stage, summary in stages.items():
+        rtf = f"{summary['rtf']:.3f}" if 'rtf' in summary else "-"
+        print(f"{stage:<40}{summary['p50']:>10.4f}{summary['p95']:>10.4f}{rtf:>8}")
+    for stage, reason in skipped.items():
+        print(f"{stage:<40}skipped: {reason}")
+    print(f"\nPeak RSS: {results['peak_rss_mb']} MB")
+
+    output = args.output or str(RESULTS_DIR / f"stages-{results['environment']['timestamp'].replace(':', '')}.json")
+    save_results(results, output)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows = compare_results(baseline, results, threshold=args.threshold)
+        print_comparison(rows)
+        if any(regressed for *_, regressed in rows):
+            print(f"\nRegressions over {args.threshold:.0%} found")
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
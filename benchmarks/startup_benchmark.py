@@ -0,0 +1,143 @@
+"""
+Startup Benchmark
+Times how long the CLI and API take to import, each in a fresh Python process
+
+Usage:
+    python benchmarks/startup_benchmark.py
+    python benchmarks/startup_benchmark.py -o after.json --compare before.json
+
+Every case also checks that torch, whisper and yt_dlp weren't imported.
+They are only needed once a reel is downloaded or a model is loaded, and
+pulling one of them in by accident costs seconds on every start. The script
+exits with 1 if that happens, or if --compare finds a slowdown.
+"""
+
+import sys
+import json
+import time
+import argparse
+import subprocess
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.bench_utils import (
+    summarize_times, environment_info, save_results, compare_results, print_comparison,
+)
+
+PROJECT_ROOT = Path(__file__).parent.parent
+RESULTS_DIR = Path(__file__).parent / "results"
+
+HEAVY_MODULES = ['torch', 'whisper', 'yt_dlp']
+
+# Case name -> code run in a new interpreter
+CASES = {
+    'python': "pass",  # The interpreter itself, to compare the others against
+    'cli_help': "import sys; sys.argv = ['main', '--help']\n"
+                "from src.main import main\n"
+                "try:\n    main()\nexcept SystemExit:\n    pass",
+    'import_main': "import src.main",
+    'import_api': "import src.api",
+    'url_validator': "from src.url_validator import URLValidator; URLValidator()",
+    'cleanup_manager': "from src import CleanupManager",
+}
+
+# Prints the elapsed time and whichever heavy modules got imported
+TIMER = """
+import sys, time, json, io, contextlib
+start_time = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    exec(compile({code!r}, '<case>', 'exec'))
+elapsed = time.perf_counter() - start_time
+print(json.dumps({{'seconds': elapsed, 'heavy': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def run_case(code):
+    """
+    Run one case in a fresh interpreter
+
+    Returns:
+        Tuple of (wall seconds including interpreter start, import seconds, heavy modules imported)
+    """
+    script = TIMER.format(code=code, heavy=HEAVY_MODULES)
+    start_time = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", script], cwd=str(PROJECT_ROOT), capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - start_time
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr else "failed")
+    report = json.loads(completed.stdout.strip().splitlines()[-1])
+    return wall, report['seconds'], report['heavy']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time CLI and API startup in fresh processes')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh processes per case (default: 5)')
+    parser.add_argument('-o', '--output', help='Results JSON (default: benchmarks/results/startup-<timestamp>.json)')
+    parser.add_argument('--compare', metavar='BASELINE', help='Earlier results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.20,
+                        help='Slowdown that counts as a regression with --compare (default: 0.20)')
+    args = parser.parse_args()
+
+    stages = {}
+    heavy_imports = {}
+    failed = {}
+    for name, code in CASES.items():
+        print(f"{name}...")
+        walls, imports = [], []
+        try:
+            for _ in range(args.runs):
+                wall, seconds, heavy = run_case(code)
+                walls.append(wall)
+                imports.append(seconds)
+        except RuntimeError as e:
+            failed[name] = str(e)
+            continue
+        stages[name] = {**summarize_times(walls), 'import_p50': summarize_times(imports)['p50']}
+        if heavy and name != 'python':
+            heavy_imports[name] = heavy
+
+    results = {
+        'environment': environment_info(),
+        'settings': {'runs': args.runs},
+        'stages': stages,
+        'heavy_imports': heavy_imports,
+        'failed': failed,
+    }
+
+    print("\n" + "="*60)
+    print("STARTUP BENCHMARK")
+    print("="*60)
+    print(f"{'case':<20}{'p50 (s)':>10}{'p95 (s)':>10}{'import (s)':>12}")
+    for name, summary in stages.items():
+        print(f"{name:<20}{summary['p50']:>10.3f}{summary['p95']:>10.3f}{summary['import_p50']:>12.3f}")
+    for name, error in failed.items():
+        print(f"{name:<20}failed: {error}")
+
+    output = args.output or str(RESULTS_DIR / f"startup-{results['environment']['timestamp'].replace(':', '')}.json")
+    save_results(results, output)
+
+    status = 0
+    if heavy_imports:
+        print("\nHeavy modules imported at startup:")
+        for name, modules in heavy_imports.items():
+            print(f"  {name}: {', '.join(modules)}")
+        status = 1
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows = compare_results(baseline, results, threshold=args.threshold)
+        print_comparison(rows)
+        if any(regressed for *_, regressed in rows):
+            print(f"\nRegressions over {args.threshold:.0%} found")
+            status = 1
+
+    return 1 if failed else status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -19,22 +19,130 @@ TEMP_DIR.mkdir(exist_ok=True)
 # "base" is a good middle ground
 WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
 
+# Which engine runs the model
+# "whisper" - openai-whisper on PyTorch (the default)
+# "whisper-int8" - openai-whisper with its Linear layers dynamically quantized to int8
+# "ct2"     - CTranslate2 through faster-whisper, int8 on CPU (pip install faster-whisper)
+# The API can also pick per request with a model like "ct2:small"
+INFERENCE_ENGINE = os.getenv("INFERENCE_ENGINE", "whisper")
+CT2_COMPUTE_TYPE = os.getenv("CT2_COMPUTE_TYPE", "int8")
+CT2_CPU_THREADS = int(os.getenv("CT2_CPU_THREADS", "0"))  # 0 = let CTranslate2 decide
+
+# Dynamic int8 quantization for the PyTorch engine (same as INFERENCE_ENGINE=whisper-int8)
+# The converted model is saved in QUANTIZED_MODEL_DIR so it's only built once
+WHISPER_QUANTIZE = os.getenv("WHISPER_QUANTIZE", "false").lower() == "true"
+QUANTIZED_MODEL_DIR = Path(os.getenv("QUANTIZED_MODEL_DIR", str(PROJECT_ROOT / "cache" / "quantized")))
+
+# Load testing only: a "stub" engine that sleeps instead of running a model,
+# so the download and decode path can be measured on its own ("stub:base")
+STUB_ENGINE_ENABLED = os.getenv("STUB_ENGINE_ENABLED", "false").lower() == "true"
+STUB_ENGINE_RTF = float(os.getenv("STUB_ENGINE_RTF", "0.05"))  # Seconds of "work" per second of audio
+
+# How much RAM the API can use to keep models loaded between requests (in MB)
+# Least recently used models get unloaded when we go over this
+MODEL_CACHE_MAX_MB = int(os.getenv("MODEL_CACHE_MAX_MB", "4096"))
+
+# Decoding Presets
+# Trade accuracy for speed. Whisper's own defaults ("balanced") retry noisy
+# windows at higher temperatures, which can double the time on bad audio.
+DECODING_PRESETS = {
+    # Greedy, no temperature fallback, each window decoded on its own
+    'fast': {
+        'temperature': 0.0,
+        'condition_on_previous_text': False,
+    },
+    # Whisper's defaults: greedy with temperature fallback
+    'balanced': {
+        'temperature': (0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+        'condition_on_previous_text': True,
+    },
+    # Beam search, with fallback
+    'accurate': {
+        'temperature': (0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+        'beam_size': 5,
+        'best_of': 5,
+        'condition_on_previous_text': True,
+    },
+}
+DECODING_PRESET = os.getenv("DECODING_PRESET", "balanced")
+
 # Audio Settings
 AUDIO_FORMAT = "wav"  # Whisper works best with WAV
 AUDIO_SAMPLE_RATE = 16000  # Standard for speech recognition
+# The smallest stream that still sounds good enough for speech gets downloaded.
+# Streams below these (sample rate in Hz, bitrate in kbps) are only used if nothing else has audio
+AUDIO_MIN_SAMPLE_RATE = int(os.getenv("AUDIO_MIN_SAMPLE_RATE", "16000"))
+AUDIO_MIN_BITRATE = int(os.getenv("AUDIO_MIN_BITRATE", "32"))
+# How audio gets from the download to Whisper:
+# "memory" - decode once with FFmpeg straight into a NumPy array (no WAV on disk)
+# "wav"    - convert to a WAV file first and let Whisper decode it again
+# "stream" - decode while downloading and transcribe each window as soon as it arrives
+AUDIO_PIPELINE = os.getenv("AUDIO_PIPELINE", "memory")
+STREAM_WINDOW_SECONDS = 30  # Whisper looks at 30 seconds at a time
+
+# Parallel Transcription
+# Long audio is cut at quiet points into chunks that are transcribed on a process pool
+PARALLEL_TRANSCRIPTION = os.getenv("PARALLEL_TRANSCRIPTION", "false").lower() == "true"
+PARALLEL_CHUNK_SECONDS = 60  # Target length of each chunk
+PARALLEL_OVERLAP_SECONDS = 2  # Chunks run this far into the next one so no words are lost
+PARALLEL_WORKERS = int(os.getenv("PARALLEL_WORKERS", "0"))  # 0 = one per CPU core
+PARALLEL_THREADS_PER_WORKER = int(os.getenv("PARALLEL_THREADS_PER_WORKER", "1"))
+
+# Batched Inference (API only)
+# Windows from different requests are decoded together, which uses the CPU
+# better under load. Only for the whisper and whisper-int8 engines.
+BATCH_INFERENCE_ENABLED = os.getenv("BATCH_INFERENCE_ENABLED", "false").lower() == "true"
+BATCH_INFERENCE_MAX_SIZE = int(os.getenv("BATCH_INFERENCE_MAX_SIZE", "8"))  # Most windows in one batch
+BATCH_INFERENCE_WAIT_MS = int(os.getenv("BATCH_INFERENCE_WAIT_MS", "50"))  # How long to wait for a batch to fill
+
+# Voice Activity Detection
+# Cuts out silence and quiet stretches before Whisper sees the audio. Loudness only:
+# music or noise as loud as speech is kept
+VAD_ENABLED = os.getenv("VAD_ENABLED", "true").lower() == "true"
+VAD_THRESHOLD_DB = float(os.getenv("VAD_THRESHOLD_DB", "-45"))  # Anything quieter is silence
+VAD_MARGIN_DB = 6  # Speech has to be this much louder than the background
+VAD_MIN_SPEECH_MS = 250
+VAD_MIN_SILENCE_MS = 500
+VAD_PADDING_MS = 300
 
 # Download Settings
 DOWNLOAD_TIMEOUT = 300  # 5 minutes max for download
-MAX_VIDEO_DURATION = 600  # 10 minutes max (Instagram reels are typically < 90 seconds)
+# 10 minutes max (Instagram reels are typically < 90 seconds), checked before anything is downloaded
+MAX_VIDEO_DURATION = int(os.getenv("MAX_VIDEO_DURATION", "600"))
 
 # Performance Settings
-TRANSCRIPTION_TIME_MULTIPLIER = 3  # Max allowed is 3x video duration
+# Max allowed is 3x video duration (0 = no limit).
+# Transcription stops between windows once it's used that much time and returns what it has so far.
+# With a limit, long audio is decoded in our own ~25 second windows instead of Whisper's long-form decoding
+TRANSCRIPTION_TIME_MULTIPLIER = float(os.getenv("TRANSCRIPTION_TIME_MULTIPLIER", "3"))
+MIN_TRANSCRIPTION_SECONDS = int(os.getenv("MIN_TRANSCRIPTION_SECONDS", "30"))  # Budget for very short reels
+
+# Batch Mode Settings (CLI --batch)
+BATCH_DOWNLOAD_WORKERS = int(os.getenv("BATCH_DOWNLOAD_WORKERS", "2"))
+BATCH_TRANSCRIBE_WORKERS = int(os.getenv("BATCH_TRANSCRIBE_WORKERS", "1"))
+BATCH_QUEUE_SIZE = int(os.getenv("BATCH_QUEUE_SIZE", "4"))  # Downloaded reels waiting for Whisper
+
+# Transcript Cache Settings
+# Finished transcriptions are saved here so the same reel isn't downloaded twice
+TRANSCRIPT_CACHE_ENABLED = os.getenv("TRANSCRIPT_CACHE_ENABLED", "true").lower() == "true"
+TRANSCRIPT_CACHE_PATH = Path(os.getenv("TRANSCRIPT_CACHE_PATH", str(PROJECT_ROOT / "cache" / "transcripts.db")))
+TRANSCRIPT_CACHE_TTL = int(os.getenv("TRANSCRIPT_CACHE_TTL", str(7 * 24 * 3600)))  # 1 week
+TRANSCRIPT_CACHE_MAX_MB = int(os.getenv("TRANSCRIPT_CACHE_MAX_MB", "100"))
+
+# Profiling
+# Requests can ask for a cProfile of their run (X-Profile header or "profile": true),
+# saved to PROFILE_DIR as <reel_id>-<time>.prof. The CLI's --profile always works.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", str(PROJECT_ROOT / "profiles")))
 
 # Logging
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
 # Instagram Reel URL Patterns
-INSTAGRAM_REEL_PATTERN = r'https?://(?:www\.)?instagram\.com/(?:reel|reels)/([A-Za-z0-9_-]+)'
+# (the load test points this at a local stand-in server)
+INSTAGRAM_REEL_PATTERN = os.getenv(
+    "INSTAGRAM_REEL_PATTERN", r'https?://(?:www\.)?instagram\.com/(?:reel|reels)/([A-Za-z0-9_-]+)'
+)
 
 # User Agent for requests
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
@@ -43,3 +151,24 @@ USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
 API_PORT = int(os.getenv("API_PORT", "8000"))
 CORS_ORIGIN = os.getenv("CORS_ORIGIN", "http://localhost:3000")
 
+# Job Queue Settings
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))  # Transcriptions running at the same time
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", "3600"))  # Keep finished jobs for 1 hour
+# Admission control: jobs waiting for a worker, and unfinished jobs per client (0 = no limit).
+# Past either limit requests get a 429 with Retry-After
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "20"))
+JOB_MAX_PER_CLIENT = int(os.getenv("JOB_MAX_PER_CLIENT", "4"))
+# "sjf" runs the cheapest waiting job first (reel length from its metadata x model cost),
+# "fifo" runs them in arrival order
+JOB_SCHEDULER = os.getenv("JOB_SCHEDULER", "sjf")
+# Seconds of expected work forgiven per second a job waits, so long reels aren't starved
+SCHEDULER_AGING_RATE = float(os.getenv("SCHEDULER_AGING_RATE", "0.5"))
+PROBE_WORKERS = int(os.getenv("PROBE_WORKERS", "4"))  # Metadata requests running at the same time
+
+# Startup Warmup Settings
+# The API loads WHISPER_MODEL plus these (comma separated, like "small,ct2:base") when it starts
+# and runs one short transcription on each, /ready fails until that's done
+PRELOAD_ENABLED = os.getenv("PRELOAD_ENABLED", "true").lower() == "true"
+PRELOAD_MODELS = [name.strip() for name in os.getenv("PRELOAD_MODELS", "").split(",") if name.strip()]
+WARMUP_AUDIO_SECONDS = float(os.getenv("WARMUP_AUDIO_SECONDS", "5"))
+
@@ -57,7 +57,11 @@ export default function Home() {
 
       const data = await response.json();
 
-      if (data.status === "success") {
+      if (response.status === 429) {
+        // Server is at capacity, it tells us when to come back
+        const retryAfter = response.headers.get("Retry-After");
+        setError(`The server is busy${retryAfter ? `, try again in ${retryAfter} seconds` : ""}.`);
+      } else if (data.status === "success") {
         setResult({
           transcription: data.transcription,
           reel_id: data.reel_id,
@@ -1,19 +1,31 @@
 """
 Package initialization for src module
+
+Names are imported on first use, so "from src.url_validator import ..." or
+"python -m src.main --help" don't pay for torch and whisper.
 """
 
-from .url_validator import URLValidator, validate_instagram_url
-from .media_extractor import MediaExtractor, extract_audio_from_reel
-from .speech_recognizer import SpeechRecognizer, transcribe_audio
-from .cleanup_manager import CleanupManager, auto_cleanup
+import importlib
+
+# Exported name -> module it lives in
+_EXPORTS = {
+    'URLValidator': 'url_validator',
+    'validate_instagram_url': 'url_validator',
+    'MediaExtractor': 'media_extractor',
+    'extract_audio_from_reel': 'media_extractor',
+    'SpeechRecognizer': 'speech_recognizer',
+    'transcribe_audio': 'speech_recognizer',
+    'CleanupManager': 'cleanup_manager',
+    'auto_cleanup': 'cleanup_manager',
+}
+
+__all__ = list(_EXPORTS)
+
 
-__all__ = [
-    'URLValidator',
-    'validate_instagram_url',
-    'MediaExtractor',
-    'extract_audio_from_reel',
-    'SpeechRecognizer',
-    'transcribe_audio',
-    'CleanupManager',
-    'auto_cleanup',
-]
+def __getattr__(name):
+    if name in _EXPORTS:
+        module = importlib.import_module(f".{_EXPORTS[name]}", __name__)
+        value = getattr(module, name)
+        globals()[name] = value  # Next lookup skips this function
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,6 +1,10 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
-from pydantic import BaseModel
-from typing import Optional
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Header, Request
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from pydantic import BaseModel, field_validator
+from typing import List, Optional
+import asyncio
+import functools
+import json
 import os
 import sys
 from pathlib import Path
@@ -9,11 +13,121 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.main import InstaTranscriber
+from src.model_registry import get_model_registry
+from src.job_queue import JobManager, JobCancelled, QueueFull
+from src.transcript_cache import TranscriptCache
+from src.batch_decoder import batch_decoder_stats
+from src.parallel_transcriber import shutdown_parallel_transcribers
+from src import metrics
+from src.url_validator import URLValidator
+from src.warmup import Warmup, preload_specs
+from src.scheduler import CostEstimator
+from src.media_extractor import MediaExtractor
+from src.engines import normalize_model_spec, quantized_spec
 from fastapi.middleware.cors import CORSMiddleware
 import config
 
 app = FastAPI(title="InstaReelTranscriber API")
 
+# Models stay loaded here between requests
+model_registry = get_model_registry()
+
+# Loads and warms up the configured models at startup, /ready waits for it
+warmup = Warmup(model_registry, preload_specs() if config.PRELOAD_ENABLED else [])
+
+# Finished transcriptions, so repeat requests skip the download and Whisper
+transcript_cache = TranscriptCache() if config.TRANSCRIPT_CACHE_ENABLED else None
+
+url_validator = URLValidator()
+
+
+def coalesce_key(job):
+    # Requests for the same reel, model and options that overlap share one job (see JobManager).
+    # Streaming and profiled jobs need their own run, for their segments and their own profile
+    if job.streaming or job.options.get('profile'):
+        return None
+    # Fall back to the raw URL if it doesn't look like a reel, validation will reject it anyway
+    reel_id = url_validator.extract_reel_id(job.url) or job.url
+    return (reel_id, normalize_model_spec(job.model_name), tuple(sorted(job.options.items())))
+
+
+def run_transcription_job(job):
+    # Runs on a worker thread, never on the event loop
+    try:
+        result = transcribe_for_job(job)
+    except JobCancelled:
+        metrics.transcriptions_total.inc(result='cancelled')
+        raise
+    except Exception:
+        metrics.transcriptions_total.inc(result='server_error')
+        raise
+    if job.cancelled:
+        # The pipeline catches JobCancelled with everything else and turns it into an error result
+        metrics.transcriptions_total.inc(result='cancelled')
+        return result
+    metrics.record_result(result)
+    return result
+
+
+def new_transcriber(job):
+    transcriber = InstaTranscriber(model_name=job.model_name, registry=model_registry,
+                                   cache=transcript_cache, **job.options)
+    if job.streaming:
+        transcriber.extractor_mode = "stream"
+    return transcriber
+
+
+def transcribe_for_job(job):
+    # The scheduler may have fetched the metadata already (job.media_info), then it isn't fetched again
+    on_segment = job.add_segment if job.streaming else None
+    return new_transcriber(job).transcribe_reel(job.url, on_stage=job.set_state, on_segment=on_segment,
+                                                media_info=job.media_info)
+
+
+# Expected cost of each job from the reel's length, so short reels don't queue behind long ones
+job_costs = CostEstimator(MediaExtractor(), url_validator)
+
+
+@functools.lru_cache(maxsize=64)
+def cache_settings(model_name, options, streaming):
+    # Model spec and cache options for jobs with these settings, worked out once per combination
+    transcriber = InstaTranscriber(model_name=model_name, registry=model_registry, **dict(options))
+    if streaming:
+        transcriber.extractor_mode = "stream"
+    return transcriber.cache_settings()
+
+
+def is_cached(job):
+    # Same lookup transcribe_reel starts with, without setting up a transcriber for every job
+    reel_id = url_validator.extract_reel_id(job.url)
+    if transcript_cache is None or not reel_id:
+        return False
+    model_spec, options = cache_settings(job.model_name, tuple(sorted(job.options.items())), job.streaming)
+    try:
+        return transcript_cache.get(reel_id, model_spec, options) is not None
+    except Exception as e:
+        print(f"Cache lookup failed: {e}")
+        return False
+
+
+def estimate_job_cost(job):
+    # Cached reels are nearly free, and shouldn't wait on a metadata request either
+    if is_cached(job):
+        return 0.0
+    return job_costs.estimate(job)
+
+
+# Background workers that do the actual downloading and transcribing
+job_manager = JobManager(run_transcription_job,
+                         estimate_cost=estimate_job_cost if config.JOB_SCHEDULER == "sjf" else None,
+                         coalesce_key=coalesce_key)
+
+# Read from the job manager whenever /metrics is scraped
+metrics.jobs_queued.set_function(job_manager.queue_depth)
+metrics.jobs_in_flight.set_function(job_manager.in_flight)
+metrics.job_queue_capacity.set_function(lambda: job_manager.max_queued)
+metrics.job_drain_rate.set_function(job_manager.drain_rate)
+
 # Configure CORS for frontend - allow common localhost variations
 origins = [
     "http://localhost:3000",
@@ -28,11 +142,64 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    # The frontend reads Retry-After from 429s, browsers hide it unless it's exposed
+    expose_headers=["Retry-After"],
 )
 
 class TranscribeRequest(BaseModel):
     reel_url: str
-    model: str = "base"
+    # Model name, optionally with an engine: "base", "whisper:small", "ct2:small"
+    # (leave out for WHISPER_MODEL, the one warmed up at startup)
+    model: str = config.WHISPER_MODEL
+    # Use the int8 quantized version of a whisper model (faster on CPU, slightly less accurate)
+    quantize: bool = False
+
+    # Language spoken in the reel, like "en" (leave out to detect it)
+    language: Optional[str] = None
+    # Decoding preset: "fast", "balanced" or "accurate" (leave out for DECODING_PRESET)
+    preset: Optional[str] = None
+    # Profile this transcription (same as sending "X-Profile: 1", needs PROFILING_ENABLED)
+    profile: bool = False
+
+    @field_validator('preset')
+    @classmethod
+    def check_preset(cls, preset):
+        if preset is not None and preset not in config.DECODING_PRESETS:
+            raise ValueError(f"preset must be one of: {', '.join(config.DECODING_PRESETS)}")
+        return preset
+
+    @field_validator('language')
+    @classmethod
+    def check_language(cls, language):
+        # Caught here instead of after the download, whisper is imported by then anyway
+        from whisper.tokenizer import LANGUAGES
+        if language is not None and language.lower() not in LANGUAGES:
+            raise ValueError(f"language must be a Whisper language code like 'en' ({', '.join(sorted(LANGUAGES))})")
+        return language
+
+    def model_spec(self):
+        return quantized_spec(self.model) if self.quantize else self.model
+
+    def job_options(self, profile_header=None):
+        # Settings passed on to InstaTranscriber
+        return {
+            'language': self.language.lower() if self.language else None,
+            'preset': self.preset,
+            'profile': wants_profile(self.profile, profile_header),
+        }
+
+
+def wants_profile(flag, header):
+    """
+    Whether a request asked to be profiled, by body flag or X-Profile header
+
+    Raises:
+        HTTPException: 403 if it did but profiling is turned off
+    """
+    requested = flag or (header or "").strip().lower() in ("1", "true", "yes")
+    if requested and not config.PROFILING_ENABLED:
+        raise HTTPException(status_code=403, detail="Profiling is disabled (set PROFILING_ENABLED=true)")
+    return requested
 
 class TranscribeResponse(BaseModel):
     status: str
@@ -40,32 +207,83 @@ class TranscribeResponse(BaseModel):
     message: Optional[str] = None
     reel_id: Optional[str] = None
     processing_time: Optional[float] = None
+    cached: bool = False
+    language: Optional[str] = None
+    preset: Optional[str] = None
+    # Reel length in seconds, and whether the transcription ran out of time and only covers the start
+    duration: Optional[float] = None
+    partial: bool = False
+    # Media bytes downloaded for the reel (None when it came from the cache)
+    downloaded_bytes: Optional[int] = None
+    # File name of the saved profile, when profiling was asked for
+    profile: Optional[str] = None
+
+class Segment(BaseModel):
+    start: float
+    end: float
+    text: str
+
+class JobResponse(BaseModel):
+    job_id: str
+    state: str
+    segments: List[Segment] = []
+    result: Optional[TranscribeResponse] = None
+    error: Optional[str] = None
+
+
+def build_response(result):
+    # Turn a transcribe_reel result dict into the API response
+    if result['success']:
+        return TranscribeResponse(
+            status="success",
+            transcription=result['transcription'],
+            reel_id=result.get('reel_id'),
+            processing_time=result.get('processing_time'),
+            cached=result.get('cached', False),
+            language=result.get('language'),
+            preset=result.get('preset'),
+            duration=result.get('duration'),
+            partial=result.get('partial', False),
+            downloaded_bytes=result.get('downloaded_bytes'),
+            profile=profile_name(result)
+        )
+    return TranscribeResponse(
+        status="error",
+        message=result.get('error', "Unknown error occurred"),
+        profile=profile_name(result)
+    )
+
+
+def submit_job(request, http_request, **kwargs):
+    """
+    Queue a transcription for this client, or answer 429 if there's no room for it
+
+    Behind a proxy run uvicorn with --proxy-headers so the client is the real caller.
+    """
+    client = http_request.client.host if http_request.client else None
+    try:
+        return job_manager.submit(request.reel_url, request.model_spec(), client=client, **kwargs)
+    except QueueFull as e:
+        metrics.jobs_rejected_total.inc(reason=e.reason)
+        raise HTTPException(status_code=429, detail=str(e), headers={'Retry-After': str(e.retry_after)})
+
+
+def profile_name(result):
+    # Just the file name, the server's folders are nobody else's business
+    return os.path.basename(result['profile']) if result.get('profile') else None
+
 
 @app.post("/api/transcribe", response_model=TranscribeResponse)
-async def transcribe_reel(request: TranscribeRequest, background_tasks: BackgroundTasks):
+async def transcribe_reel(request: TranscribeRequest, background_tasks: BackgroundTasks, http_request: Request,
+                          x_profile: Optional[str] = Header(None)):
     """
     Transcribe an Instagram Reel
     """
+    # Hand the work to the job queue (or get a 429) and wait without blocking the event loop
+    job = submit_job(request, http_request, options=request.job_options(x_profile))
     try:
-        # Initialize transcriber with requested model
-        transcriber = InstaTranscriber(model_name=request.model)
-        
-        # Run transcription (synchronously for now as the core logic is sync)
-        # In a production app with heavy load, we'd want this to be async/queued
-        result = transcriber.transcribe_reel(request.reel_url)
-        
-        if result['success']:
-            return TranscribeResponse(
-                status="success",
-                transcription=result['transcription'],
-                reel_id=result.get('reel_id'),
-                processing_time=result.get('processing_time')
-            )
-        else:
-            return TranscribeResponse(
-                status="error",
-                message=result.get('error', "Unknown error occurred")
-            )
+        result = await asyncio.wrap_future(job.future)
+        return build_response(result)
             
     except Exception as e:
         return TranscribeResponse(
@@ -73,6 +291,138 @@ async def transcribe_reel(request: TranscribeRequest, background_tasks: Backgrou
             message=f"Server error: {str(e)}"
         )
 
+def sse_event(event, data):
+    # One server-sent event: a name and a line of JSON
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/api/transcribe/stream")
+async def transcribe_reel_stream(request: TranscribeRequest, http_request: Request,
+                                 x_profile: Optional[str] = Header(None)):
+    """
+    Transcribe an Instagram Reel and stream progress as server-sent events.
+
+    Events:
+        stage   - {"stage": "validating" | "downloading" | "transcribing"}
+        segment - {"start": seconds, "end": seconds, "text": "..."} as soon as it's decoded
+        result  - the final TranscribeResponse, always the last event
+
+    Closing the connection cancels the transcription.
+    """
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+
+    def listener(event, data):
+        # Called from the worker thread, so hop back onto the event loop
+        loop.call_soon_threadsafe(events.put_nowait, (event, data))
+
+    job = submit_job(request, http_request, streaming=True, listener=listener,
+                     options=request.job_options(x_profile))
+
+    async def event_stream():
+        # The 'result' event (success or error) is sent before the job's future is resolved,
+        # so whether the job is over is tracked here rather than read from the future
+        finished = False
+        try:
+            yield sse_event('job', {'job_id': job.id})
+            while True:
+                event, data = await events.get()
+                if event == 'result':
+                    finished = True
+                    if data['result']:
+                        response = build_response(data['result'])
+                    else:
+                        response = TranscribeResponse(status="error", message=data['error'])
+                    yield sse_event('result', response.model_dump())
+                    return
+                yield sse_event(event, data)
+        finally:
+            # Client went away before the end - stop any work that's still going
+            if not finished:
+                print(f"Stream closed early, cancelling job {job.id}")
+                job.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.post("/api/jobs", response_model=JobResponse, status_code=202)
+def create_job(request: TranscribeRequest, http_request: Request, x_profile: Optional[str] = Header(None)):
+    """
+    Queue a transcription and return its job id right away (429 if the queue is full)
+    """
+    job = submit_job(request, http_request, options=request.job_options(x_profile))
+    return JobResponse(job_id=job.id, state=job.state)
+
+@app.get("/api/jobs/{job_id}", response_model=JobResponse)
+def get_job(job_id: str):
+    """
+    Check on a queued transcription
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return JobResponse(
+        job_id=job.id,
+        state=job.state,
+        segments=job.segments,
+        result=build_response(job.result) if job.result else None,
+        error=job.error or None
+    )
+
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+@app.get("/ready")
+def readiness_check():
+    """
+    200 once the preloaded models are loaded and warmed up, 503 until then
+    (or for good if warmup failed). Point load balancers here, not at /health.
+    """
+    status = warmup.get_status()
+    if not warmup.ready:
+        raise HTTPException(status_code=503, detail=status)
+    return status
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """
+    Stage latencies, results, queue depth and throughput in the Prometheus text format
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/models/stats")
+def model_stats():
+    """
+    Model registry hits, misses, load times and memory usage, plus batch sizes
+    when batched inference is on
+    """
+    return {**model_registry.get_stats(), 'batching': batch_decoder_stats()}
+
+@app.get("/api/cache/stats")
+def cache_stats():
+    """
+    How many transcriptions are cached and how much space they use
+    """
+    if transcript_cache is None:
+        return {'enabled': False}
+    return {'enabled': True, **transcript_cache.get_stats()}
+
+@app.get("/api/jobs")
+def job_stats():
+    """
+    Worker count, how many jobs are in each state, queue depth, drain rate and rejections
+    """
+    return job_manager.get_stats()
+
+@app.on_event("startup")
+def start_warmup():
+    warmup.start()
+
+@app.on_event("shutdown")
+def shutdown_workers():
+    job_manager.shutdown()
+    shutdown_parallel_transcribers()
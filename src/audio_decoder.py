@@ -0,0 +1,113 @@
+"""
+Audio Decoder Module
+Decodes media straight into a NumPy array with FFmpeg, no WAV file needed
+"""
+
+import subprocess
+import numpy as np
+from config import AUDIO_SAMPLE_RATE
+
+
+def decode_audio(source, sample_rate=AUDIO_SAMPLE_RATE):
+    """
+    Decode any audio/video file into mono float32 samples
+
+    Args:
+        source: Path (or URL) of the media to decode
+        sample_rate: Output sample rate (Whisper wants 16 kHz)
+
+    Returns:
+        Tuple of (success, samples, error_message).
+        samples is a float32 array in [-1, 1] that can go straight into Whisper.
+    """
+    cmd = [
+        "ffmpeg",
+        "-nostdin",
+        "-threads", "0",
+        "-i", str(source),
+        "-f", "s16le",   # Raw 16-bit PCM...
+        "-ac", "1",      # ...mono...
+        "-acodec", "pcm_s16le",
+        "-ar", str(sample_rate),  # ...at the rate Whisper expects
+        "-",             # ...written to stdout instead of a file
+    ]
+
+    try:
+        process = subprocess.run(cmd, capture_output=True, check=True)
+    except FileNotFoundError:
+        return False, None, "FFmpeg not found - is it installed?"
+    except subprocess.CalledProcessError as e:
+        error_msg = e.stderr.decode(errors='ignore').strip().splitlines()
+        return False, None, f"FFmpeg could not decode audio: {error_msg[-1] if error_msg else e}"
+
+    return True, pcm_to_float(process.stdout), ""
+
+
+def stream_audio(source, headers=None, window_seconds=30, sample_rate=AUDIO_SAMPLE_RATE):
+    """
+    Decode media while it's still downloading and hand it out in fixed windows
+
+    FFmpeg reads the source (usually a direct media URL) and writes raw PCM to a
+    pipe. Every time a full window has arrived it's yielded right away, so the
+    caller can start on it while the rest is still coming in.
+
+    Args:
+        source: Media URL or path
+        headers: Optional dict of HTTP headers for the request
+        window_seconds: Length of each window (Whisper works on 30 second windows)
+        sample_rate: Output sample rate
+
+    Yields:
+        float32 sample arrays, all full windows except possibly the last one
+
+    Raises:
+        RuntimeError: If FFmpeg is missing or fails, even after some windows were
+                      yielded (a download that died partway isn't the whole reel)
+    """
+    cmd = ["ffmpeg", "-nostdin", "-loglevel", "error"]
+    if headers:
+        # FFmpeg wants them as one string of "Key: value" lines
+        cmd += ["-headers", "".join(f"{key}: {value}\r\n" for key, value in headers.items())]
+    cmd += [
+        "-i", str(source),
+        "-f", "s16le",
+        "-ac", "1",
+        "-acodec", "pcm_s16le",
+        "-ar", str(sample_rate),
+        "-",
+    ]
+
+    try:
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        raise RuntimeError("FFmpeg not found - is it installed?")
+
+    window_bytes = window_seconds * sample_rate * 2  # 2 bytes per 16-bit sample
+    produced = 0
+    try:
+        while True:
+            # read() blocks until the whole window is here or the stream ends
+            chunk = process.stdout.read(window_bytes)
+            if not chunk:
+                break
+            produced += len(chunk)
+            yield pcm_to_float(chunk)
+
+        if process.wait() != 0:
+            error_msg = process.stderr.read().decode(errors='ignore').strip().splitlines()
+            error_msg = error_msg[-1] if error_msg else 'unknown error'
+            if produced:
+                raise RuntimeError(f"FFmpeg stopped after {produced / (sample_rate * 2):.1f} seconds of audio: {error_msg}")
+            raise RuntimeError(f"FFmpeg could not decode audio: {error_msg}")
+    finally:
+        # Stop downloading if the caller gave up early
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+        process.stderr.close()
+
+
+def pcm_to_float(pcm_bytes):
+    # 16-bit signed integers -> floats between -1 and 1
+    return np.frombuffer(pcm_bytes, np.int16).astype(np.float32) / 32768.0
@@ -0,0 +1,157 @@
+"""
+Batch Module
+Transcribes a list of reels with downloading and transcribing running side by side
+"""
+
+import json
+import queue
+import threading
+import time
+from src.cleanup_manager import CleanupManager
+from config import BATCH_DOWNLOAD_WORKERS, BATCH_TRANSCRIBE_WORKERS, BATCH_QUEUE_SIZE
+
+# Tells a worker there's nothing left to do
+_DONE = object()
+
+
+def read_urls(lines):
+    # Skip blank lines and # comments
+    for line in lines:
+        url = line.strip()
+        if url and not url.startswith('#'):
+            yield url
+
+
+class BatchPipeline:
+    """
+    Two-stage pipeline: download workers fetch audio while transcribe workers
+    run Whisper on what's already been fetched. The queue between them is bounded
+    so we never have more than a few downloaded reels waiting on disk (or in memory).
+    """
+
+    def __init__(self, make_transcriber, download_workers=BATCH_DOWNLOAD_WORKERS,
+                 transcribe_workers=BATCH_TRANSCRIBE_WORKERS, queue_size=BATCH_QUEUE_SIZE):
+        """
+        Args:
+            make_transcriber: Function that returns a new InstaTranscriber.
+                              Each transcribe worker gets its own (and its own model).
+            download_workers: Reels downloading at the same time
+            transcribe_workers: Reels transcribing at the same time
+            queue_size: Downloaded reels allowed to wait for a transcribe worker
+        """
+        self.make_transcriber = make_transcriber
+        self.download_workers = max(1, download_workers)
+        self.transcribe_workers = max(1, transcribe_workers)
+        self.queue_size = max(1, queue_size)
+        self._write_lock = threading.Lock()
+        self.succeeded = 0
+        self.failed = 0
+
+    def run(self, urls, output):
+        """
+        Process every URL and write one JSON line per reel as it finishes
+
+        Args:
+            urls: Iterable of reel URLs (read lazily, so it can be a file or stdin)
+            output: Open text file for the JSONL results
+
+        Returns:
+            Tuple of (succeeded, failed)
+        """
+        url_queue = queue.Queue(maxsize=self.download_workers * 2)
+        audio_queue = queue.Queue(maxsize=self.queue_size)
+
+        downloaders = [
+            threading.Thread(target=self._download_worker, args=(url_queue, audio_queue, output),
+                             name=f"batch-download-{i}", daemon=True)
+            for i in range(self.download_workers)
+        ]
+        transcribers = [
+            threading.Thread(target=self._transcribe_worker, args=(audio_queue, output),
+                             name=f"batch-transcribe-{i}", daemon=True)
+            for i in range(self.transcribe_workers)
+        ]
+        for thread in downloaders + transcribers:
+            thread.start()
+
+        # Feed the URLs in, then tell each stage when it's finished
+        for index, url in enumerate(urls):
+            url_queue.put((index, url))
+        for _ in downloaders:
+            url_queue.put(_DONE)
+        for thread in downloaders:
+            thread.join()
+        for _ in transcribers:
+            audio_queue.put(_DONE)
+        for thread in transcribers:
+            thread.join()
+
+        return self.succeeded, self.failed
+
+    def _download_worker(self, url_queue, audio_queue, output):
+        transcriber = self.make_transcriber()
+        while True:
+            item = url_queue.get()
+            if item is _DONE:
+                return
+            index, url = item
+
+            result = transcriber.new_result()
+            start_time = time.time()
+            try:
+                if transcriber.load_from_cache(url, result, start_time):
+                    self._write(output, index, url, result)
+                    continue
+
+                audio = transcriber.fetch_audio(url, result)
+            except Exception as e:
+                result['error'] = f"Unexpected error: {str(e)}"
+                audio = None
+
+            if audio is None:
+                self._write(output, index, url, result)
+                continue
+
+            # Blocks when the transcribe workers are behind
+            audio_queue.put((index, url, audio, result, start_time))
+
+    def _transcribe_worker(self, audio_queue, output):
+        transcriber = self.make_transcriber()
+        while True:
+            item = audio_queue.get()
+            if item is _DONE:
+                return
+            index, url, audio, result, start_time = item
+
+            # WAV files get deleted once transcribed, in-memory audio just gets dropped
+            cleanup = CleanupManager()
+            if isinstance(audio, str):
+                cleanup.register_file(audio)
+            try:
+                result = transcriber.recognize(audio, result, start_time)
+            finally:
+                cleanup.cleanup()
+            self._write(output, index, url, result)
+
+    def _write(self, output, index, url, result):
+        line = {
+            'index': index,
+            'url': url,
+            'reel_id': result.get('reel_id', ''),
+            'success': result['success'],
+            'transcription': result.get('transcription', ''),
+            'language': result.get('language'),
+            'preset': result.get('preset'),
+            'error': result.get('error', ''),
+            'cached': result.get('cached', False),
+            'partial': result.get('partial', False),
+            'downloaded_bytes': result.get('downloaded_bytes'),
+            'processing_time': result.get('processing_time', 0.0),
+        }
+        with self._write_lock:
+            output.write(json.dumps(line, ensure_ascii=False) + "\n")
+            output.flush()
+            if result['success']:
+                self.succeeded += 1
+            else:
+                self.failed += 1
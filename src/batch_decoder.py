@@ -0,0 +1,366 @@
+"""
+Batch Decoder Module
+Runs 30 second Whisper windows from several requests through the model together
+"""
+
+import queue
+import threading
+import time
+import dataclasses
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from src.parallel_transcriber import split_at_silence
+from config import AUDIO_SAMPLE_RATE, BATCH_INFERENCE_MAX_SIZE, BATCH_INFERENCE_WAIT_MS
+
+# Windows are cut at a quiet spot within 5 seconds of this, so they always fit in Whisper's 30
+WINDOW_SECONDS = 25
+# Whisper timestamp tokens are 20 ms apart
+TIMESTAMP_SECONDS = 0.02
+# transcribe()'s defaults for retrying a window at the next temperature and for skipping silent ones
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+
+def fallback_temperatures(options):
+    # transcribe() takes a tuple of temperatures to retry at, decode() only one at a time
+    temperature = options.get('temperature', 0.0)
+    if isinstance(temperature, (list, tuple)):
+        return tuple(temperature)
+    return (temperature,)
+
+
+def decoding_options(options, temperature=None):
+    """
+    Turn transcribe()-style options into whisper DecodingOptions at one temperature
+    (the first fallback temperature unless one is given)
+
+    Windows can only share a batch when these come out the same.
+    """
+    from whisper.decoding import DecodingOptions
+    # Option names whisper.decode() understands
+    fields = {field.name for field in dataclasses.fields(DecodingOptions)}
+    kwargs = {key: value for key, value in options.items() if key in fields}
+    if options.get('initial_prompt'):
+        kwargs['prompt'] = options['initial_prompt']
+    kwargs['temperature'] = fallback_temperatures(options)[0] if temperature is None else temperature
+    # Like transcribe(): best_of is for sampling, beam search only at temperature 0
+    if kwargs.get('temperature', 0.0) == 0.0:
+        kwargs.pop('best_of', None)
+    else:
+        kwargs.pop('beam_size', None)
+        kwargs.pop('patience', None)
+    kwargs['fp16'] = False
+    return DecodingOptions(**kwargs)
+
+
+def _threshold(options, key, default):
+    # A threshold from the options, None turns the check off like in transcribe()
+    return options[key] if key in options else default
+
+
+def needs_fallback(result, options):
+    """
+    Whether a decoded window should be tried again at the next temperature,
+    the same checks transcribe() makes
+    """
+    compression_ratio_threshold = _threshold(options, 'compression_ratio_threshold', COMPRESSION_RATIO_THRESHOLD)
+    logprob_threshold = _threshold(options, 'logprob_threshold', LOGPROB_THRESHOLD)
+    no_speech_threshold = _threshold(options, 'no_speech_threshold', NO_SPEECH_THRESHOLD)
+    low_logprob = logprob_threshold is not None and result.avg_logprob < logprob_threshold
+    if no_speech_threshold is not None and result.no_speech_prob > no_speech_threshold and low_logprob:
+        return False  # Nobody talking, retrying won't help
+    too_repetitive = (compression_ratio_threshold is not None
+                      and result.compression_ratio > compression_ratio_threshold)
+    return too_repetitive or low_logprob
+
+
+def is_silent(result, options):
+    # Same rule transcribe() uses to throw away windows with nobody talking
+    logprob_threshold = _threshold(options, 'logprob_threshold', LOGPROB_THRESHOLD)
+    no_speech_threshold = _threshold(options, 'no_speech_threshold', NO_SPEECH_THRESHOLD)
+    if no_speech_threshold is None or result.no_speech_prob <= no_speech_threshold:
+        return False
+    return logprob_threshold is None or result.avg_logprob <= logprob_threshold
+
+
+def window_prompt(options, texts):
+    """
+    The end of the text so far as context for the next window, like Whisper does
+    between its own windows (None if the options decode each window on its own)
+    """
+    if not options.get('condition_on_previous_text', True):
+        return None
+    return " ".join(texts)[-200:] or options.get('initial_prompt')
+
+
+def parse_segments(tokenizer, tokens, window_seconds):
+    """
+    Split decoded tokens into segments using the timestamp tokens around each one
+
+    Whisper writes <|0.00|> text <|2.40|><|2.40|> more text <|5.00|> ...
+    Text after the last timestamp runs to the end of the window.
+    """
+    segments = []
+    start = 0.0
+    text_tokens = []
+    for token in tokens:
+        if token >= tokenizer.timestamp_begin:
+            seconds = (token - tokenizer.timestamp_begin) * TIMESTAMP_SECONDS
+            if text_tokens:
+                segments.append({'start': start, 'end': seconds, 'text': tokenizer.decode(text_tokens)})
+                text_tokens = []
+            start = seconds
+        else:
+            text_tokens.append(token)
+    if text_tokens:
+        segments.append({'start': start, 'end': window_seconds, 'text': tokenizer.decode(text_tokens)})
+    return segments
+
+
+class _Window:
+    # One mel window waiting for its turn in a batch
+    def __init__(self, mel, options, seconds):
+        self.mel = mel
+        # transcribe()-style options (for the thresholds), and DecodingOptions for each temperature left to try
+        self.transcribe_options = options
+        self.attempts = [decoding_options(options, temperature) for temperature in fallback_temperatures(options)]
+        self.seconds = seconds
+        self.future = Future()
+        # Set when the caller stops waiting, so a window back for a retry isn't decoded again
+        self.abandoned = False
+
+    @property
+    def options(self):
+        return self.attempts[0]
+
+
+class BatchDecoder:
+    """
+    Collects mel windows from every request for up to max_wait_ms, then runs
+    the encoder and decoder on all of them at once. One big matrix multiply
+    uses the CPU much better than several small ones.
+
+    Windows that fail transcribe()'s quality checks go back in the queue at the
+    next fallback temperature, so presets decode the same way they do unbatched.
+    """
+
+    def __init__(self, model_name, get_model, inference_lock=None,
+                 max_batch_size=BATCH_INFERENCE_MAX_SIZE, max_wait_ms=BATCH_INFERENCE_WAIT_MS):
+        """
+        Args:
+            model_name: Model spec, only used in log messages
+            get_model: Function returning the loaded whisper model (called for every batch,
+                       so the registry can swap it out between batches)
+            inference_lock: Lock held while the model runs, shared with unbatched callers
+            max_batch_size: Most windows decoded together
+            max_wait_ms: How long the first window waits for others to join it
+        """
+        self.model_name = model_name
+        self.get_model = get_model
+        self.inference_lock = inference_lock or threading.Lock()
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.stats = {'batches': 0, 'windows': 0, 'retries': 0, 'largest_batch': 0, 'decode_time': 0.0}
+
+    def transcribe(self, samples, options, time_budget=None):
+        """
+        Transcribe audio by cutting it into windows and decoding them in shared batches
+
+        With condition_on_previous_text each window needs the text before it as its
+        prompt, so they go in one at a time (still batched with other requests' windows
+        that have the same options). Otherwise they all go in at once.
+
+        Args:
+            samples: float32 mono samples
+            options: Decoding options (language, initial_prompt, temperature, ...)
+            time_budget: Seconds to wait for windows. After that the windows still
+                         waiting are dropped and the ones done so far are returned.
+
+        Returns:
+            Dictionary shaped like Whisper's result: text, segments and language,
+            plus 'timed_out' when it stopped early
+        """
+        import whisper
+        model = self.get_model()
+        self._start()
+        deadline = time.time() + time_budget if time_budget else None
+
+        def submit(piece, window_options):
+            # The mel is computed here, on the caller's thread, so the batch thread only runs the model
+            mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(piece), n_mels=model.dims.n_mels)
+            window = _Window(mel, window_options, len(piece) / AUDIO_SAMPLE_RATE)
+            self._queue.put(window)
+            return window
+
+        pieces = [(start / AUDIO_SAMPLE_RATE, samples[start:end])
+                  for start, end in split_at_silence(samples, chunk_seconds=WINDOW_SECONDS, overlap_seconds=0)]
+        conditioned = options.get('condition_on_previous_text', True)
+        windows = [] if conditioned else [submit(piece, options) for _, piece in pieces]
+
+        language = options.get('language')
+        texts = []
+        segments = []
+        languages = []
+        timed_out = False
+        for index, (offset, piece) in enumerate(pieces):
+            if conditioned:
+                # Later windows reuse the first one's language, like transcribe()
+                windows.append(submit(piece, {**options, 'language': language,
+                                              'initial_prompt': window_prompt(options, texts)}))
+            window = windows[index]
+            try:
+                timeout = max(0.0, deadline - time.time()) if deadline is not None else None
+                result = window.future.result(timeout=timeout)
+            except FutureTimeout:
+                # Keep the start of the audio, windows that haven't been batched yet are skipped
+                timed_out = True
+                for later in windows:
+                    later.abandoned = True
+                    later.future.cancel()
+                break
+            if conditioned:
+                language = language or result['language']
+            if not result['text']:
+                continue
+            texts.append(result['text'])
+            languages.append(result['language'])
+            for segment in result['segments']:
+                segments.append({
+                    'start': segment['start'] + offset,
+                    'end': segment['end'] + offset,
+                    'text': segment['text'],
+                })
+
+        return {
+            'text': " ".join(texts),
+            'segments': segments,
+            'language': max(set(languages), key=languages.count) if languages else None,
+            'timed_out': timed_out,
+        }
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                print(f"Starting batch decoder for {self.model_name} "
+                      f"(up to {self.max_batch_size} windows, {self.max_wait * 1000:.0f} ms wait)")
+                self._thread = threading.Thread(target=self._loop, name="batch-decoder", daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        # Block for one window, then take whatever else turns up before the deadline
+        batch = [self._queue.get()]
+        deadline = time.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    @staticmethod
+    def _wanted(window):
+        # Windows whose caller gave up are dropped, the rest can't be cancelled any more
+        if window.future.running():
+            # Back for a retry at the next temperature
+            return not window.abandoned
+        return window.future.set_running_or_notify_cancel()
+
+    def _loop(self):
+        while True:
+            batch = [window for window in self._collect() if self._wanted(window)]
+            # Windows with different options (language, prompt, ...) can't share a decode
+            groups = {}
+            for window in batch:
+                groups.setdefault(window.options, []).append(window)
+            for options, windows in groups.items():
+                if options.beam_size:
+                    # whisper's beam search only works on one window at a time
+                    # (a bigger batch crashes in its attention), so those go one by one
+                    for window in windows:
+                        self._decode(options, [window])
+                else:
+                    self._decode(options, windows)
+
+    def _decode(self, options, windows):
+        import torch
+        import whisper
+        try:
+            model = self.get_model()
+            mel = torch.stack([window.mel for window in windows]).to(model.device)
+            start_time = time.time()
+            with self.inference_lock, torch.no_grad():
+                results = whisper.decode(model, mel, options)
+            decode_time = time.time() - start_time
+
+            tokenizer = whisper.tokenizer.get_tokenizer(
+                model.is_multilingual, num_languages=model.num_languages, task=options.task
+            )
+            retries = 0
+            for window, result in zip(windows, results):
+                if len(window.attempts) > 1 and needs_fallback(result, window.transcribe_options):
+                    # Try again at the next temperature, in a later batch
+                    window.attempts.pop(0)
+                    self._queue.put(window)
+                    retries += 1
+                    continue
+                silent = is_silent(result, window.transcribe_options)
+                window.future.set_result({
+                    'text': "" if silent else result.text.strip(),
+                    'segments': [] if silent else parse_segments(tokenizer, result.tokens, window.seconds),
+                    'language': result.language,
+                })
+
+            with self._lock:
+                self.stats['batches'] += 1
+                self.stats['windows'] += len(windows)
+                self.stats['retries'] += retries
+                self.stats['largest_batch'] = max(self.stats['largest_batch'], len(windows))
+                self.stats['decode_time'] += decode_time
+        except Exception as e:
+            print(f"Batch decode failed: {e}")
+            for window in windows:
+                if not window.future.done():
+                    window.future.set_exception(e)
+
+    def get_stats(self):
+        with self._lock:
+            batches = self.stats['batches']
+            return {
+                'batches': batches,
+                'windows': self.stats['windows'],
+                'retries': self.stats['retries'],
+                'average_batch_size': round(self.stats['windows'] / batches, 2) if batches else 0,
+                'largest_batch': self.stats['largest_batch'],
+                'decode_time': round(self.stats['decode_time'], 2),
+                'waiting': self._queue.qsize(),
+            }
+
+
+# One batch decoder per model, shared by every request in the process
+_decoders = {}
+_decoders_lock = threading.Lock()
+
+
+def get_batch_decoder(model_name, registry):
+    """
+    Shared BatchDecoder for a model spec, taking its model from a ModelRegistry
+    """
+    with _decoders_lock:
+        if model_name not in _decoders:
+            _decoders[model_name] = BatchDecoder(
+                model_name,
+                lambda: registry.get(model_name),
+                inference_lock=registry.inference_lock(model_name),
+            )
+        return _decoders[model_name]
+
+
+def batch_decoder_stats():
+    with _decoders_lock:
+        return {name: decoder.get_stats() for name, decoder in _decoders.items()}
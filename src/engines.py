@@ -0,0 +1,328 @@
+"""
+Inference Engines Module
+Different ways of running Whisper, all returning the same result shape
+"""
+
+import time
+import wave
+from pathlib import Path
+from config import (
+    INFERENCE_ENGINE, CT2_COMPUTE_TYPE, CT2_CPU_THREADS, WHISPER_QUANTIZE, QUANTIZED_MODEL_DIR,
+    AUDIO_SAMPLE_RATE, STUB_ENGINE_ENABLED, STUB_ENGINE_RTF,
+)
+
+# Rough parameter counts, used when an engine can't tell us how big a model is
+MODEL_PARAMETERS = {
+    'tiny': 39_000_000,
+    'base': 74_000_000,
+    'small': 244_000_000,
+    'medium': 769_000_000,
+    'large': 1_550_000_000,
+}
+
+
+def parameter_count(model_name):
+    # "base.en" and "large-v3" count as "base" and "large"
+    return MODEL_PARAMETERS.get(model_name.split('.')[0].split('-')[0], 0)
+
+
+class InferenceEngine:
+    """
+    Base class for engines. An engine loads models and transcribes with them.
+
+    transcribe() always returns a dict like openai-whisper's:
+        {'text': str, 'segments': [{'start', 'end', 'text'}, ...], 'language': str}
+    """
+
+    name = ""
+    # Whether one loaded model can run several transcriptions at the same time
+    thread_safe = False
+
+    def load(self, model_name):
+        raise NotImplementedError
+
+    def transcribe(self, model, audio, options):
+        """
+        Args:
+            model: Whatever load() returned
+            audio: Path or float32 array of 16 kHz samples
+            options: Decoding options (language, initial_prompt, fp16, ...).
+                     Engines ignore the ones they don't support.
+        """
+        raise NotImplementedError
+
+    def model_size(self, model, model_name):
+        # Bytes of RAM the model takes, fp32 by default
+        return parameter_count(model_name) * 4
+
+    def set_threads(self, threads):
+        # CPU threads one transcription may use (parallel chunk workers split the cores)
+        pass
+
+
+class WhisperEngine(InferenceEngine):
+    """The original openai-whisper (PyTorch) engine"""
+
+    name = "whisper"
+    thread_safe = False  # It installs per-call hooks on the model
+
+    def load(self, model_name):
+        # Imported here, torch takes seconds to import and most commands never load a model
+        import whisper
+        return whisper.load_model(model_name)
+
+    def transcribe(self, model, audio, options):
+        result = model.transcribe(audio, verbose=False, **options)
+        return {
+            'text': result["text"],
+            'segments': [
+                {'start': s["start"], 'end': s["end"], 'text': s["text"]}
+                for s in result.get("segments", [])
+            ],
+            'language': result.get("language"),
+        }
+
+    def model_size(self, model, model_name):
+        # Every weight and buffer tensor in the model
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+
+    def set_threads(self, threads):
+        import torch
+        torch.set_num_threads(threads)
+
+
+class QuantizedWhisperEngine(WhisperEngine):
+    """
+    openai-whisper with dynamic int8 quantization of every Linear layer (CPU only).
+    The quantized weights are saved to disk so the conversion only happens once.
+    Only tensors are saved (no pickled code), and they're loaded with
+    weights_only=True into a freshly built and quantized model.
+    """
+
+    name = "whisper-int8"
+
+    def __init__(self, cache_dir=QUANTIZED_MODEL_DIR):
+        self.cache_dir = Path(cache_dir)
+
+    def cached_path(self, model_name):
+        # Packed int8 weights may change layout between torch versions
+        import torch
+        return self.cache_dir / f"{model_name}-int8-torch{torch.__version__}.state.pt"
+
+    def load(self, model_name):
+        import dataclasses
+        import torch
+        import whisper
+        path = self.cached_path(model_name)
+        if path.exists():
+            try:
+                print(f"Loading quantized model from {path}")
+                return self._load_cached(path, model_name)
+            except Exception as e:
+                print(f"Quantized model cache unreadable ({e}), converting again")
+
+        model = quantize_model(whisper.load_model(model_name, device="cpu"))
+
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temp file first so a crash never leaves half a model behind
+            temp_path = path.with_suffix(".tmp")
+            torch.save({'dims': dataclasses.asdict(model.dims), 'state_dict': model.state_dict()}, temp_path)
+            temp_path.replace(path)
+            print(f"Saved quantized model to {path}")
+        except Exception as e:
+            print(f"Could not save quantized model: {e}")
+
+        return model
+
+    def _load_cached(self, path, model_name):
+        # Same model shape, quantized the same way, then the saved int8 weights go in
+        import torch
+        import whisper
+        from whisper.model import ModelDimensions, Whisper
+        checkpoint = torch.load(path, map_location="cpu", weights_only=True)
+        model = quantize_model(Whisper(ModelDimensions(**checkpoint['dims'])))
+        model.load_state_dict(checkpoint['state_dict'])
+        # whisper.load_model sets these too, they aren't part of the saved state (word timestamps need them)
+        if model_name in whisper._ALIGNMENT_HEADS:
+            model.set_alignment_heads(whisper._ALIGNMENT_HEADS[model_name])
+        return model
+
+    def transcribe(self, model, audio, options):
+        # int8 kernels are CPU only, fp16 makes no sense here
+        return super().transcribe(model, audio, {**options, 'fp16': False})
+
+    def model_size(self, model, model_name):
+        # Quantized weights live in packed params, not in parameters()
+        import torch
+        size = super().model_size(model, model_name)
+        for module in model.modules():
+            if isinstance(module, torch.ao.nn.quantized.dynamic.Linear):
+                size += module.weight().numel()  # One byte per int8 weight
+        return size
+
+
+def quantize_model(model):
+    """
+    Apply dynamic int8 quantization to a Whisper model's Linear layers
+
+    Whisper uses its own Linear subclass (it only adds dtype casting), which
+    quantize_dynamic doesn't recognise, so those are turned back into plain
+    nn.Linear first.
+    """
+    import torch
+    model = model.cpu().eval()
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear) and type(module) is not torch.nn.Linear:
+            module.__class__ = torch.nn.Linear
+    start_size = sum(p.numel() * p.element_size() for p in model.parameters())
+    model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    print(f"Quantized model to int8 ({start_size / 1024 / 1024:.0f} MB of fp32 weights before)")
+    return model
+
+
+class CTranslate2Engine(InferenceEngine):
+    """
+    CTranslate2 engine through faster-whisper, int8 on CPU by default.
+    Much faster than PyTorch fp32 on machines without a GPU.
+    """
+
+    name = "ct2"
+    thread_safe = True
+
+    # Options faster-whisper understands (it has no fp16 flag, compute_type covers that)
+    SUPPORTED_OPTIONS = [
+        'language', 'initial_prompt', 'temperature', 'beam_size', 'best_of', 'patience',
+        'condition_on_previous_text', 'compression_ratio_threshold', 'no_speech_threshold',
+    ]
+
+    def __init__(self, compute_type=CT2_COMPUTE_TYPE, cpu_threads=CT2_CPU_THREADS):
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+
+    def load(self, model_name):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            raise RuntimeError("The ct2 engine needs faster-whisper: pip install faster-whisper")
+        return WhisperModel(model_name, device="cpu", compute_type=self.compute_type,
+                            cpu_threads=self.cpu_threads)
+
+    def transcribe(self, model, audio, options):
+        kwargs = {key: value for key, value in options.items() if key in self.SUPPORTED_OPTIONS}
+        # No beam size means greedy in openai-whisper, faster-whisper would use 5
+        kwargs.setdefault('beam_size', 1)
+        if 'logprob_threshold' in options:
+            kwargs['log_prob_threshold'] = options['logprob_threshold']
+        # Segments come back lazily, decoding happens as we go through them
+        segments, info = model.transcribe(audio, **kwargs)
+        segments = [{'start': s.start, 'end': s.end, 'text': s.text} for s in segments]
+        return {
+            'text': "".join(s['text'] for s in segments),
+            'segments': segments,
+            'language': info.language,
+        }
+
+    def model_size(self, model, model_name):
+        bytes_per_weight = {'int8': 1, 'int8_float32': 1, 'float16': 2}.get(self.compute_type, 4)
+        return parameter_count(model_name) * bytes_per_weight
+
+    def set_threads(self, threads):
+        # Only affects models loaded after this
+        self.cpu_threads = threads
+
+
+class StubEngine(InferenceEngine):
+    """
+    Load testing stand-in: no model, just waits as long as a model would take
+    (STUB_ENGINE_RTF seconds per second of audio) and returns fixed text
+    """
+
+    name = "stub"
+    thread_safe = True
+
+    def __init__(self, rtf=STUB_ENGINE_RTF):
+        self.rtf = rtf
+
+    def load(self, model_name):
+        return f"stub:{model_name}"
+
+    def transcribe(self, model, audio, options):
+        if isinstance(audio, (str, Path)):
+            with wave.open(str(audio), 'rb') as f:
+                seconds = f.getnframes() / f.getframerate()
+        else:
+            seconds = len(audio) / AUDIO_SAMPLE_RATE
+        time.sleep(seconds * self.rtf)
+        text = f"Stub transcription of {seconds:.1f} seconds of audio."
+        return {
+            'text': text,
+            'segments': [{'start': 0.0, 'end': seconds, 'text': text}],
+            'language': options.get('language') or "en",
+        }
+
+    def model_size(self, model, model_name):
+        return 0
+
+
+ENGINES = {
+    'whisper': WhisperEngine,
+    'whisper-int8': QuantizedWhisperEngine,
+    'ct2': CTranslate2Engine,
+}
+# Never available unless asked for, so a request can't skip real transcription by accident
+if STUB_ENGINE_ENABLED:
+    ENGINES['stub'] = StubEngine
+
+_engine_instances = {}
+
+
+def get_engine(name):
+    if name not in ENGINES:
+        raise ValueError(f"Unknown engine: {name} (choose from {', '.join(ENGINES)})")
+    if name not in _engine_instances:
+        _engine_instances[name] = ENGINES[name]()
+    return _engine_instances[name]
+
+
+def parse_model_spec(spec):
+    """
+    Split a model spec into engine and model name
+
+    "base" uses the default engine (INFERENCE_ENGINE, or whisper-int8 when
+    WHISPER_QUANTIZE is on), "ct2:small" picks one.
+
+    Returns:
+        Tuple of (engine_name, model_name)
+    """
+    if ':' in spec:
+        engine_name, model_name = spec.split(':', 1)
+        return engine_name, model_name
+    if WHISPER_QUANTIZE and INFERENCE_ENGINE == "whisper":
+        return "whisper-int8", spec
+    return INFERENCE_ENGINE, spec
+
+
+def quantized_spec(spec):
+    # Switch a PyTorch Whisper spec to its int8 version ("base" -> "whisper-int8:base")
+    engine_name, model_name = parse_model_spec(spec)
+    if engine_name == "whisper":
+        engine_name = "whisper-int8"
+    return f"{engine_name}:{model_name}"
+
+
+def normalize_model_spec(spec):
+    # Always "engine:model", so "base" and "whisper:base" are the same thing
+    engine_name, model_name = parse_model_spec(spec)
+    return f"{engine_name}:{model_name}"
+
+
+def load_model(spec):
+    engine_name, model_name = parse_model_spec(spec)
+    return get_engine(engine_name).load(model_name)
+
+
+def model_size(spec, model):
+    engine_name, model_name = parse_model_spec(spec)
+    return get_engine(engine_name).model_size(model, model_name)
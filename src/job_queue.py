@@ -0,0 +1,430 @@
+"""
+Job Queue Module
+Runs transcriptions on a pool of background workers so the API never blocks
+"""
+
+import heapq
+import itertools
+import math
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from config import (
+    JOB_WORKERS, JOB_RESULT_TTL, JOB_QUEUE_MAX, JOB_MAX_PER_CLIENT, SCHEDULER_AGING_RATE, PROBE_WORKERS,
+)
+
+# Every state a job can be in, in the order it normally moves through them
+JOB_STATES = ['queued', 'validating', 'downloading', 'transcribing', 'done', 'failed', 'cancelled']
+
+# The drain rate is measured over jobs finished in this many seconds
+DRAIN_WINDOW_SECONDS = 120
+# Retry-After bounds, and the guess before any job has finished
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 300
+DEFAULT_RETRY_AFTER = 10
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job once nobody wants its result any more"""
+
+
+class QueueFull(Exception):
+    """Raised by submit() when a job can't be admitted right now"""
+
+    def __init__(self, message, reason, retry_after):
+        super().__init__(message)
+        # "queue_full" or "client_limit"
+        self.reason = reason
+        # Seconds until there's likely room again
+        self.retry_after = retry_after
+
+
+class Job:
+    """One transcription request and everything we know about it"""
+
+    def __init__(self, url, model_name, streaming=False, listener=None, options=None, client=None):
+        self.id = uuid.uuid4().hex
+        self.url = url
+        self.model_name = model_name
+        # Who asked (usually their IP), for per-client limits
+        self.client = client
+        # Extra transcription settings from the request, like {'language': 'en'}
+        self.options = options or {}
+        # Streaming jobs report each segment as soon as Whisper decodes it
+        self.streaming = streaming
+        self.state = 'queued'
+        self.segments = []
+        self.result = None
+        self.error = ''
+        self.cancelled = False
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # Filled in by the scheduler: reel length, expected seconds of work, and
+        # the metadata it fetched to find out (so the download can reuse it)
+        self.duration = None
+        self.expected_cost = None
+        self.media_info = None
+        self.future = None
+        # Optional callback (event, data) for 'stage', 'segment' and 'result' events
+        self.listener = listener
+        # Duplicate jobs waiting on this one's run instead of doing their own
+        self.followers = []
+
+    def set_state(self, state):
+        self._check_cancelled()
+        self.state = state
+        self.emit('stage', {'stage': state})
+        for follower in list(self.followers):
+            follower.state = state
+            follower.emit('stage', {'stage': state})
+
+    def add_segment(self, segment):
+        self._check_cancelled()
+        self.segments.append(segment)
+        self.emit('segment', segment)
+
+    def cancel(self):
+        # Stops the job at its next progress update (or before it starts)
+        self.cancelled = True
+        if self.future is not None:
+            self.future.cancel()
+
+    def emit(self, event, data):
+        if self.listener is None:
+            return
+        try:
+            self.listener(event, data)
+        except Exception as e:
+            print(f"Job listener failed: {e}")
+
+    def _check_cancelled(self):
+        if self.cancelled:
+            raise JobCancelled("Job was cancelled")
+
+
+class JobManager:
+    """
+    Queues jobs and runs them on a fixed number of worker threads
+
+    Scheduling: with an estimate_cost function, waiting jobs run cheapest first
+    (shortest job first) instead of in arrival order. Every second a job waits
+    takes aging_rate seconds off its cost, so long reels still get their turn.
+    Without one, jobs run in the order they came in.
+
+    Admission control: at most max_queued jobs wait for a worker, and one client
+    can have at most max_per_client jobs queued or running. Anything more gets
+    QueueFull, with a retry time based on how fast the queue is draining.
+
+    Coalescing: with a coalesce_key function, a job with the same key as one
+    that's queued or running waits for that job's result instead of being
+    queued itself. It never takes a worker, a cost estimate or a queue spot.
+    """
+
+    def __init__(self, run_job, workers=JOB_WORKERS, result_ttl=JOB_RESULT_TTL,
+                 max_queued=JOB_QUEUE_MAX, max_per_client=JOB_MAX_PER_CLIENT,
+                 estimate_cost=None, aging_rate=SCHEDULER_AGING_RATE, probe_workers=PROBE_WORKERS,
+                 coalesce_key=None):
+        """
+        Args:
+            run_job: Function (job) -> result dict that does the actual work.
+                     It can call job.set_state() to report progress.
+            workers: How many jobs can run at the same time
+            result_ttl: Seconds to keep finished jobs around for polling
+            max_queued: Jobs allowed to wait for a worker (0 = no limit)
+            max_per_client: Unfinished jobs allowed per client (0 = no limit)
+            estimate_cost: Optional function (job) -> expected seconds of work.
+                           It may do network calls, it runs on its own threads.
+            aging_rate: Seconds of cost forgiven per second spent waiting
+            probe_workers: Threads running estimate_cost
+            coalesce_key: Optional function (job) -> hashable key, or None for jobs
+                          that have to run on their own
+        """
+        self.run_job = run_job
+        self.workers = workers
+        self.result_ttl = result_ttl
+        self.max_queued = max_queued
+        self.max_per_client = max_per_client
+        self.estimate_cost = estimate_cost
+        self.aging_rate = aging_rate
+        self.probe_executor = (ThreadPoolExecutor(max_workers=probe_workers, thread_name_prefix="job-probe")
+                               if estimate_cost else None)
+        self.coalesce_key = coalesce_key
+        # Unfinished jobs by coalesce key, duplicates attach to these
+        self._leaders = {}
+        self.coalesced = 0
+        # Jobs ready to run as (priority, sequence, job), lowest priority first
+        self._ready = []
+        self._sequence = itertools.count()
+        self._running = 0
+        self._stopping = False
+        self.jobs = {}
+        # Jobs that are queued or running, by id
+        self._active = {}
+        # When recent jobs finished, for the drain rate
+        self._finish_times = deque()
+        self.rejected = {'queue_full': 0, 'client_limit': 0}
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._ready_changed = threading.Condition(self._lock)
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"transcribe-worker_{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, url, model_name, streaming=False, listener=None, options=None, client=None):
+        """
+        Queue a new job
+
+        Args:
+            url: Reel URL
+            model_name: Whisper model name
+            streaming: Transcribe while downloading and report segments as they come
+            listener: Optional callback (event, data) for progress events
+            options: Extra transcription settings passed through to run_job
+            client: Who's asking, like an IP address (None skips the per-client limit)
+
+        Returns:
+            The queued Job (its future resolves to the result dict)
+
+        Raises:
+            QueueFull: The queue or the client's share of it is full
+        """
+        self._prune()
+        job = Job(url, model_name, streaming=streaming, listener=listener, options=options, client=client)
+        job.future = Future()
+        key = self.coalesce_key(job) if self.coalesce_key else None
+        with self._lock:
+            leader = self._leaders.get(key) if key is not None else None
+            if leader is not None:
+                # Same work is already queued or running, wait for its result
+                job.state = leader.state
+                leader.followers.append(job)
+                self.jobs[job.id] = job
+                self.coalesced += 1
+                return job
+            self._admit(client)
+            if key is not None:
+                self._leaders[key] = job
+            self.jobs[job.id] = job
+            self._active[job.id] = job
+            # With a worker free and nobody waiting there's nothing to order, so skip the estimate
+            idle = self.workers - self._running - len(self._ready) > 0
+            needs_estimate = self.estimate_cost is not None and not idle
+            if not needs_estimate:
+                self._enqueue(job)
+        job.future.add_done_callback(lambda future: self._finished(job, key))
+        if needs_estimate:
+            self.probe_executor.submit(self._estimate, job)
+        return job
+
+    def _estimate(self, job):
+        # Runs on a probe thread, then hands the job to the workers
+        if job.future.cancelled():
+            return
+        try:
+            job.expected_cost = self.estimate_cost(job)
+        except Exception as e:
+            print(f"Could not estimate job {job.id}: {e}")
+        with self._lock:
+            self._enqueue(job)
+
+    def _enqueue(self, job):
+        # Called with the lock held. Aging subtracts aging_rate * waited from the cost, and
+        # waited = now - queued_at, so ordering by cost + aging_rate * queued_at is the same
+        # ordering at any moment without ever re-sorting
+        cost = job.expected_cost or 0.0
+        priority = cost + self.aging_rate * job.created_at
+        heapq.heappush(self._ready, (priority, next(self._sequence), job))
+        self._ready_changed.notify()
+
+    def _worker(self):
+        while True:
+            with self._lock:
+                while not self._ready and not self._stopping:
+                    self._ready_changed.wait()
+                if self._stopping:
+                    return
+                _, _, job = heapq.heappop(self._ready)
+                self._running += 1
+            try:
+                # False if the job was cancelled while it waited
+                if job.future.set_running_or_notify_cancel():
+                    try:
+                        job.future.set_result(self._run(job))
+                    except BaseException as e:
+                        job.future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+    def _admit(self, client):
+        # Called with the lock held, raises QueueFull if the job has to be turned away
+        queued = self._queued_count()
+        if self.max_queued and queued >= self.max_queued:
+            self.rejected['queue_full'] += 1
+            # The queue needs to drain by this many before there's a free spot
+            retry_after = self._retry_after(queued - self.max_queued + 1)
+            raise QueueFull(f"Server busy: {queued} jobs waiting", 'queue_full', retry_after)
+
+        if self.max_per_client and client is not None:
+            mine = sum(1 for job in self._active.values() if job.client == client)
+            if mine >= self.max_per_client:
+                self.rejected['client_limit'] += 1
+                raise QueueFull(f"Too many jobs: {mine} still running for this client", 'client_limit',
+                                self._retry_after(1))
+
+    def _queued_count(self):
+        # Only jobs that do their own work, duplicates waiting on another job aren't in _active
+        return sum(1 for job in self._active.values() if job.started_at is None)
+
+    def queue_depth(self):
+        """
+        Jobs waiting for a worker, the number admission checks against max_queued
+        """
+        with self._lock:
+            return self._queued_count()
+
+    def in_flight(self):
+        """
+        Jobs being validated, downloaded or transcribed, not counting duplicates sharing their run
+        """
+        with self._lock:
+            return sum(1 for job in self._active.values() if job.started_at is not None)
+
+    def _finished(self, job, key=None):
+        # Runs when a job's future completes, including jobs cancelled before they started
+        with self._lock:
+            self._active.pop(job.id, None)
+            if key is not None and self._leaders.get(key) is job:
+                del self._leaders[key]
+            # No one can attach any more once the leader is gone from _leaders
+            followers = list(job.followers)
+            if job.started_at is None:
+                job.state = 'cancelled'
+                job.error = job.error or "Cancelled"
+                job.finished_at = time.time()
+            else:
+                self._finish_times.append(time.time())
+        if followers:
+            print(f"Shared one run with {len(followers)} other request(s)")
+        for follower in followers:
+            self._finish_follower(follower, job)
+
+    def _finish_follower(self, follower, leader):
+        # Give a duplicate job the leader's outcome (its own copy of the result)
+        follower.state = leader.state
+        follower.error = leader.error
+        follower.started_at = leader.started_at
+        follower.finished_at = time.time()
+        if leader.future.cancelled():
+            # Never ran (server shutting down), so neither does the duplicate
+            follower.state = 'cancelled'
+            follower.error = "Cancelled"
+            follower.future.cancel()
+            return
+        if not follower.future.set_running_or_notify_cancel():
+            return  # Its caller gave up already
+        if leader.future.exception() is not None:
+            follower.future.set_exception(leader.future.exception())
+        else:
+            result = leader.future.result()
+            follower.result = dict(result) if isinstance(result, dict) else result
+            follower.future.set_result(follower.result)
+        follower.emit('result', {'state': follower.state, 'result': follower.result, 'error': follower.error})
+
+    def drain_rate(self):
+        """
+        Jobs finished per second lately (0.0 if nothing has finished yet)
+        """
+        with self._lock:
+            return self._drain_rate()
+
+    def _drain_rate(self):
+        now = time.time()
+        while self._finish_times and self._finish_times[0] < now - DRAIN_WINDOW_SECONDS:
+            self._finish_times.popleft()
+        # A server that just started hasn't had the whole window to finish jobs in
+        window = min(DRAIN_WINDOW_SECONDS, now - self.started_at)
+        if not self._finish_times or window <= 0:
+            return 0.0
+        return len(self._finish_times) / window
+
+    def _retry_after(self, jobs_to_drain):
+        # Seconds until this many more jobs have likely finished, as a whole number
+        rate = self._drain_rate()
+        if rate <= 0:
+            return DEFAULT_RETRY_AFTER
+        return max(MIN_RETRY_AFTER, min(MAX_RETRY_AFTER, math.ceil(jobs_to_drain / rate)))
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def _run(self, job):
+        job.started_at = time.time()
+        try:
+            result = self.run_job(job)
+            job.result = result
+            if job.cancelled:
+                job.error = "Cancelled"
+                job.state = 'cancelled'
+            elif result.get('success'):
+                job.state = 'done'
+            else:
+                job.error = result.get('error', "Unknown error occurred")
+                job.state = 'failed'
+            return result
+        except Exception as e:
+            job.error = f"Server error: {str(e)}"
+            job.state = 'cancelled' if job.cancelled else 'failed'
+            raise
+        finally:
+            job.finished_at = time.time()
+            # Always finish with a result event so listeners know to stop waiting
+            job.emit('result', {'state': job.state, 'result': job.result, 'error': job.error})
+
+    def _prune(self):
+        # Forget finished jobs nobody has asked about for a while
+        cutoff = time.time() - self.result_ttl
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self.jobs.items()
+                if job.finished_at is not None and job.finished_at < cutoff
+            ]
+            for job_id in expired:
+                del self.jobs[job_id]
+
+    def get_stats(self):
+        with self._lock:
+            counts = {state: 0 for state in JOB_STATES}
+            for job in self.jobs.values():
+                counts[job.state] += 1
+            return {
+                'workers': self.workers,
+                'jobs': counts,
+                'scheduler': 'shortest-job-first' if self.estimate_cost else 'fifo',
+                'running': self._running,
+                'queue_depth': self._queued_count(),
+                'queue_max': self.max_queued,
+                'max_per_client': self.max_per_client,
+                'drain_rate': round(self._drain_rate(), 4),
+                'rejected': dict(self.rejected),
+                'coalesced': self.coalesced,
+            }
+
+    def shutdown(self):
+        # Workers finish what they're running, anything still waiting is cancelled
+        with self._lock:
+            self._stopping = True
+            waiting = [job for job in self._active.values() if job.started_at is None]
+            self._ready.clear()
+            self._ready_changed.notify_all()
+        if self.probe_executor is not None:
+            self.probe_executor.shutdown(wait=False, cancel_futures=True)
+        for job in waiting:
+            job.future.cancel()
@@ -6,6 +6,7 @@ Main application orchestrator
 import sys
 import time
 import argparse
+from collections.abc import Iterator
 from pathlib import Path
 
 # Add parent directory to path for imports
@@ -14,9 +15,16 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from src.url_validator import URLValidator
 from src.media_extractor import MediaExtractor
 from src.speech_recognizer import SpeechRecognizer
+from src import metrics
+from src.profiler import RequestProfiler
 from src.cleanup_manager import auto_cleanup
 # robust downloader import happens dynamically to avoid circular deps or unnecessary imports
-from config import WHISPER_MODEL
+from src.transcript_cache import TranscriptCache, audio_hash
+from src.engines import quantized_spec
+from config import (
+    WHISPER_MODEL, INFERENCE_ENGINE, WHISPER_QUANTIZE, TRANSCRIPT_CACHE_ENABLED, DECODING_PRESETS, DECODING_PRESET, AUDIO_PIPELINE, PARALLEL_TRANSCRIPTION,
+    BATCH_DOWNLOAD_WORKERS, BATCH_TRANSCRIBE_WORKERS, BATCH_QUEUE_SIZE,
+)
 
 
 # Helper to download the model if it fails
@@ -33,89 +41,60 @@ def download_model_if_needed(model_name):
         return False
 
 class InstaTranscriber:
-    def __init__(self, model_name="base"):
+    def __init__(self, model_name="base", registry=None, cache=None, language=None, preset=None,
+                 profile=False):
         # Set up all our tools
         self.validator = URLValidator()
         self.extractor = MediaExtractor()
-        self.recognizer = SpeechRecognizer(model_name)
+        # Pass a ModelRegistry to reuse models that are already loaded
+        # language is a hint like "en" (None = detect it, or reuse what we detected last time)
+        # preset is fast, balanced or accurate (None = DECODING_PRESET)
+        self.recognizer = SpeechRecognizer(model_name, registry=registry, language=language, preset=preset)
+        # Pass a TranscriptCache to skip reels we've already done
+        self.cache = cache
         self.model_name = model_name
+        self.extractor_mode = AUDIO_PIPELINE
+        # Run every transcription under cProfile and save it to PROFILE_DIR
+        self.profile = profile
     
-    def transcribe_reel(self, url):
-        # Dictionary to store all our results
-        result = {
-            'success': False,
-            'transcription': '',
-            'reel_id': '',
-            'processing_time': 0.0,
-            'error': ''
-        }
-        
+    def transcribe_reel(self, url, on_stage=None, on_segment=None, media_info=None):
+        # on_stage gets called with 'validating', 'downloading' and 'transcribing'
+        # so callers (like the job queue) can report progress.
+        # on_segment gets each piece of text as it's decoded (AUDIO_PIPELINE=stream only)
+        # media_info is the reel's metadata if the caller already fetched it (MediaExtractor.probe)
+        if not self.profile:
+            return self._transcribe_reel(url, on_stage, on_segment, media_info)
+
+        profiler = RequestProfiler()
+        with profiler:
+            result = self._transcribe_reel(url, on_stage, on_segment, media_info)
+        result['profile'] = profiler.save(result.get('reel_id') or self.validator.extract_reel_id(url))
+        return result
+
+    def _transcribe_reel(self, url, on_stage=None, on_segment=None, media_info=None):
+        report_stage = on_stage or (lambda stage: None)
+
+        result = self.new_result()
         start_time = time.time()
+
+        # 0. Already done this one? Then skip the download and Whisper entirely
+        if self.load_from_cache(url, result, start_time):
+            return result
         
         # This auto_cleanup thing helps delete files later
         with auto_cleanup() as cleanup:
             try:
-                # 1. Check if the URL is good
-                print("\n" + "="*60)
-                print("STEP 1: Checking URL")
-                print("="*60)
-                
-                is_valid, reel_id, error = self.validator.validate(url)
-                if not is_valid:
-                    result['error'] = f"Bad URL: {error}"
+                # 1 + 2. Check the URL and get the audio
+                audio = self.fetch_audio(url, result, report_stage, media_info)
+                if audio is None:
                     return result
                 
-                result['reel_id'] = reel_id
-                print(f"URL is good! ID: {reel_id}")
-                
-                # 2. Get the audio from the video
-                print("\n" + "="*60)
-                print("STEP 2: Getting Audio")
-                print("="*60)
-                
-                success, audio_path, error = self.extractor.extract_audio(url, reel_id)
-                if not success:
-                    result['error'] = f"Could not get audio: {error}"
-                    return result
-                
-                # Remember this file so we can delete it later
-                cleanup.register_file(audio_path)
+                # Remember this file so we can delete it later (in-memory audio has no file)
+                if isinstance(audio, str):
+                    cleanup.register_file(audio)
                 
                 # 3. Convert speech to text
-                try:
-                    print("\n" + "="*60)
-                    print("STEP 3: Converting to Text")
-                    print("="*60)
-                    
-                    # Try to transcribe
-                    success, transcription, proc_time, error = self.recognizer.transcribe(audio_path)
-                    
-                    # If it failed because of the model, try downloading it again
-                    if not success and "Failed to load Whisper model" in error:
-                        print("\nModel load failed. Trying to download it properly...")
-                        
-                        if download_model_if_needed(self.model_name):
-                            # Reset the model and try again
-                            self.recognizer.model = None
-                            success, transcription, proc_time, error = self.recognizer.transcribe(audio_path)
-                        else:
-                            result['error'] = "Model download failed."
-                            return result
-
-                    if not success:
-                        result['error'] = f"Transcription broke: {error}"
-                        return result
-                    
-                    # It worked!
-                    result['success'] = True
-                    result['transcription'] = transcription
-                    result['processing_time'] = time.time() - start_time
-                    
-                    return result
-
-                except Exception as e:
-                     result['error'] = f"Something went wrong: {str(e)}"
-                     return result
+                return self.recognize(audio, result, start_time, report_stage, on_segment)
                 
             except KeyboardInterrupt:
                 result['error'] = "Stopped by user"
@@ -124,6 +103,230 @@ class InstaTranscriber:
                result['error'] = f"Unexpected error: {str(e)}"
                return result
 
+    def new_result(self):
+        # Dictionary to store all our results
+        return {
+            'success': False,
+            'transcription': '',
+            'reel_id': '',
+            'processing_time': 0.0,
+            'cached': False,
+            # Reel length from its metadata, and whether transcription ran out of time
+            # (TRANSCRIPTION_TIME_MULTIPLIER) so the text only covers the start of it
+            'duration': None,
+            'partial': False,
+            # Media bytes fetched for this reel (estimated from the metadata when streaming)
+            'downloaded_bytes': None,
+            'language': None,
+            'preset': self.recognizer.preset,
+            'error': ''
+        }
+
+    def load_from_cache(self, url, result, start_time):
+        # Fills in result and returns True if we already have this reel
+        cached = self._check_cache(url)
+        if cached is None:
+            return False
+        result['success'] = True
+        result['transcription'] = cached
+        result['reel_id'] = self.validator.extract_reel_id(url)
+        result['cached'] = True
+        result['language'] = self.recognizer.language or self._cached_language(result['reel_id'])
+        result['processing_time'] = time.time() - start_time
+        print(f"Found in cache! ID: {result['reel_id']}")
+        return True
+
+    def fetch_audio(self, url, result, report_stage=None, media_info=None):
+        """
+        Steps 1 and 2: check the URL and download the audio
+
+        The reel's metadata is checked first (or media_info, if given) and reels
+        longer than MAX_VIDEO_DURATION are turned down before any media is fetched.
+
+        Returns:
+            Path to a WAV file or a NumPy array of samples (depending on AUDIO_PIPELINE),
+            or None (with result['error'] set) if it failed.
+            The caller is responsible for deleting the file.
+        """
+        report_stage = report_stage or (lambda stage: None)
+
+        # 1. Check if the URL is good
+        print("\n" + "="*60)
+        print("STEP 1: Checking URL")
+        print("="*60)
+        report_stage('validating')
+        
+        with metrics.stage_seconds.time(stage='validate'):
+            is_valid, reel_id, error = self.validator.validate(url)
+        if not is_valid:
+            result['error'] = f"Bad URL: {error}"
+            return None
+        
+        result['reel_id'] = reel_id
+        print(f"URL is good! ID: {reel_id}")
+        
+        # 2. Get the audio from the video
+        print("\n" + "="*60)
+        print("STEP 2: Getting Audio")
+        print("="*60)
+        report_stage('downloading')
+
+        if media_info is None:
+            success, media_info, error = self.extractor.probe(url, reel_id)
+            if not success:
+                result['error'] = f"Could not get audio: {error}"
+                return None
+        ok, error = self.extractor.check_duration(media_info)
+        if not ok:
+            result['error'] = error
+            return None
+        result['duration'] = media_info.get('duration')
+        
+        success, audio, error = self.extractor.extract(url, reel_id, mode=self.extractor_mode, info=media_info)
+        if not success:
+            result['error'] = f"Could not get audio: {error}"
+            return None
+        result['downloaded_bytes'] = self.extractor.last_downloaded_bytes
+
+        return audio
+
+    def recognize(self, audio, result, start_time, report_stage=None, on_segment=None):
+        """
+        Step 3: turn the downloaded audio into text
+
+        Returns:
+            The result dictionary, filled in
+        """
+        report_stage = report_stage or (lambda stage: None)
+        try:
+            print("\n" + "="*60)
+            print("STEP 3: Converting to Text")
+            print("="*60)
+            report_stage('transcribing')
+
+            # Seen this reel (or this audio) before? Then skip language detection
+            audio_key = self._recall_language(result['reel_id'], audio)
+            
+            # Try to transcribe
+            success, transcription, proc_time, error = self._run_recognizer(audio, on_segment, result['duration'])
+            
+            # If it failed because of the model, try downloading it again
+            # (the resumable downloader only knows the openai-whisper checkpoints)
+            if (not success and "Failed to load Whisper model" in error
+                    and self.recognizer.engine.name in ("whisper", "whisper-int8")):
+                print("\nModel load failed. Trying to download it properly...")
+                
+                if download_model_if_needed(self.recognizer.base_model_name):
+                    # Reset the model and try again
+                    self.recognizer.model = None
+                    success, transcription, proc_time, error = self._run_recognizer(
+                        audio, on_segment, result['duration'])
+                else:
+                    result['error'] = "Model download failed."
+                    return result
+
+            if not success:
+                result['error'] = f"Transcription broke: {error}"
+                return result
+            
+            # It worked!
+            result['success'] = True
+            result['transcription'] = transcription
+            result['processing_time'] = time.time() - start_time
+            result['language'] = self.recognizer.detected_language
+            result['partial'] = self.recognizer.timed_out
+
+            # Only complete transcriptions are worth keeping
+            if not result['partial']:
+                self._save_to_cache(result['reel_id'], transcription)
+            self._remember_language(result['reel_id'], audio_key)
+            
+            return result
+
+        except Exception as e:
+             result['error'] = f"Something went wrong: {str(e)}"
+             return result
+
+    def _run_recognizer(self, audio, on_segment=None, duration=None):
+        # Streams come in as a generator of windows, everything else in one piece
+        if isinstance(audio, Iterator):
+            return self.recognizer.transcribe_stream(audio, on_segment=on_segment, expected_duration=duration)
+        return self.recognizer.transcribe(audio, expected_duration=duration)
+
+    def _cache_options(self):
+        # Windowed streaming decodes a little differently, so cache it separately
+        options = self.recognizer.cache_options()
+        if self.extractor_mode == "stream":
+            options['streaming'] = True
+        return options
+
+    def _cached_language(self, reel_id, audio_key=None):
+        if self.cache is None:
+            return None
+        try:
+            return self.cache.get_language(reel_id, audio_key)
+        except Exception as e:
+            print(f"Language lookup failed: {e}")
+            return None
+
+    def _recall_language(self, reel_id, audio):
+        """
+        Use a language detected in an earlier run when the caller didn't give one
+
+        Returns:
+            The audio hash (saved with the detected language later), or None
+        """
+        # The recognizer is reused across reels (batch mode), so don't let the last reel's language stick
+        self.recognizer.known_language = None
+        if self.cache is None or self.recognizer.language:
+            return None
+        try:
+            audio_key = audio_hash(audio)
+        except Exception as e:
+            print(f"Could not hash audio: {e}")
+            audio_key = None
+        language = self._cached_language(reel_id, audio_key)
+        if language:
+            print(f"Language known from an earlier run: {language}")
+            self.recognizer.known_language = language
+        return audio_key
+
+    def _remember_language(self, reel_id, audio_key):
+        # Only languages Whisper detected itself, a caller's hint might be wrong
+        language = self.recognizer.detected_language
+        if self.cache is None or self.recognizer.language or not language:
+            return
+        try:
+            self.cache.put_language(language, reel_id, audio_key)
+        except Exception as e:
+            print(f"Could not save language: {e}")
+
+    def cache_settings(self):
+        # Model spec and options this transcriber's results are cached under
+        return self.recognizer.model_spec, self._cache_options()
+
+    def _check_cache(self, url):
+        # Only needs the reel ID from the URL, so no network calls here
+        if self.cache is None:
+            return None
+        reel_id = self.validator.extract_reel_id(url)
+        if not reel_id:
+            return None
+        try:
+            return self.cache.get(reel_id, self.recognizer.model_spec, self._cache_options())
+        except Exception as e:
+            print(f"Cache lookup failed: {e}")
+            return None
+
+    def _save_to_cache(self, reel_id, transcription):
+        # A broken cache shouldn't break a transcription that worked
+        if self.cache is None:
+            return
+        try:
+            self.cache.put(reel_id, self.recognizer.model_spec, transcription, self._cache_options())
+        except Exception as e:
+            print(f"Could not save to cache: {e}")
+
 
 def print_banner():
     """Print application banner"""
@@ -142,6 +345,16 @@ def print_result(result: dict):
         print(f"✓ Transcription completed successfully!")
         print(f"\nReel ID: {result['reel_id']}")
         print(f"Processing Time: {result['processing_time']:.2f} seconds")
+        if result.get('language'):
+            print(f"Language: {result['language']}")
+        if result.get('preset'):
+            print(f"Preset: {result['preset']}")
+        if result.get('downloaded_bytes'):
+            print(f"Downloaded: {result['downloaded_bytes'] / 1024:.0f} KB")
+        if result.get('cached'):
+            print("(Served from cache)")
+        if result.get('partial'):
+            print("(Partial: ran out of time, this only covers the start of the reel)")
         print("\n" + "-"*60)
         print("TRANSCRIPTION:")
         print("-"*60)
@@ -150,31 +363,130 @@ def print_result(result: dict):
     else:
         print(f"✗ Transcription failed")
         print(f"\nError: {result['error']}")
+
+    if result.get('profile'):
+        print(f"\nProfile: {result['profile']}")
     
     print()
 
 
+def make_transcriber(args, cache):
+    # InstaTranscriber set up from the command line options
+    model_spec = f"{args.engine}:{args.model}"
+    if args.quantize:
+        model_spec = quantized_spec(model_spec)
+    app = InstaTranscriber(model_name=model_spec, cache=cache, language=args.language,
+                           preset=args.preset, profile=args.profile)
+    app.recognizer.parallel = args.parallel
+    return app
+
+
+def run_batch(args, cache):
+    """Run batch mode and return the exit code"""
+    from src.batch import BatchPipeline, read_urls
+
+    output_path = Path(args.output or "transcripts.jsonl")
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    print_banner()
+    print(f"Using Model: {args.model}")
+    print(f"Batch: {args.batch} -> {output_path}")
+    print(f"Workers: {args.download_workers} download, {args.transcribe_workers} transcribe")
+
+    pipeline = BatchPipeline(
+        lambda: make_transcriber(args, cache),
+        download_workers=args.download_workers,
+        transcribe_workers=args.transcribe_workers,
+        queue_size=args.queue_size,
+    )
+
+    start_time = time.time()
+    source = sys.stdin if args.batch == '-' else open(args.batch, encoding='utf-8')
+    try:
+        with open(output_path, 'a', encoding='utf-8') as output:
+            succeeded, failed = pipeline.run(read_urls(source), output)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    print("\n" + "="*60)
+    print("BATCH RESULT")
+    print("="*60)
+    print(f"Done: {succeeded} succeeded, {failed} failed in {time.time() - start_time:.2f} seconds")
+    print(f"Results: {output_path}")
+
+    return 0 if failed == 0 else 1
+
+
 def main():
     # Setup arguments
     parser = argparse.ArgumentParser(description='Convert Instagram Reels to Text')
     
-    parser.add_argument('url', help='The Instagram URL')
+    parser.add_argument('url', nargs='?', help='The Instagram URL')
     
     # Optional arguments
     parser.add_argument('-m', '--model', default=WHISPER_MODEL, 
                         choices=['tiny', 'base', 'small', 'medium', 'large'],
                         help='Which model to use (default: base)')
     
+    parser.add_argument('-e', '--engine', default=INFERENCE_ENGINE, choices=['whisper', 'whisper-int8', 'ct2'],
+                        help=f'Inference engine: openai-whisper, openai-whisper quantized to int8 '
+                             f'or CTranslate2 int8 (default: {INFERENCE_ENGINE})')
+
+    parser.add_argument('--quantize', action='store_true', default=WHISPER_QUANTIZE,
+                        help='Run the whisper engine with int8 Linear layers (faster on CPU, '
+                             'converted once and cached on disk)')
+    
+    parser.add_argument('-l', '--language',
+                        help='Language spoken in the reel, like "en" (default: detect it)')
+
+    parser.add_argument('-p', '--preset', default=DECODING_PRESET, choices=list(DECODING_PRESETS),
+                        help=f'Decoding preset: fast (greedy, no retries), balanced (Whisper defaults) '
+                             f'or accurate (beam search) (default: {DECODING_PRESET})')
+
     parser.add_argument('-o', '--output', help='Save to this file')
+
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Ignore saved transcriptions and process the reel again')
+
+    parser.add_argument('--profile', action='store_true',
+                        help='Profile the transcription with cProfile and save it to PROFILE_DIR (single reel only)')
+
+    parser.add_argument('--parallel', action='store_true', default=PARALLEL_TRANSCRIPTION,
+                        help='Split long audio into chunks and transcribe them on all CPU cores')
+
+    # Batch mode
+    parser.add_argument('--batch', metavar='FILE',
+                        help='Transcribe every URL in this file (one per line, "-" for stdin). '
+                             'Results are written as JSON lines to --output')
+    parser.add_argument('--download-workers', type=int, default=BATCH_DOWNLOAD_WORKERS,
+                        help=f'Batch mode: reels downloading at once (default: {BATCH_DOWNLOAD_WORKERS})')
+    parser.add_argument('--transcribe-workers', type=int, default=BATCH_TRANSCRIBE_WORKERS,
+                        help=f'Batch mode: reels transcribing at once, each loads its own model '
+                             f'(default: {BATCH_TRANSCRIBE_WORKERS})')
+    parser.add_argument('--queue-size', type=int, default=BATCH_QUEUE_SIZE,
+                        help=f'Batch mode: downloaded reels allowed to wait for transcription '
+                             f'(default: {BATCH_QUEUE_SIZE})')
     
     args = parser.parse_args()
+
+    if args.batch and args.url:
+        parser.error("Give either a URL or --batch, not both")
+    if not args.batch and not args.url:
+        parser.error("A URL is required (or use --batch)")
+
+    use_cache = TRANSCRIPT_CACHE_ENABLED and not args.no_cache
+    cache = TranscriptCache() if use_cache else None
+
+    if args.batch:
+        sys.exit(run_batch(args, cache))
     
     print_banner()
-    print(f"Using Model: {args.model}")
+    print(f"Using Model: {args.model} ({args.engine} engine)")
     print(f"Processing: {args.url}")
     
     # Run the main program
-    app = InstaTranscriber(model_name=args.model)
+    app = make_transcriber(args, cache)
     result = app.transcribe_reel(args.url)
     
     print_result(result)
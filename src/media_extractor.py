@@ -3,12 +3,22 @@ Media Extractor Module
 Downloads Instagram Reels and extracts audio using yt-dlp
 """
 
+import copy
 import os
 import subprocess
+import uuid
 from pathlib import Path
 from typing import Optional, Tuple
-import yt_dlp
-from config import TEMP_DIR, AUDIO_FORMAT, AUDIO_SAMPLE_RATE, DOWNLOAD_TIMEOUT
+import time
+from src.audio_decoder import decode_audio, stream_audio
+from src import metrics
+from config import (
+    TEMP_DIR, AUDIO_FORMAT, AUDIO_SAMPLE_RATE, AUDIO_PIPELINE, STREAM_WINDOW_SECONDS, DOWNLOAD_TIMEOUT,
+    MAX_VIDEO_DURATION, AUDIO_MIN_SAMPLE_RATE, AUDIO_MIN_BITRATE,
+)
+
+# Used when there's no probed format list to choose from
+FALLBACK_FORMAT = 'bestaudio/best'
 
 
 class MediaExtractor:
@@ -17,28 +27,17 @@ class MediaExtractor:
         self.temp_dir = temp_dir
         self.temp_dir.mkdir(exist_ok=True)
         self.downloaded_files = []
+        # Bytes fetched for the last extract() (an estimate from the metadata in "stream" mode)
+        self.last_downloaded_bytes = None
     
-    def extract_audio(self, url, reel_id):
-        
-        # We'll save it as a wav file
-        audio_filename = f"{reel_id}.{AUDIO_FORMAT}"
-        audio_path = self.temp_dir / audio_filename
-        
-        # Settings for yt-dlp to download and convert to audio
+    def _ydl_opts(self, file_stem, convert_to_wav, format_id=None, downloaded=None):
+        # Settings for yt-dlp to download (and optionally convert to audio)
+        # format_id comes from choose_format(), downloaded is a list that collects the size of each download
         ydl_opts = {
-            'format': 'bestaudio/best',
-            'outtmpl': str(self.temp_dir / f'{reel_id}.%(ext)s'),
+            'format': format_id or FALLBACK_FORMAT,
+            'outtmpl': str(self.temp_dir / f'{file_stem}.%(ext)s'),
             'quiet': False,
             'no_warnings': False,
-            'extract_audio': True, # We only want audio
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': AUDIO_FORMAT,
-                'preferredquality': '192',
-            }],
-            'postprocessor_args': [
-                '-ar', str(AUDIO_SAMPLE_RATE)
-            ],
             'socket_timeout': DOWNLOAD_TIMEOUT,
             'retries': 3,
             # Pretend to be a browser so Instagram doesn't block us
@@ -46,16 +45,181 @@ class MediaExtractor:
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
             }
         }
+        if downloaded is not None:
+            ydl_opts['progress_hooks'] = [self._count_bytes(downloaded)]
+        if convert_to_wav:
+            ydl_opts.update({
+                'extract_audio': True, # We only want audio
+                'postprocessors': [{
+                    'key': 'FFmpegExtractAudio',
+                    'preferredcodec': AUDIO_FORMAT,
+                }],
+                # 16 kHz mono is all Whisper uses
+                'postprocessor_args': [
+                    '-ar', str(AUDIO_SAMPLE_RATE), '-ac', '1'
+                ],
+            })
+        return ydl_opts
+
+    def _count_bytes(self, downloaded):
+        # yt-dlp progress hook: adds up what each finished download fetched
+        def hook(progress):
+            if progress.get('status') == 'finished':
+                downloaded.append(progress.get('total_bytes') or progress.get('downloaded_bytes') or 0)
+        return hook
+
+    def _record_download(self, downloaded):
+        self.last_downloaded_bytes = sum(downloaded)
+        metrics.downloaded_bytes_total.inc(self.last_downloaded_bytes)
+        print(f"Downloaded: {self.last_downloaded_bytes / 1024:.0f} KB")
+
+    def _format_size(self, fmt, duration):
+        # Bytes a format takes to download, from its size or bitrate (inf if we can't tell)
+        size = fmt.get('filesize') or fmt.get('filesize_approx')
+        bitrate = fmt.get('tbr') or fmt.get('abr')
+        if not size and bitrate and duration:
+            size = bitrate * duration * 125  # kbps -> bytes
+        return size or float('inf')
+
+    def choose_format(self, info, min_sample_rate=AUDIO_MIN_SAMPLE_RATE, min_bitrate=AUDIO_MIN_BITRATE):
+        """
+        Pick the cheapest format that's still good enough for speech from probed metadata
+
+        Audio-only streams at or above the sample rate and bitrate floors come first,
+        smallest first. Without one, the smallest format with audio is next: the video
+        track of a muxed file can't be left out, but the lowest resolution costs the
+        fewest bytes. Streams below the floors are the last resort, best first.
+
+        Returns:
+            The chosen format dict, or None if the metadata has no format list
+        """
+        duration = info.get('duration')
+        # acodec None means yt-dlp doesn't know, 'none' means there's no audio
+        formats = [f for f in info.get('formats') or [] if f.get('acodec') != 'none']
+        if not formats:
+            return None
+
+        def rank(fmt):
+            audio_only = fmt.get('vcodec') == 'none'
+            sample_rate = fmt.get('asr') or min_sample_rate  # Unknown counts as good enough
+            bitrate = fmt.get('abr') or min_bitrate
+            if sample_rate >= min_sample_rate and bitrate >= min_bitrate:
+                return (0 if audio_only else 1, self._format_size(fmt, duration), bitrate)
+            return (2 if audio_only else 3, -sample_rate, -bitrate)
+
+        return min(formats, key=rank)
+
+    def _pick_format(self, info):
+        # format_id for yt-dlp (None = FALLBACK_FORMAT), printed so the choice shows in the logs
+        chosen = self.choose_format(info) if info else None
+        if chosen is None:
+            return None
+        details = [chosen.get('ext'), chosen.get('acodec')]
+        if chosen.get('asr'):
+            details.append(f"{chosen['asr']} Hz")
+        if chosen.get('abr'):
+            details.append(f"{chosen['abr']:.0f} kbps")
+        if chosen.get('vcodec') != 'none':
+            details.append("with video")
+        print(f"Audio format: {chosen['format_id']} ({', '.join(str(d) for d in details if d)})")
+        return chosen['format_id']
+
+    def _download_error(self, e):
+        error_msg = str(e)
+        if "Private video" in error_msg:
+            return "Video is private!"
+        elif "Video unavailable" in error_msg:
+            return "Video deleted or missing"
+        else:
+            return f"Download error: {error_msg}"
+
+    def probe(self, url, reel_id):
+        """
+        Fetch the reel's metadata (duration, formats) without downloading any media
+
+        Returns:
+            Tuple of (success, info, error_message) where info is yt-dlp's info dict
+        """
+        ydl_opts = self._ydl_opts(reel_id, convert_to_wav=False)
+
+        import yt_dlp
+        try:
+            start_time = time.time()
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                print(f"Checking Reel: {reel_id}...")
+                info = ydl.extract_info(url, download=False)
+            metrics.observe_stage('probe', time.time() - start_time)
+            return True, info, ""
+
+        except yt_dlp.utils.DownloadError as e:
+            return False, None, self._download_error(e)
+
+        except Exception as e:
+            return False, None, f"Something broke: {str(e)}"
+
+    def check_duration(self, info, max_duration=MAX_VIDEO_DURATION):
+        """
+        Turn down reels that are too long, using probed metadata
+
+        Returns:
+            Tuple of (ok, error_message)
+        """
+        duration = info.get('duration') or 0
+        if max_duration and duration > max_duration:
+            return False, f"Reel is too long: {duration:.0f} seconds (the limit is {max_duration})"
+        return True, ""
+
+    def _fetch(self, ydl, url, info, download):
+        # Reuse metadata from probe() when we have it, so it isn't requested twice.
+        # yt-dlp changes the dict (and its format list) as it goes, and other jobs may share it
+        if info is not None:
+            return ydl.process_ie_result(copy.deepcopy(info), download=download)
+        return ydl.extract_info(url, download=download)
+
+    def extract(self, url, reel_id, mode=AUDIO_PIPELINE, info=None):
+        """
+        Get the audio for a reel using the configured pipeline
+
+        Args:
+            info: Metadata from probe(), skips fetching it again
+
+        Returns:
+            Tuple of (success, audio, error_message) where audio is a WAV path
+            in "wav" mode, a float32 NumPy array in "memory" mode, or a generator
+            of 30 second sample windows in "stream" mode
+        """
+        self.last_downloaded_bytes = None
+        if mode == "stream":
+            return self.stream_audio_windows(url, reel_id, info)
+        if mode == "memory":
+            return self.extract_audio_array(url, reel_id, info)
+        return self.extract_audio(url, reel_id, info)
+
+    def extract_audio(self, url, reel_id, info=None):
         
+        # We'll save it as a wav file
+        # The random suffix keeps two downloads of the same reel from clobbering each other
+        file_stem = f"{reel_id}-{uuid.uuid4().hex[:8]}"
+        audio_filename = f"{file_stem}.{AUDIO_FORMAT}"
+        audio_path = self.temp_dir / audio_filename
+        
+        downloaded = []
+        ydl_opts = self._ydl_opts(file_stem, convert_to_wav=True, format_id=self._pick_format(info),
+                                  downloaded=downloaded)
+        
+        import yt_dlp  # Slow to import, so only when something gets downloaded
         try:
-            # Do the download
+            # Do the download (the WAV conversion happens inside it, so it's timed as download)
+            start_time = time.time()
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                 print(f"Downloading Reel: {reel_id}...")
-                info = ydl.extract_info(url, download=True)
+                info = self._fetch(ydl, url, info, download=True)
                 
                 # Check how long the video is
                 duration = info.get('duration', 0)
                 print(f"Video length: {duration:.1f} seconds")
+            metrics.observe_stage('download', time.time() - start_time)
+            self._record_download(downloaded)
             
             # Make sure it actually worked
             if not audio_path.exists():
@@ -68,17 +232,104 @@ class MediaExtractor:
             return True, str(audio_path), ""
             
         except yt_dlp.utils.DownloadError as e:
-            error_msg = str(e)
-            if "Private video" in error_msg:
-                return False, "", "Video is private!"
-            elif "Video unavailable" in error_msg:
-                return False, "", "Video deleted or missing"
-            else:
-                return False, "", f"Download error: {error_msg}"
+            return False, "", self._download_error(e)
                 
         except Exception as e:
             return False, "", f"Something broke: {str(e)}"
+
+    def extract_audio_array(self, url, reel_id, info=None):
+        """
+        Download the reel and decode it once, straight into memory.
+        Skips the WAV conversion and the second decode Whisper would do on it.
+
+        Returns:
+            Tuple of (success, samples, error_message)
+        """
+        file_stem = f"{reel_id}-{uuid.uuid4().hex[:8]}"
+        downloaded = []
+        ydl_opts = self._ydl_opts(file_stem, convert_to_wav=False, format_id=self._pick_format(info),
+                                  downloaded=downloaded)
+        media_path = None
+        
+        import yt_dlp
+        try:
+            start_time = time.time()
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                print(f"Downloading Reel: {reel_id}...")
+                info = self._fetch(ydl, url, info, download=True)
+                
+                duration = info.get('duration', 0)
+                print(f"Video length: {duration:.1f} seconds")
+
+                downloads = info.get('requested_downloads') or [{}]
+                media_path = downloads[0].get('filepath') or ydl.prepare_filename(info)
+            metrics.observe_stage('download', time.time() - start_time)
+            
+            if not media_path or not os.path.exists(media_path):
+                return False, None, f"File not found at {media_path}"
+            self._record_download(downloaded)
+
+            start_time = time.time()
+            success, samples, error = decode_audio(media_path)
+            metrics.observe_stage('convert', time.time() - start_time)
+            if not success:
+                return False, None, error
+
+            print(f"Audio ready: {len(samples) / AUDIO_SAMPLE_RATE:.1f} seconds decoded in memory")
+            return True, samples, ""
+            
+        except yt_dlp.utils.DownloadError as e:
+            return False, None, self._download_error(e)
+                
+        except Exception as e:
+            return False, None, f"Something broke: {str(e)}"
+
+        finally:
+            # The compressed download isn't needed once it's decoded
+            if media_path and os.path.exists(media_path):
+                os.remove(media_path)
     
+    def stream_audio_windows(self, url, reel_id, info=None):
+        """
+        Find the reel's direct media URL and decode it while it downloads.
+        Nothing is fetched until the returned generator is iterated.
+
+        Returns:
+            Tuple of (success, windows, error_message) where windows yields
+            float32 arrays of up to STREAM_WINDOW_SECONDS each
+        """
+        ydl_opts = self._ydl_opts(reel_id, convert_to_wav=False, format_id=self._pick_format(info))
+
+        import yt_dlp
+        try:
+            # Metadata only - FFmpeg does the actual download
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                print(f"Finding stream for Reel: {reel_id}...")
+                info = self._fetch(ydl, url, info, download=False)
+
+            stream_url = info.get('url')
+            if not stream_url:
+                # Merged formats don't have a single URL, take the first part
+                formats = info.get('requested_formats') or []
+                stream_url = formats[0].get('url') if formats else None
+            if not stream_url:
+                return False, None, "No direct media URL found"
+
+            duration = info.get('duration') or 0
+            print(f"Video length: {duration:.1f} seconds (streaming)")
+            # FFmpeg doesn't say how much it read, so this is the size the metadata gives
+            size = self._format_size(info, duration)
+            self.last_downloaded_bytes = int(size) if size != float('inf') else None
+
+            headers = info.get('http_headers') or ydl_opts['http_headers']
+            return True, stream_audio(stream_url, headers=headers, window_seconds=STREAM_WINDOW_SECONDS), ""
+
+        except yt_dlp.utils.DownloadError as e:
+            return False, None, self._download_error(e)
+
+        except Exception as e:
+            return False, None, f"Something broke: {str(e)}"
+
     def get_downloaded_files(self):
         return self.downloaded_files
 
@@ -0,0 +1,234 @@
+"""
+Metrics Module
+Counters, gauges and histograms rendered in the Prometheus text format for /metrics
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds, from a URL check to a long reel on a big model
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+PREFIX = "instatranscriber_"
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_text(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = PREFIX + name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} needs labels {self.labels}, got {tuple(labels)}")
+        return tuple(labels[name] for name in self.labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        return lines + self._samples()
+
+
+class Counter(_Metric):
+    """A number that only goes up (requests, bytes, seconds of audio)"""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        with self._lock:
+            return [f"{self.name}{_label_text(self.labels, key)} {_format_value(value)}"
+                    for key, value in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    """A number that goes up and down, or is read from a function when scraped"""
+
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labels=()):
+        super().__init__(name, help_text, labels)
+        self._function = None
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function):
+        # function() -> number, called at scrape time (unlabelled gauges only)
+        self._function = function
+
+    def _samples(self):
+        if self._function is not None:
+            try:
+                return [f"{self.name} {_format_value(self._function())}"]
+            except Exception as e:
+                print(f"Metric {self.name} failed: {e}")
+                return []
+        with self._lock:
+            return [f"{self.name}{_label_text(self.labels, key)} {_format_value(value)}"
+                    for key, value in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+    """Distribution of values (latencies) in cumulative buckets, plus their sum and count"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        # with histogram.time(stage="download"): ...
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start_time, **labels)
+
+    def _samples(self):
+        lines = []
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, counts):
+                    labels = _label_text(self.labels, key, ("le", _format_value(bound)))
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{_label_text(self.labels, key)} {counts[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        # Everything in the Prometheus text exposition format
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# Pipeline stages: probe, validate, download, convert, model_load, inference
+stage_seconds = REGISTRY.register(Histogram(
+    "stage_duration_seconds", "Time spent in each pipeline stage", ["stage"]))
+transcriptions_total = REGISTRY.register(Counter(
+    "transcriptions_total", "Finished transcriptions by result (success, cached, partial or a failure cause)", ["result"]))
+jobs_queued = REGISTRY.register(Gauge(
+    "jobs_queued", "Jobs waiting for a worker, as counted against the queue limit"))
+jobs_in_flight = REGISTRY.register(Gauge(
+    "jobs_in_flight", "Jobs being validated, downloaded or transcribed (coalesced duplicates count once)"))
+jobs_rejected_total = REGISTRY.register(Counter(
+    "jobs_rejected_total", "Requests turned away with a 429, by reason (queue_full, client_limit)", ["reason"]))
+job_queue_capacity = REGISTRY.register(Gauge(
+    "job_queue_capacity", "Most jobs allowed to wait for a worker (0 = no limit)"))
+job_drain_rate = REGISTRY.register(Gauge(
+    "job_drain_rate", "Jobs finished per second over the last couple of minutes"))
+downloaded_bytes_total = REGISTRY.register(Counter(
+    "downloaded_bytes_total", "Bytes of media downloaded"))
+audio_seconds_total = REGISTRY.register(Counter(
+    "audio_seconds_total", "Seconds of audio transcribed", ["model"]))
+real_time_factor = REGISTRY.register(Histogram(
+    "real_time_factor", "Inference time divided by audio length", ["model"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 3, 5)))
+
+
+def observe_stage(stage, seconds):
+    stage_seconds.observe(seconds, stage=stage)
+
+
+def observe_inference(model, audio_seconds, seconds):
+    # One finished transcription: its inference time, audio length and speed
+    observe_stage('inference', seconds)
+    if audio_seconds:
+        audio_seconds_total.inc(audio_seconds, model=model)
+        real_time_factor.observe(seconds / audio_seconds, model=model)
+
+
+# Error message prefixes (set in InstaTranscriber) -> failure cause label
+FAILURE_CAUSES = [
+    ("Bad URL", "invalid_url"),
+    ("Reel is too long", "too_long"),
+    ("Could not get audio", "download_failed"),
+    ("Model download failed", "model_load_failed"),
+    ("Transcription broke: Failed to load", "model_load_failed"),
+    ("Transcription broke: No speech", "no_speech"),
+    ("Transcription broke: Ran out of time", "timeout"),
+    ("Transcription broke", "transcription_failed"),
+    ("Cancelled", "cancelled"),
+]
+
+
+def result_label(result):
+    # How a transcribe_reel result dict is counted in transcriptions_total
+    if result.get('success'):
+        if result.get('partial'):
+            return 'partial'
+        return 'cached' if result.get('cached') else 'success'
+    error = result.get('error') or ""
+    for prefix, cause in FAILURE_CAUSES:
+        if error.startswith(prefix):
+            return cause
+    return 'error'
+
+
+def record_result(result):
+    transcriptions_total.inc(result=result_label(result))
+
+
+def render():
+    return REGISTRY.render()
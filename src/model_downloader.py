@@ -11,16 +11,21 @@ from tqdm import tqdm
 from pathlib import Path
 from typing import Optional
 
-# Whisper model URLs (dynamically imported to ensure correctness)
-try:
-    import whisper
-    _MODELS = whisper._MODELS
-except ImportError:
-    print("Warning: 'openai-whisper' not installed. Using fallback URLs (might be outdated).")
-    # Fallback URLs if whisper is not installed (though it should be)
-    _MODELS = {
-        "base": "https://openaipublic.azureedge.net/main/whisper/models/ed3a0b6b1c0edf879ad9b11b1af5a309a19fb59149a4073e5f652d8e6c4e16d03/base.pt",
-    }
+# Fallback URLs if whisper is not installed (though it should be)
+_FALLBACK_MODELS = {
+    "base": "https://openaipublic.azureedge.net/main/whisper/models/ed3a0b6b1c0edf879ad9b11b1af5a309a19fb59149a4073e5f652d8e6c4e16d03/base.pt",
+}
+
+
+def _model_urls():
+    # Whisper model URLs, imported when first needed since whisper pulls in torch
+    try:
+        import whisper
+        return whisper._MODELS
+    except ImportError:
+        print("Warning: 'openai-whisper' not installed. Using fallback URLs (might be outdated).")
+        return _FALLBACK_MODELS
+
 
 def download_file_with_resume(url: str, dest_path: Path, expected_sha256: Optional[str] = None):
     """
@@ -79,10 +84,11 @@ def download_model(name: str = "base"):
     """
     Download Whisper model by name using robust downloader.
     """
-    if name not in _MODELS:
+    models = _model_urls()
+    if name not in models:
         raise ValueError(f"Unknown model name: {name}")
     
-    url = _MODELS[name]
+    url = models[name]
     download_root = os.path.join(os.getenv("USERPROFILE"), ".cache", "whisper")
     os.makedirs(download_root, exist_ok=True)
     
@@ -0,0 +1,129 @@
+"""
+Model Registry Module
+Keeps loaded models in memory so they can be shared between requests
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from src import engines, metrics
+from config import MODEL_CACHE_MAX_MB
+
+
+class ModelRegistry:
+    """Process-wide cache of loaded models with LRU eviction by memory budget"""
+
+    def __init__(self, max_bytes=MODEL_CACHE_MAX_MB * 1024 * 1024, loader=None, sizer=None):
+        self.max_bytes = max_bytes
+        # loader(name) -> model and sizer(name, model) -> bytes, both go through the engines by default
+        self.loader = loader or engines.load_model
+        self.sizer = sizer or engines.model_size
+        # name -> (model, size in bytes), oldest first
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        # One lock per model name so two requests don't load the same model twice
+        self._load_locks = {}
+        # One lock per model name so two threads don't run inference on it at once
+        self._inference_locks = {}
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            # name -> {'count', 'last', 'average'} seconds, kept as a running average
+            'load_times': {},
+        }
+
+    def get(self, name):
+        """
+        Get a loaded model, loading it on the first request
+
+        Args:
+            name: Model spec like "base" or "ct2:small" (see engines.parse_model_spec)
+
+        Returns:
+            The loaded model
+        """
+        with self._lock:
+            if name in self._models:
+                self._models.move_to_end(name)
+                self.stats['hits'] += 1
+                return self._models[name][0]
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        with load_lock:
+            # Someone else might have loaded it while we waited
+            with self._lock:
+                if name in self._models:
+                    self._models.move_to_end(name)
+                    self.stats['hits'] += 1
+                    return self._models[name][0]
+
+            print(f"Loading model into registry: {name}")
+            start_time = time.time()
+            model = self.loader(name)
+            load_time = time.time() - start_time
+            metrics.observe_stage('model_load', load_time)
+            size = self.sizer(name, model)
+
+            with self._lock:
+                self.stats['misses'] += 1
+                times = self.stats['load_times'].setdefault(name, {'count': 0, 'last': 0.0, 'average': 0.0})
+                times['count'] += 1
+                times['last'] = load_time
+                times['average'] += (load_time - times['average']) / times['count']
+                self._models[name] = (model, size)
+                self._evict()
+
+            print(f"Model {name} loaded in {load_time:.2f} seconds ({size / 1024 / 1024:.0f} MB)")
+            return model
+
+    def _evict(self):
+        # Drop least recently used models until we fit, but always keep the newest one.
+        # Callers still holding a model keep it alive until they're done with it.
+        while len(self._models) > 1 and self.memory_used() > self.max_bytes:
+            name, _ = self._models.popitem(last=False)
+            self.stats['evictions'] += 1
+            print(f"Evicted model from registry: {name}")
+
+    def inference_lock(self, name):
+        """
+        Lock to hold while running inference on a shared model.
+        Whisper installs per-call hooks on the model, so calls on one instance can't overlap.
+        """
+        with self._lock:
+            return self._inference_locks.setdefault(name, threading.Lock())
+
+    def memory_used(self):
+        return sum(size for _, size in self._models.values())
+
+    def get_stats(self):
+        """
+        Summary of registry usage
+
+        Returns:
+            Dictionary with hits, misses, evictions, load times and memory usage
+        """
+        with self._lock:
+            load_times = {name: dict(times) for name, times in self.stats['load_times'].items()}
+            return {
+                'hits': self.stats['hits'],
+                'misses': self.stats['misses'],
+                'evictions': self.stats['evictions'],
+                'load_times': load_times,
+                'loaded_models': list(self._models.keys()),
+                'memory_used_mb': round(self.memory_used() / 1024 / 1024, 1),
+                'memory_budget_mb': round(self.max_bytes / 1024 / 1024, 1),
+            }
+
+
+# Shared registry for the whole process
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_model_registry():
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = ModelRegistry()
+        return _default_registry
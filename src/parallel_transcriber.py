@@ -0,0 +1,224 @@
+"""
+Parallel Transcriber Module
+Splits long audio at quiet points and transcribes the pieces on several processes
+"""
+
+import os
+import re
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+import numpy as np
+from src.vad import frame_energy_db, FRAME_MS
+from config import (
+    AUDIO_SAMPLE_RATE, PARALLEL_CHUNK_SECONDS, PARALLEL_OVERLAP_SECONDS,
+    PARALLEL_WORKERS, PARALLEL_THREADS_PER_WORKER,
+)
+
+# How far either side of the ideal cut we look for a quiet spot
+SEARCH_SECONDS = 5
+
+# Engine and model loaded once in each worker process
+_worker_engine = None
+_worker_model = None
+
+
+def split_at_silence(samples, chunk_seconds=PARALLEL_CHUNK_SECONDS,
+                     overlap_seconds=PARALLEL_OVERLAP_SECONDS, sample_rate=AUDIO_SAMPLE_RATE):
+    """
+    Work out where to cut long audio into chunks
+
+    Each cut goes at the quietest 30 ms frame within a few seconds of the ideal
+    position, so we rarely slice through a word. Every chunk then runs on for
+    overlap_seconds into the next one, and the repeated words get removed when
+    the text is merged.
+
+    Returns:
+        List of (start_sample, end_sample) tuples
+    """
+    total = len(samples)
+    chunk = int(chunk_seconds * sample_rate)
+    if total <= chunk:
+        return [(0, total)]
+
+    energy = frame_energy_db(samples, sample_rate)
+    frame_size = int(sample_rate * FRAME_MS / 1000)
+    search = int(SEARCH_SECONDS * sample_rate / frame_size)
+    overlap = int(overlap_seconds * sample_rate)
+
+    cuts = [0]
+    while total - cuts[-1] > chunk:
+        ideal = (cuts[-1] + chunk) // frame_size
+        low = max(cuts[-1] // frame_size + 1, ideal - search)
+        high = min(len(energy), ideal + search)
+        quietest = low + int(np.argmin(energy[low:high])) if high > low else ideal
+        cuts.append(quietest * frame_size)
+    cuts.append(total)
+
+    return [(start, min(total, end + overlap)) for start, end in zip(cuts, cuts[1:])]
+
+
+def _normalize(word):
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def merge_texts(texts, max_overlap_words=30):
+    """
+    Join chunk transcripts, dropping words repeated because of the overlap
+
+    Looks for the longest run of words at the end of the text so far that
+    also starts the next chunk, and only keeps the next chunk after it.
+    """
+    merged = []
+    for text in texts:
+        words = text.split()
+        if not merged:
+            merged = words
+            continue
+        tail = [_normalize(w) for w in merged[-max_overlap_words:]]
+        head = [_normalize(w) for w in words[:max_overlap_words]]
+        skip = 0
+        for size in range(min(len(tail), len(head)), 0, -1):
+            if tail[-size:] == head[:size]:
+                skip = size
+                break
+        merged.extend(words[skip:])
+    return " ".join(merged)
+
+
+def _init_worker(model_spec, threads):
+    # Runs once when each worker process starts
+    global _worker_engine, _worker_model
+    from src import engines
+    engine_name, model_name = engines.parse_model_spec(model_spec)
+    _worker_engine = engines.get_engine(engine_name)
+    # Only the PyTorch engines import torch for this
+    _worker_engine.set_threads(threads)
+    _worker_model = _worker_engine.load(model_name)
+
+
+def _transcribe_chunk(index, samples, options):
+    result = _worker_engine.transcribe(_worker_model, samples, options)
+    segments = [
+        {'start': s["start"], 'end': s["end"], 'text': s["text"].strip()}
+        for s in result.get("segments", []) if s["text"].strip()
+    ]
+    return index, result["text"].strip(), segments, result.get("language")
+
+
+class ParallelTranscriber:
+    """A pool of worker processes, each with its own copy of one model"""
+
+    def __init__(self, model_name, workers=PARALLEL_WORKERS, threads_per_worker=PARALLEL_THREADS_PER_WORKER):
+        # model_name is a full spec like "whisper:base" or "ct2:small"
+        self.model_name = model_name
+        self.threads_per_worker = max(1, threads_per_worker)
+        # Default: one worker per core (or per group of threads)
+        cores = os.cpu_count() or 1
+        self.workers = workers or max(1, cores // self.threads_per_worker)
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                print(f"Starting {self.workers} transcription worker(s) for {self.model_name}")
+                # spawn, not fork: forking a process that already has torch threads can hang
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.model_name, self.threads_per_worker),
+                )
+            return self._pool
+
+    def transcribe(self, samples, options, sample_rate=AUDIO_SAMPLE_RATE, time_budget=None):
+        """
+        Transcribe long audio in parallel chunks
+
+        Args:
+            samples: float32 mono samples
+            options: Decoding options for the engine (fp16, language, ...)
+            time_budget: Seconds to wait for chunks. After that the chunks still to
+                         come are cancelled and the ones done so far are returned.
+
+        Returns:
+            Dictionary shaped like Whisper's result: text, segments and language,
+            plus 'timed_out' when it stopped early
+        """
+        chunks = split_at_silence(samples, sample_rate=sample_rate)
+        print(f"Split {len(samples) / sample_rate:.1f} seconds into {len(chunks)} chunk(s)")
+
+        start_time = time.time()
+        deadline = start_time + time_budget if time_budget else None
+        pool = self._get_pool()
+        futures = [
+            pool.submit(_transcribe_chunk, index, samples[start:end], options)
+            for index, (start, end) in enumerate(chunks)
+        ]
+        # In order, so a timeout leaves the start of the audio and not a patchwork
+        results = []
+        timed_out = False
+        for future in futures:
+            try:
+                timeout = max(0.0, deadline - time.time()) if deadline is not None else None
+                results.append(future.result(timeout=timeout))
+            except FutureTimeout:
+                timed_out = True
+                # Chunks that haven't started are dropped, running ones finish on their own
+                for later in futures:
+                    later.cancel()
+                break
+        print(f"Chunks done in {time.time() - start_time:.2f} seconds"
+              + (f" (ran out of time after {len(results)} of {len(chunks)})" if timed_out else ""))
+
+        segments = []
+        for (index, _, chunk_segments, _), (start, end) in zip(results, chunks):
+            offset = start / sample_rate
+            # Segments that start inside the overlap belong to the next chunk
+            next_start = chunks[index + 1][0] / sample_rate if index + 1 < len(chunks) else None
+            for segment in chunk_segments:
+                segment_start = segment['start'] + offset
+                if next_start is not None and segment_start >= next_start:
+                    continue
+                segments.append({
+                    'start': segment_start,
+                    'end': segment['end'] + offset,
+                    'text': segment['text'],
+                })
+
+        languages = [language for _, _, _, language in results if language]
+        return {
+            'text': merge_texts([text for _, text, _, _ in results]),
+            'segments': segments,
+            'language': max(set(languages), key=languages.count) if languages else None,
+            'timed_out': timed_out,
+        }
+
+    def shutdown(self, wait=False):
+        # Chunks that haven't started are dropped. With wait, returns once the worker processes have exited
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=wait, cancel_futures=True)
+                self._pool = None
+
+
+# One pool per model, shared by the whole process
+_transcribers = {}
+_transcribers_lock = threading.Lock()
+
+
+def get_parallel_transcriber(model_name):
+    with _transcribers_lock:
+        if model_name not in _transcribers:
+            _transcribers[model_name] = ParallelTranscriber(model_name)
+        return _transcribers[model_name]
+
+
+def shutdown_parallel_transcribers():
+    # Stop every pool's worker processes (the API calls this when it shuts down)
+    with _transcribers_lock:
+        transcribers = list(_transcribers.values())
+    for transcriber in transcribers:
+        transcriber.shutdown(wait=True)
@@ -0,0 +1,85 @@
+"""
+Profiler Module
+Profiles a single transcription with cProfile and saves the result for later digging
+"""
+
+import cProfile
+import io
+import pstats
+import re
+import time
+import uuid
+from pathlib import Path
+from config import PROFILE_DIR
+
+# How many functions the text summary lists
+SUMMARY_LINES = 40
+
+
+class RequestProfiler:
+    """
+    Deterministic profile of everything run on this thread while it's active
+
+    Work done on other threads or processes (batch decoder, parallel chunks)
+    only shows up as the time spent waiting for it.
+
+    Usage:
+        profiler = RequestProfiler()
+        with profiler:
+            result = do_work()
+        path = profiler.save(reel_id)
+    """
+
+    def __init__(self, profile_dir=PROFILE_DIR):
+        self.profile_dir = Path(profile_dir)
+        self.profile = cProfile.Profile()
+        self.started_at = None
+        self.elapsed = 0.0
+
+    def __enter__(self):
+        self.started_at = time.time()
+        try:
+            self.profile.enable()
+        except ValueError as e:
+            # Python 3.12+ only allows one active cProfile at a time
+            print(f"Profiling skipped: {e}")
+            self.profile = None
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.profile is not None:
+            self.profile.disable()
+        self.elapsed = time.time() - self.started_at
+        return False
+
+    def save(self, label):
+        """
+        Write the profile as <label>-<time>.prof (pstats) plus a .txt summary
+
+        Args:
+            label: Usually the reel ID, so the file is easy to find
+
+        Returns:
+            Path of the .prof file, or None if it couldn't be written
+        """
+        if self.profile is None:
+            return None
+        safe_label = re.sub(r'[^A-Za-z0-9_-]', '_', label or 'unknown')
+        stem = f"{safe_label}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        try:
+            self.profile_dir.mkdir(parents=True, exist_ok=True)
+            path = self.profile_dir / f"{stem}.prof"
+            self.profile.dump_stats(str(path))
+
+            # Top functions by cumulative time, readable without any tools
+            summary = io.StringIO()
+            summary.write(f"Profile of {label}: {self.elapsed:.2f} seconds\n\n")
+            stats = pstats.Stats(self.profile, stream=summary)
+            stats.sort_stats('cumulative').print_stats(SUMMARY_LINES)
+            (self.profile_dir / f"{stem}.txt").write_text(summary.getvalue(), encoding='utf-8')
+
+            print(f"Profile saved to {path}")
+            return str(path)
+        except Exception as e:
+            print(f"Could not save profile: {e}")
+            return None
@@ -0,0 +1,120 @@
+"""
+Scheduler Module
+Estimates how much work a transcription is, so the job queue can run short reels first
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from src import engines
+from config import STUB_ENGINE_RTF
+
+# Rough CPU seconds of work per second of audio for the base model on the whisper engine.
+# Other sizes scale with their parameter count
+BASE_COST_FACTOR = 0.1
+# Relative speed of each engine on the same model
+ENGINE_COST_FACTORS = {
+    'whisper': 1.0,
+    'whisper-int8': 0.6,
+    'ct2': 0.35,
+}
+# Assumed length when the metadata doesn't say (most reels are under a minute and a half)
+DEFAULT_REEL_SECONDS = 60
+# Probed metadata remembered per reel, so repeat requests (and the download) don't fetch it again.
+# Not for too long: the media URLs in it expire
+PROBE_MEMO_SIZE = 200
+PROBE_MEMO_TTL = 600
+
+
+def cost_factor(model_spec):
+    """
+    Expected seconds of work per second of audio for a model spec like "ct2:small"
+    """
+    engine_name, model_name = engines.parse_model_spec(model_spec)
+    if engine_name == 'stub':
+        return STUB_ENGINE_RTF
+    base_parameters = engines.parameter_count('base')
+    parameters = engines.parameter_count(model_name) or base_parameters
+    return BASE_COST_FACTOR * parameters / base_parameters * ENGINE_COST_FACTORS.get(engine_name, 1.0)
+
+
+def expected_cost(duration, model_spec):
+    # Seconds of work a reel of this length takes with this model
+    return (duration or DEFAULT_REEL_SECONDS) * cost_factor(model_spec)
+
+
+class CostEstimator:
+    """
+    Works out a job's expected cost from the reel's duration in its metadata
+
+    Only URLs that look like reels are probed, anything else is left for
+    validation to turn down (and costs nothing). Each reel is probed once per
+    PROBE_MEMO_TTL, jobs asking while a probe is running wait for it.
+    """
+
+    def __init__(self, extractor, validator):
+        """
+        Args:
+            extractor: MediaExtractor used for the metadata probe
+            validator: URLValidator used to find the reel ID
+        """
+        self.extractor = extractor
+        self.validator = validator
+        # reel_id -> (probed at, info dict), least recently used first
+        self._probes = OrderedDict()
+        # reel_id -> Future of the info dict, for probes that are running
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def estimate(self, job):
+        """
+        Expected seconds of work for a job. Sets job.duration and, when the
+        metadata was fetched, job.media_info.
+        """
+        reel_id = self.validator.extract_reel_id(job.url)
+        if not reel_id:
+            return 0.0
+
+        info = self.media_info(job.url, reel_id)
+        if info is not None:
+            job.media_info = info
+            job.duration = info.get('duration')
+        return expected_cost(job.duration, job.model_name)
+
+    def media_info(self, url, reel_id):
+        """
+        The reel's metadata: remembered, from a probe already running, or probed now
+
+        Returns:
+            yt-dlp's info dict, or None if the probe failed
+        """
+        with self._lock:
+            entry = self._probes.get(reel_id)
+            if entry is not None and time.time() - entry[0] < PROBE_MEMO_TTL:
+                self._probes.move_to_end(reel_id)
+                return entry[1]
+            self._probes.pop(reel_id, None)
+            pending = self._pending.get(reel_id)
+            leader = pending is None
+            if leader:
+                pending = self._pending[reel_id] = Future()
+
+        if not leader:
+            return pending.result()
+
+        info = None
+        try:
+            success, info, error = self.extractor.probe(url, reel_id)
+            if not success:
+                info = None
+                print(f"Could not get the length of {reel_id}, guessing: {error}")
+        finally:
+            with self._lock:
+                del self._pending[reel_id]
+                if info is not None:
+                    self._probes[reel_id] = (time.time(), info)
+                    while len(self._probes) > PROBE_MEMO_SIZE:
+                        self._probes.popitem(last=False)
+            pending.set_result(info)
+        return info
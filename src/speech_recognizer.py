@@ -1,61 +1,190 @@
 """
 Speech Recognizer Module
-Transcribes audio using OpenAI Whisper
+Transcribes audio using Whisper (through one of the inference engines)
 """
 
 import time
-import whisper
+from contextlib import nullcontext
 from pathlib import Path
 from typing import Tuple, Optional
-from config import WHISPER_MODEL
+from src.audio_decoder import decode_audio
+from src.vad import keep_speech
+from src.parallel_transcriber import get_parallel_transcriber, split_at_silence
+from src.batch_decoder import get_batch_decoder, window_prompt, WINDOW_SECONDS
+from src import engines, metrics
+from config import (
+    WHISPER_MODEL, AUDIO_SAMPLE_RATE, VAD_ENABLED, PARALLEL_TRANSCRIPTION, PARALLEL_CHUNK_SECONDS,
+    BATCH_INFERENCE_ENABLED, DECODING_PRESETS, DECODING_PRESET, TRANSCRIPTION_TIME_MULTIPLIER,
+    MIN_TRANSCRIPTION_SECONDS,
+)
+
+# Engines whose models can go through the shared batch decoder
+BATCHABLE_ENGINES = ['whisper', 'whisper-int8']
 
 
 class SpeechRecognizer:
-    def __init__(self, model_name=WHISPER_MODEL):
+    def __init__(self, model_name=WHISPER_MODEL, registry=None, use_vad=VAD_ENABLED,
+                 parallel=PARALLEL_TRANSCRIPTION, batched=BATCH_INFERENCE_ENABLED, language=None,
+                 preset=None):
+        # model_name can pick an engine too, like "ct2:small" (plain "small" uses INFERENCE_ENGINE)
         self.model_name = model_name
+        self.model_spec = engines.normalize_model_spec(model_name)
+        engine_name, self.base_model_name = engines.parse_model_spec(model_name)
+        self.engine = engines.get_engine(engine_name)
         self.model = None
-        print(f"Using Whisper model: {model_name}")
+        # Optional shared ModelRegistry so models stay loaded between requests
+        self.registry = registry
+        # Cut out silence before Whisper sees the audio
+        self.use_vad = use_vad
+        # Split long audio into chunks and transcribe them on a process pool
+        self.parallel = parallel
+        # Decode windows together with other requests' (needs a shared registry)
+        self.batched = batched
+        # Language the caller asked for (None = let Whisper detect it)
+        self.language = language.lower() if language else None
+        # Language we already detected for this audio before, skips detection without
+        # changing the cache key
+        self.known_language = None
+        # Language of the last transcription (asked for, known or detected)
+        self.detected_language = None
+        # Decoding preset: fast, balanced or accurate (see DECODING_PRESETS)
+        self.preset = preset or DECODING_PRESET
+        if self.preset not in DECODING_PRESETS:
+            raise ValueError(f"Unknown preset: {self.preset} (choose from {', '.join(DECODING_PRESETS)})")
+        # Transcription may take this many times the audio's length before it's stopped (0 = no limit)
+        self.time_multiplier = TRANSCRIPTION_TIME_MULTIPLIER
+        # Whether the last transcription ran out of time and only has the start of the audio
+        self.timed_out = False
+        print(f"Using Whisper model: {self.base_model_name} ({self.engine.name} engine)")
     
     def load_model(self):
         # Load the model into memory
         try:
-            self.model = whisper.load_model(self.model_name)
+            if self.registry is not None:
+                self.model = self.registry.get(self.model_spec)
+            else:
+                start_time = time.time()
+                self.model = self.engine.load(self.base_model_name)
+                metrics.observe_stage('model_load', time.time() - start_time)
             print(f"Model loaded!")
             return True
         except Exception as e:
             print(f"Model load failed: {e}")
             return False
     
-    def transcribe(self, audio_path, expected_duration=None):
+    def decoding_options(self):
+        # Options passed to the engine's transcribe()
+        return {
+            **DECODING_PRESETS[self.preset],
+            'fp16': False,
+            'language': self.language or self.known_language,
+        }
+
+    def cache_options(self):
+        # Everything that changes the transcription output (used in cache keys)
+        return {
+            **self.decoding_options(),
+            'language': self.language,
+            'preset': self.preset,
+            'engine': self.engine.name,
+            'vad': self.use_vad,
+            'parallel': self.parallel,
+            'batched': self._use_batching(),
+            # A time limit makes long audio go through our own windows instead of Whisper's
+            'time_limit': bool(self.time_multiplier),
+        }
+
+    def time_budget(self, audio_seconds):
+        # Seconds transcription may run before it stops with what it has (None = no limit)
+        if not self.time_multiplier or not audio_seconds:
+            return None
+        return max(MIN_TRANSCRIPTION_SECONDS, audio_seconds * self.time_multiplier)
+
+    def transcribe(self, audio_path, expected_duration=None, on_segment=None):
+        # audio_path can also be a float32 NumPy array of 16 kHz samples
+        # expected_duration (seconds) sets the time budget when the length isn't known yet
+        # on_segment gets each segment dict ({'start', 'end', 'text'}) once decoding is done
+        self.timed_out = False
+        in_memory = not isinstance(audio_path, (str, Path))
+        if not in_memory and not Path(audio_path).exists():
+            return False, "", 0.0, f"File missing: {audio_path}"
+
+        # Check for speech first - no point loading a model for a silent reel
+        speech = None
+        if self.use_vad:
+            speech = self._find_speech(audio_path)
+            if speech is not None and not speech.has_speech:
+                print("VAD found no speech, skipping Whisper")
+                return False, "", 0.0, "No speech found"
+
+        audio = speech.samples if speech is not None else audio_path
+        options = self.decoding_options()
+        # Length before VAD, for the audio seconds and real-time factor metrics
+        if speech is not None:
+            audio_seconds = speech.original_seconds
+        else:
+            audio_seconds = len(audio_path) / AUDIO_SAMPLE_RATE if in_memory else None
+        budget = self.time_budget(audio_seconds or expected_duration)
+
+        # Chunking, batching and time limits need samples, so decode WAV files that VAD didn't already
+        if (self.parallel or self._use_batching() or budget) and isinstance(audio, (str, Path)):
+            success, samples, error = decode_audio(audio)
+            if success:
+                audio = samples
+
+        # Long audio can go to the worker processes instead (they have their own models)
+        if self._use_parallel(audio):
+            print(f"Transcribing: {len(audio) / AUDIO_SAMPLE_RATE:.1f} seconds of audio in parallel chunks")
+            transcriber = get_parallel_transcriber(self.model_spec)
+            return self._transcribe_samples(transcriber.transcribe, audio, options, speech, on_segment,
+                                            audio_seconds, budget)
+
+        # Or share the model with other requests, a batch of windows at a time
+        if self._use_batching() and not isinstance(audio, (str, Path)):
+            print(f"Transcribing: {len(audio) / AUDIO_SAMPLE_RATE:.1f} seconds of audio in shared batches")
+            transcriber = get_batch_decoder(self.model_spec, self.registry)
+            return self._transcribe_samples(transcriber.transcribe, audio, options, speech, on_segment,
+                                            audio_seconds, budget)
+
         # First make sure model is loaded
         if self.model is None:
             if not self.load_model():
                 return False, "", 0.0, "Failed to load Whisper model"
-        
-        if not Path(audio_path).exists():
-            return False, "", 0.0, f"File missing: {audio_path}"
+
+        # With a time limit, audio longer than a window goes through one window at a
+        # time so it can stop in between (a single window can't run away)
+        if budget and self._longer_than_window(audio):
+            print(f"Transcribing: {len(audio) / AUDIO_SAMPLE_RATE:.1f} seconds of audio, "
+                  f"{budget:.0f} second time limit")
+            return self._transcribe_samples(self._transcribe_windows, audio, options, speech, on_segment,
+                                            audio_seconds, budget)
         
         try:
-            print(f"Transcribing: {audio_path}")
+            if not isinstance(audio, (str, Path)):
+                print(f"Transcribing: {len(audio) / AUDIO_SAMPLE_RATE:.1f} seconds of audio from memory")
+            else:
+                print(f"Transcribing: {audio}")
             start_time = time.time()
             
             # Do the magic
-            result = self.model.transcribe(
-                audio_path,
-                fp16=False, # Use standard precision
-                language=None, # Auto-detect
-                verbose=False
-            )
+            # (fp16 off = standard precision, language None = auto-detect)
+            with self._inference_lock():
+                result = self.engine.transcribe(self.model, audio, options)
             
             processing_time = time.time() - start_time
+            metrics.observe_inference(self.model_spec, audio_seconds, processing_time)
             transcription = result["text"].strip()
-            detected_language = result.get("language", "unknown")
+            self.detected_language = result.get("language") or options['language']
             
             print(f"Done in {processing_time:.2f} seconds")
-            print(f"Language: {detected_language}")
+            print(f"Language: {self.detected_language or 'unknown'}")
             
             if not transcription:
                 return False, "", processing_time, "No speech found"
+
+            if on_segment is not None:
+                for segment in self._segments(result, speech):
+                    on_segment(segment)
             
             return True, transcription, processing_time, ""
             
@@ -69,6 +198,203 @@ class SpeechRecognizer:
         except Exception as e:
             return False, "", 0.0, f"Error: {str(e)}"
 
+    def _use_parallel(self, audio):
+        # Only worth it when there are at least two chunks' worth of audio
+        if not self.parallel or isinstance(audio, (str, Path)):
+            return False
+        return len(audio) / AUDIO_SAMPLE_RATE > PARALLEL_CHUNK_SECONDS * 1.5
+
+    def _use_batching(self):
+        return self.batched and self.registry is not None and self.engine.name in BATCHABLE_ENGINES
+
+    def _longer_than_window(self, audio):
+        if isinstance(audio, (str, Path)):
+            return False
+        return len(audio) / AUDIO_SAMPLE_RATE > WINDOW_SECONDS * 1.2
+
+    def _transcribe_samples(self, transcribe, audio, options, speech=None, on_segment=None, audio_seconds=None,
+                            time_budget=None):
+        # transcribe is ParallelTranscriber.transcribe, BatchDecoder.transcribe or _transcribe_windows,
+        # they all return Whisper-shaped results (plus 'timed_out' when they stopped early)
+        try:
+            start_time = time.time()
+            result = transcribe(audio, options, time_budget=time_budget)
+            processing_time = time.time() - start_time
+            metrics.observe_inference(self.model_spec, audio_seconds, processing_time)
+            transcription = result["text"].strip()
+            self.detected_language = result.get("language") or options['language']
+            self.timed_out = result.get('timed_out', False)
+
+            print(f"Done in {processing_time:.2f} seconds")
+            print(f"Language: {self.detected_language or 'unknown'}")
+
+            if not transcription:
+                if self.timed_out:
+                    return False, "", processing_time, f"Ran out of time after {processing_time:.0f} seconds"
+                return False, "", processing_time, "No speech found"
+
+            if self.timed_out:
+                print(f"Ran out of time, keeping the {len(result['segments'])} segment(s) done so far")
+
+            if on_segment is not None:
+                for segment in self._segments(result, speech):
+                    on_segment(segment)
+
+            return True, transcription, processing_time, ""
+
+        except Exception as e:
+            return False, "", 0.0, f"Transcription failed: {str(e)}"
+
+    def _transcribe_windows(self, samples, options, time_budget=None):
+        """
+        Transcribe with our own model one window (up to 30 seconds) at a time,
+        checking the time budget before each one
+
+        Returns:
+            Dictionary shaped like Whisper's result, with 'timed_out' set if it stopped early
+        """
+        deadline = time.time() + time_budget if time_budget else None
+        language = options['language']
+        texts = []
+        segments = []
+        timed_out = False
+        for start, end in split_at_silence(samples, chunk_seconds=WINDOW_SECONDS, overlap_seconds=0):
+            if deadline is not None and time.time() > deadline:
+                timed_out = True
+                break
+            # Later windows reuse the first one's language (and the text so far as context)
+            prompt = window_prompt(options, texts)
+            with self._inference_lock():
+                result = self.engine.transcribe(
+                    self.model, samples[start:end], {**options, 'language': language, 'initial_prompt': prompt}
+                )
+            language = language or result.get("language")
+            offset = start / AUDIO_SAMPLE_RATE
+            for segment in result.get("segments", []):
+                segments.append({**segment, 'start': segment["start"] + offset, 'end': segment["end"] + offset})
+            if result["text"].strip():
+                texts.append(result["text"].strip())
+
+        return {'text': " ".join(texts), 'segments': segments, 'language': language, 'timed_out': timed_out}
+
+    def transcribe_stream(self, windows, on_segment=None, expected_duration=None):
+        """
+        Transcribe audio that's still arriving, one 30 second window at a time
+
+        Args:
+            windows: Iterable of float32 sample arrays (each up to 30 seconds)
+            on_segment: Optional callback getting each segment dict
+                        ({'start', 'end', 'text'}) as soon as it's decoded
+            expected_duration: Length of the whole reel, for the time budget
+                               (without it the budget grows with the audio received)
+
+        Returns:
+            Same tuple as transcribe(): (success, transcription, processing_time, error)
+        """
+        self.timed_out = False
+        options = self.decoding_options()
+        language = options['language']
+        texts = []
+        offset = 0.0
+        start_time = time.time()
+        first_segment_time = None
+        # Only time spent in the model, not waiting for the download
+        inference_time = 0.0
+
+        try:
+            for window in windows:
+                # Only time in the model counts against the budget, not waiting for the download
+                budget = self.time_budget(expected_duration or offset)
+                if budget and inference_time > budget:
+                    self.timed_out = True
+                    if hasattr(windows, 'close'):
+                        windows.close()  # Stops the download too
+                    break
+
+                window_offset = offset
+                offset += len(window) / AUDIO_SAMPLE_RATE
+
+                speech = keep_speech(window) if self.use_vad else None
+                if speech is not None and not speech.has_speech:
+                    continue
+
+                # The model only gets loaded once there's actually something to say
+                if self.model is None:
+                    if not self.load_model():
+                        return False, "", 0.0, "Failed to load Whisper model"
+
+                # Later windows reuse the language from the first one (and the text so far as context)
+                prompt = window_prompt(options, texts)
+                window_start = time.time()
+                with self._inference_lock():
+                    result = self.engine.transcribe(
+                        self.model,
+                        speech.samples if speech is not None else window,
+                        {**options, 'language': language, 'initial_prompt': prompt}
+                    )
+                inference_time += time.time() - window_start
+                if language is None:
+                    language = result.get("language")
+                    print(f"Language: {language}")
+                self.detected_language = language
+
+                for segment in self._segments(result, speech, window_offset):
+                    texts.append(segment['text'])
+                    if first_segment_time is None:
+                        first_segment_time = time.time() - start_time
+                        print(f"First segment after {first_segment_time:.2f} seconds")
+                    if on_segment is not None:
+                        on_segment(segment)
+
+        except RuntimeError as e:
+            return False, "", 0.0, f"Runtime error: {str(e)}"
+        except Exception as e:
+            return False, "", 0.0, f"Error: {str(e)}"
+
+        processing_time = time.time() - start_time
+        metrics.observe_inference(self.model_spec, offset, inference_time)
+        transcription = " ".join(texts).strip()
+        print(f"Done in {processing_time:.2f} seconds ({offset:.1f} seconds of audio)")
+
+        if not transcription:
+            if self.timed_out:
+                return False, "", processing_time, f"Ran out of time after {inference_time:.0f} seconds"
+            return False, "", processing_time, "No speech found"
+
+        if self.timed_out:
+            print(f"Ran out of time after {offset:.1f} seconds of audio, keeping what we have")
+
+        return True, transcription, processing_time, ""
+
+    def _find_speech(self, audio):
+        # Returns SpeechOnlyAudio, or None if the audio couldn't be decoded for VAD
+        if isinstance(audio, (str, Path)):
+            success, samples, error = decode_audio(audio)
+            if not success:
+                print(f"Skipping VAD: {error}")
+                return None
+            audio = samples
+        return keep_speech(audio)
+
+    def _segments(self, result, speech=None, offset=0.0):
+        # Whisper segments as plain dicts on the original audio's timeline
+        for segment in result.get("segments", []):
+            text = segment["text"].strip()
+            if not text:
+                continue
+            segment = {'start': segment["start"], 'end': segment["end"], 'text': text}
+            if speech is not None:
+                segment = speech.restore_segment(segment)
+            segment['start'] += offset
+            segment['end'] += offset
+            yield segment
+
+    def _inference_lock(self):
+        # Shared models can only run one transcription at a time (unless the engine allows it)
+        if self.registry is not None and not self.engine.thread_safe:
+            return self.registry.inference_lock(self.model_spec)
+        return nullcontext()
+
 
 # Helper function
 def transcribe_audio(audio_path, model_name=WHISPER_MODEL):
@@ -0,0 +1,200 @@
+"""
+Transcript Cache Module
+Stores finished transcriptions on disk so the same reel isn't processed twice
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from config import TRANSCRIPT_CACHE_PATH, TRANSCRIPT_CACHE_TTL, TRANSCRIPT_CACHE_MAX_MB
+
+
+class TranscriptCache:
+    """SQLite-backed cache of transcriptions keyed by reel, model and decoding options"""
+
+    def __init__(self, db_path=TRANSCRIPT_CACHE_PATH, ttl=TRANSCRIPT_CACHE_TTL,
+                 max_bytes=TRANSCRIPT_CACHE_MAX_MB * 1024 * 1024):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS transcripts (
+                    cache_key TEXT PRIMARY KEY,
+                    reel_id TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    options TEXT NOT NULL,
+                    transcription TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON transcripts (last_access)")
+            # Detected languages, keyed by "reel:<id>" or "audio:<hash>"
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS languages (
+                    language_key TEXT PRIMARY KEY,
+                    language TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        # Commit on success, roll back on error, always close
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(reel_id, model_name, options=None):
+        """
+        Build the cache key for a transcription
+
+        Args:
+            reel_id: Instagram reel ID
+            model_name: Whisper model name
+            options: Decoding settings that change the output
+
+        Returns:
+            Hex digest identifying this (reel, model, options) combination
+        """
+        options_json = json.dumps(options or {}, sort_keys=True)
+        raw = f"{reel_id}|{model_name}|{options_json}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, reel_id, model_name, options=None):
+        """
+        Look up a cached transcription
+
+        Returns:
+            The transcription text, or None if it isn't cached (or has expired)
+        """
+        key = self.make_key(reel_id, model_name, options)
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT transcription, created_at FROM transcripts WHERE cache_key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            transcription, created_at = row
+            if self.ttl and now - created_at > self.ttl:
+                conn.execute("DELETE FROM transcripts WHERE cache_key = ?", (key,))
+                return None
+
+            conn.execute("UPDATE transcripts SET last_access = ? WHERE cache_key = ?", (now, key))
+            return transcription
+
+    def put(self, reel_id, model_name, transcription, options=None):
+        """
+        Save a transcription and evict old entries if we're over the size limit
+        """
+        key = self.make_key(reel_id, model_name, options)
+        options_json = json.dumps(options or {}, sort_keys=True)
+        size = len(transcription.encode('utf-8'))
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO transcripts "
+                "(cache_key, reel_id, model, options, transcription, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, reel_id, model_name, options_json, transcription, size, now, now)
+            )
+            self._evict(conn, now)
+
+    def get_language(self, reel_id=None, audio_hash=None):
+        """
+        Look up a language detected earlier for this reel or this exact audio
+
+        Returns:
+            Language code like "en", or None if we haven't seen it
+        """
+        keys = [f"reel:{reel_id}" if reel_id else None, f"audio:{audio_hash}" if audio_hash else None]
+        with self._lock, self._connect() as conn:
+            for key in keys:
+                if key is None:
+                    continue
+                row = conn.execute(
+                    "SELECT language, created_at FROM languages WHERE language_key = ?", (key,)
+                ).fetchone()
+                if row is not None and not (self.ttl and time.time() - row[1] > self.ttl):
+                    return row[0]
+        return None
+
+    def put_language(self, language, reel_id=None, audio_hash=None):
+        # Remember a detected language under the reel and the audio hash
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            for key in [f"reel:{reel_id}" if reel_id else None, f"audio:{audio_hash}" if audio_hash else None]:
+                if key is not None:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO languages (language_key, language, created_at) VALUES (?, ?, ?)",
+                        (key, language, now)
+                    )
+            if self.ttl:
+                conn.execute("DELETE FROM languages WHERE created_at < ?", (now - self.ttl,))
+
+    def _evict(self, conn, now):
+        # Drop expired entries first
+        if self.ttl:
+            conn.execute("DELETE FROM transcripts WHERE created_at < ?", (now - self.ttl,))
+
+        # Then least recently used ones until we fit
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM transcripts").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = conn.execute("SELECT cache_key, size FROM transcripts ORDER BY last_access ASC").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM transcripts WHERE cache_key = ?", (key,))
+            total -= size
+
+    def get_stats(self):
+        with self._lock, self._connect() as conn:
+            count, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM transcripts"
+            ).fetchone()
+            languages = conn.execute("SELECT COUNT(*) FROM languages").fetchone()[0]
+        return {
+            'entries': count,
+            'languages': languages,
+            'size_mb': round(total / 1024 / 1024, 3),
+            'max_size_mb': round(self.max_bytes / 1024 / 1024, 1),
+            'ttl_seconds': self.ttl,
+        }
+
+
+def audio_hash(audio):
+    """
+    Fingerprint of downloaded audio, so reposts of the same clip share a detected language
+
+    Args:
+        audio: Path to an audio file or a NumPy array of samples
+
+    Returns:
+        Hex digest, or None for audio we can't hash (like a stream still downloading)
+    """
+    if isinstance(audio, (str, Path)):
+        digest = hashlib.sha256()
+        with open(audio, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    if hasattr(audio, 'tobytes'):
+        return hashlib.sha256(audio.tobytes()).hexdigest()
+    return None
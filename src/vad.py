@@ -0,0 +1,149 @@
+"""
+Voice Activity Detection Module
+Finds the parts of the audio loud enough to be someone talking, so Whisper can skip silence
+
+Only loudness is measured. Music, steady noise or a tone at speech level all
+count as speech, so this trims silence and quiet stretches, not music.
+"""
+
+import numpy as np
+from config import (
+    AUDIO_SAMPLE_RATE, VAD_THRESHOLD_DB, VAD_MARGIN_DB,
+    VAD_MIN_SPEECH_MS, VAD_MIN_SILENCE_MS, VAD_PADDING_MS,
+)
+
+FRAME_MS = 30  # Energy is measured over 30 ms frames
+
+
+def frame_energy_db(samples, sample_rate=AUDIO_SAMPLE_RATE, frame_ms=FRAME_MS):
+    # Loudness (dBFS) of each frame; the last partial frame is dropped
+    frame_size = int(sample_rate * frame_ms / 1000)
+    frame_count = len(samples) // frame_size
+    if frame_count == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = samples[:frame_count * frame_size].reshape(frame_count, frame_size)
+    rms = np.sqrt(np.mean(frames.astype(np.float64) ** 2, axis=1))
+    return 20 * np.log10(rms + 1e-10)
+
+
+def detect_speech(samples, sample_rate=AUDIO_SAMPLE_RATE, threshold_db=VAD_THRESHOLD_DB,
+                  margin_db=VAD_MARGIN_DB, min_speech_ms=VAD_MIN_SPEECH_MS,
+                  min_silence_ms=VAD_MIN_SILENCE_MS, padding_ms=VAD_PADDING_MS):
+    """
+    Find regions that are loud enough to be speech
+
+    A frame counts as speech when it's above both the absolute threshold and the
+    background noise level (10th percentile) plus a margin. The threshold never
+    goes above 10 dB under the loudest frame, so quiet-but-clean recordings survive.
+    That also means audio at a steady level (music, noise) is kept from start to end.
+
+    Args:
+        samples: float32 mono samples
+        sample_rate: Sample rate of the audio
+        threshold_db: Frames quieter than this (dBFS) are always silence
+        margin_db: How far above the background a frame has to be
+        min_speech_ms: Shorter blips than this are ignored
+        min_silence_ms: Shorter gaps than this don't split speech
+        padding_ms: Extra audio kept around each region so words aren't clipped
+
+    Returns:
+        List of (start_sample, end_sample) tuples, sorted and non-overlapping
+    """
+    energy = frame_energy_db(samples, sample_rate)
+    if len(energy) == 0:
+        return []
+
+    noise_floor = np.percentile(energy, 10)
+    threshold = min(noise_floor + margin_db, energy.max() - 10)
+    is_speech = energy > max(threshold, threshold_db)
+
+    frame_size = int(sample_rate * FRAME_MS / 1000)
+    min_speech = max(1, min_speech_ms // FRAME_MS)
+    min_silence = max(1, min_silence_ms // FRAME_MS)
+    padding = int(sample_rate * padding_ms / 1000)
+
+    # Group speech frames into runs
+    regions = []
+    start = None
+    for i, speech in enumerate(is_speech):
+        if speech and start is None:
+            start = i
+        elif not speech and start is not None:
+            regions.append([start, i])
+            start = None
+    if start is not None:
+        regions.append([start, len(is_speech)])
+
+    # Join runs separated by short pauses, then drop blips
+    merged = []
+    for region in regions:
+        if merged and region[0] - merged[-1][1] < min_silence:
+            merged[-1][1] = region[1]
+        else:
+            merged.append(region)
+    merged = [r for r in merged if r[1] - r[0] >= min_speech]
+
+    # Frames -> samples, with padding, merging anything that now overlaps
+    result = []
+    for start_frame, end_frame in merged:
+        start = max(0, start_frame * frame_size - padding)
+        end = min(len(samples), end_frame * frame_size + padding)
+        if result and start <= result[-1][1]:
+            result[-1] = (result[-1][0], end)
+        else:
+            result.append((start, end))
+    return result
+
+
+class SpeechOnlyAudio:
+    """Speech regions cut out and joined together, remembering where each came from"""
+
+    def __init__(self, samples, regions, sample_rate=AUDIO_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.original_seconds = len(samples) / sample_rate
+        # (start in joined audio, start in original audio, length), all in seconds
+        self.pieces = []
+        position = 0
+        for start, end in regions:
+            self.pieces.append((position / sample_rate, start / sample_rate, (end - start) / sample_rate))
+            position += end - start
+        if regions:
+            self.samples = np.concatenate([samples[start:end] for start, end in regions])
+        else:
+            self.samples = np.zeros(0, dtype=np.float32)
+
+    @property
+    def has_speech(self):
+        return len(self.samples) > 0
+
+    @property
+    def speech_seconds(self):
+        return len(self.samples) / self.sample_rate
+
+    def original_time(self, seconds):
+        """Map a timestamp in the joined audio back to the original audio"""
+        for joined_start, original_start, length in reversed(self.pieces):
+            if seconds >= joined_start:
+                return original_start + min(seconds - joined_start, length)
+        return seconds
+
+    def restore_segment(self, segment):
+        # Copy of a segment dict with start/end moved back onto the original timeline
+        restored = dict(segment)
+        restored['start'] = self.original_time(segment['start'])
+        restored['end'] = self.original_time(segment['end'])
+        return restored
+
+
+def keep_speech(samples, sample_rate=AUDIO_SAMPLE_RATE):
+    """
+    Run VAD and cut the audio down to just the speech
+
+    Returns:
+        SpeechOnlyAudio (check .has_speech before transcribing)
+    """
+    regions = detect_speech(samples, sample_rate)
+    speech = SpeechOnlyAudio(samples, regions, sample_rate)
+    if speech.original_seconds > 0:
+        print(f"VAD: {speech.speech_seconds:.1f} of {speech.original_seconds:.1f} seconds are speech")
+    return speech
@@ -0,0 +1,124 @@
+"""
+Warmup Module
+Loads models when the API starts and runs one short transcription on each,
+so the first real request doesn't pay for downloads, loading and warmup
+"""
+
+import threading
+import time
+import numpy as np
+from src import engines
+from config import AUDIO_SAMPLE_RATE, WHISPER_MODEL, PRELOAD_MODELS, WARMUP_AUDIO_SECONDS
+
+
+def warmup_audio(seconds=WARMUP_AUDIO_SECONDS, sample_rate=AUDIO_SAMPLE_RATE):
+    """
+    A few seconds of voice-like sound: harmonics of a low pitch, pulsing like syllables
+
+    Whisper needs to actually run on it, so it shouldn't look like silence.
+    """
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pitch = 120 + 20 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voice = sum(np.sin(phase * harmonic) / harmonic for harmonic in range(1, 6))
+    syllables = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t)
+    return (0.1 * voice * syllables).astype(np.float32)
+
+
+def preload_specs(models=None):
+    # WHISPER_MODEL first, then PRELOAD_MODELS, without repeats ("base" and "whisper:base" are one)
+    specs = []
+    for name in [WHISPER_MODEL] + list(PRELOAD_MODELS if models is None else models):
+        spec = engines.normalize_model_spec(name)
+        if spec not in specs:
+            specs.append(spec)
+    return specs
+
+
+class Warmup:
+    """
+    Background model preloading and its progress, for the /ready endpoint
+
+    status is "pending" before start(), then "warming", then "ready" or "failed".
+    """
+
+    def __init__(self, registry, specs):
+        self.registry = registry
+        self.specs = specs
+        self.status = "pending"
+        self.models = {spec: {'status': "pending"} for spec in specs}
+        self.error = None
+        self.started_at = None
+        self.elapsed = None
+        self._thread = None
+
+    @property
+    def ready(self):
+        return self.status == "ready"
+
+    def start(self):
+        # Runs in a thread so the server answers /health (and says "not ready") meanwhile
+        self.status = "warming"
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="model-warmup", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        audio = warmup_audio()
+        for spec in self.specs:
+            success, error = self.warm_model(spec, audio)
+            if not success:
+                self.error = f"{spec}: {error}"
+                self.status = "failed"
+                print(f"Warmup failed, not ready: {self.error}")
+                return
+        self.elapsed = time.time() - self.started_at
+        self.status = "ready"
+        print(f"Warmup done in {self.elapsed:.2f} seconds, ready for requests")
+
+    def warm_model(self, spec, audio):
+        """
+        Load one model into the registry and transcribe the warmup audio with it
+
+        Returns:
+            Tuple of (success, error message)
+        """
+        # Imported here so importing the API stays quick (it pulls in the decoders)
+        from src.speech_recognizer import SpeechRecognizer
+
+        self.models[spec] = {'status': "loading"}
+        print(f"Warming up model: {spec}")
+        try:
+            start_time = time.time()
+            self.registry.get(spec)
+            load_time = time.time() - start_time
+        except Exception as e:
+            self.models[spec] = {'status': "failed", 'error': str(e)}
+            return False, f"Failed to load model: {e}"
+
+        self.models[spec] = {'status': "warming", 'load_seconds': round(load_time, 2)}
+        # Same settings as requests (parallel, batching), except VAD: the warmup audio must reach the model
+        start_time = time.time()
+        recognizer = SpeechRecognizer(spec, registry=self.registry, use_vad=False)
+        success, _, _, error = recognizer.transcribe(audio)
+        warmup_time = time.time() - start_time
+        if not success:
+            # The model loaded and ran, an odd result on fake audio doesn't make it unusable
+            print(f"Warmup transcription with {spec} didn't succeed ({error}), model is loaded anyway")
+
+        self.models[spec] = {
+            'status': "ready",
+            'load_seconds': round(load_time, 2),
+            'warmup_seconds': round(warmup_time, 2),
+        }
+        return True, None
+
+    def get_status(self):
+        return {
+            'status': self.status,
+            'models': self.models,
+            'error': self.error,
+            'seconds': round(self.elapsed if self.elapsed is not None
+                             else time.time() - self.started_at, 2) if self.started_at else 0,
+        }
@@ -0,0 +1,58 @@
+"""
+Audio decoder tests
+
+A shell script stands in for FFmpeg, so no media or FFmpeg install is needed.
+
+Usage:
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.audio_decoder import stream_audio
+
+
+@unittest.skipUnless(os.name == 'posix', "the fake FFmpeg is a shell script")
+class StreamAudioTest(unittest.TestCase):
+    def fake_ffmpeg(self, script):
+        # Puts an "ffmpeg" running script first on the PATH
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        ffmpeg = Path(folder.name) / "ffmpeg"
+        ffmpeg.write_text("#!/bin/sh\n" + script)
+        ffmpeg.chmod(0o755)
+        patcher = mock.patch.dict(os.environ, {'PATH': folder.name + os.pathsep + os.environ['PATH']})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_full_stream(self):
+        # 1.5 windows of one second each
+        self.fake_ffmpeg("head -c 48000 /dev/zero\n")
+        windows = list(stream_audio("reel.mp4", window_seconds=1))
+        self.assertEqual([len(window) for window in windows], [16000, 8000])
+
+    def test_failure_after_some_audio_raises(self):
+        # A download that dies partway is an error, not a shorter reel
+        self.fake_ffmpeg("head -c 48000 /dev/zero\necho 'Connection reset by peer' >&2\nexit 1\n")
+        windows = []
+        with self.assertRaisesRegex(RuntimeError, "Connection reset"):
+            for window in stream_audio("reel.mp4", window_seconds=1):
+                windows.append(window)
+        self.assertEqual(len(windows), 2)
+
+    def test_failure_without_audio_raises(self):
+        self.fake_ffmpeg("echo 'Invalid data found' >&2\nexit 1\n")
+        with self.assertRaisesRegex(RuntimeError, "could not decode"):
+            list(stream_audio("reel.mp4", window_seconds=1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Batch decoder tests
+
+Runs on a tiny randomly initialised Whisper model, so nothing is downloaded.
+The text is gibberish, these only check that decoding goes through.
+
+Usage:
+    python -m unittest discover tests
+"""
+
+import sys
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.batch_decoder import BatchDecoder, needs_fallback, is_silent
+from config import AUDIO_SAMPLE_RATE, DECODING_PRESETS
+
+
+def tiny_model():
+    # Whisper's shapes (80 mels, 30 second windows, full vocabulary) with one small layer each
+    import torch
+    from whisper.model import ModelDimensions, Whisper
+    dims = ModelDimensions(
+        n_mels=80, n_audio_ctx=1500, n_audio_state=64, n_audio_head=2, n_audio_layer=1,
+        n_vocab=51865, n_text_ctx=448, n_text_state=64, n_text_head=2, n_text_layer=1,
+    )
+    torch.manual_seed(0)
+    model = Whisper(dims).eval()
+    for parameter in model.parameters():
+        torch.nn.init.normal_(parameter, std=0.02)
+    return model
+
+
+class RecordingDecoder(BatchDecoder):
+    # Keeps the prompt of every window it decodes
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prompts = []
+
+    def _decode(self, options, windows):
+        self.prompts.extend(options.prompt for _ in windows)
+        super()._decode(options, windows)
+
+
+class BatchDecoderTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.model = tiny_model()
+        # 70 seconds of noise is three windows
+        rng = np.random.default_rng(0)
+        cls.audio = (rng.standard_normal(70 * AUDIO_SAMPLE_RATE) * 0.1).astype(np.float32)
+
+    def transcribe(self, preset):
+        # A long wait so every window of the reel lands in the same batch, unless
+        # they go in one at a time anyway (then it would only slow the test down)
+        conditioned = DECODING_PRESETS[preset]['condition_on_previous_text']
+        decoder = RecordingDecoder(preset, lambda: self.model, max_wait_ms=10 if conditioned else 1000)
+        # A few tokens per window are enough to check the decoding, the text is gibberish anyway
+        options = {**DECODING_PRESETS[preset], 'language': 'en', 'sample_len': 8}
+        return decoder, decoder.transcribe(self.audio, options)
+
+    def test_accurate_preset_multi_window(self):
+        # Beam search can't run on a batch of windows, so each one is decoded alone
+        decoder, result = self.transcribe('accurate')
+        stats = decoder.get_stats()
+        self.assertFalse(result['timed_out'])
+        self.assertEqual(stats['windows'], 3 + stats['retries'])
+        self.assertEqual(stats['largest_batch'], 1)
+
+    def test_fast_preset_batches_windows(self):
+        decoder, result = self.transcribe('fast')
+        stats = decoder.get_stats()
+        self.assertFalse(result['timed_out'])
+        self.assertEqual(stats['windows'], 3)
+        self.assertEqual(stats['retries'], 0)
+        self.assertEqual(stats['largest_batch'], 3)
+        self.assertEqual(decoder.prompts, [None] * 3)
+
+    def test_balanced_preset_falls_back(self):
+        # A random model's text is never likely enough, so every window goes through every temperature
+        decoder, result = self.transcribe('balanced')
+        stats = decoder.get_stats()
+        temperatures = len(DECODING_PRESETS['balanced']['temperature'])
+        self.assertEqual(stats['retries'], 3 * (temperatures - 1))
+        self.assertEqual(stats['windows'], 3 * temperatures)
+        # Each window after the first gets the text before it as its prompt
+        self.assertEqual(decoder.prompts[:temperatures], [None] * temperatures)
+        self.assertIsNotNone(decoder.prompts[-1])
+        self.assertTrue(result['text'].startswith(decoder.prompts[-1]))
+
+
+class FallbackRuleTest(unittest.TestCase):
+    def result(self, compression_ratio=1.5, avg_logprob=-0.3, no_speech_prob=0.1):
+        return SimpleNamespace(compression_ratio=compression_ratio, avg_logprob=avg_logprob,
+                               no_speech_prob=no_speech_prob)
+
+    def test_good_window_is_kept(self):
+        self.assertFalse(needs_fallback(self.result(), {}))
+        self.assertFalse(is_silent(self.result(), {}))
+
+    def test_repetitive_or_unlikely_text_is_retried(self):
+        self.assertTrue(needs_fallback(self.result(compression_ratio=3.0), {}))
+        self.assertTrue(needs_fallback(self.result(avg_logprob=-1.5), {}))
+
+    def test_silence_is_skipped_not_retried(self):
+        silence = self.result(avg_logprob=-1.5, no_speech_prob=0.9)
+        self.assertFalse(needs_fallback(silence, {}))
+        self.assertTrue(is_silent(silence, {}))
+
+    def test_thresholds_can_be_turned_off(self):
+        options = {'compression_ratio_threshold': None, 'logprob_threshold': None}
+        self.assertFalse(needs_fallback(self.result(compression_ratio=3.0, avg_logprob=-1.5), options))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,204 @@
+"""
+Job queue tests
+
+run_job is a stand-in that waits until the test lets it finish, so nothing is
+downloaded or transcribed.
+
+Usage:
+    python -m unittest discover tests
+"""
+
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.job_queue import JobManager, QueueFull, DEFAULT_RETRY_AFTER, MIN_RETRY_AFTER, MAX_RETRY_AFTER
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("Timed out waiting")
+        time.sleep(0.005)
+
+
+class Worker:
+    # run_job for the tests: keeps the order jobs ran in, and holds them until release()
+    def __init__(self):
+        self.ran = []
+        self.gate = threading.Event()
+
+    def __call__(self, job):
+        self.ran.append(job.url)
+        self.gate.wait(5)
+        return {'success': True, 'transcription': f"text of {job.url}"}
+
+    def release(self):
+        self.gate.set()
+
+
+class FailingWorker(Worker):
+    def __call__(self, job):
+        super().__call__(job)
+        raise RuntimeError("download broke")
+
+
+class JobQueueTest(unittest.TestCase):
+    def manager(self, worker=None, **kwargs):
+        self.worker = worker or Worker()
+        manager = JobManager(self.worker, **{'workers': 1, 'max_queued': 0, 'max_per_client': 0, **kwargs})
+        self.addCleanup(manager.shutdown)
+        self.addCleanup(self.worker.release)
+        return manager
+
+    def start_blocking_job(self, manager, url="first", **kwargs):
+        # Takes the only worker, so whatever comes next has to wait
+        job = manager.submit(url, "base", **kwargs)
+        wait_until(lambda: job.started_at is not None)
+        return job
+
+
+class AdmissionTest(JobQueueTest):
+    def test_full_queue_is_turned_away(self):
+        manager = self.manager(max_queued=2)
+        self.start_blocking_job(manager)
+        manager.submit("second", "base")
+        manager.submit("third", "base")
+
+        with self.assertRaises(QueueFull) as caught:
+            manager.submit("fourth", "base")
+        self.assertEqual(caught.exception.reason, 'queue_full')
+        # Nothing has finished yet, so there's no drain rate to go on
+        self.assertEqual(caught.exception.retry_after, DEFAULT_RETRY_AFTER)
+        self.assertEqual(manager.rejected['queue_full'], 1)
+        self.assertEqual(manager.queue_depth(), 2)
+        self.assertEqual(manager.in_flight(), 1)
+
+    def test_room_again_once_the_queue_drains(self):
+        manager = self.manager(max_queued=1)
+        first = self.start_blocking_job(manager)
+        second = manager.submit("second", "base")
+        self.assertRaises(QueueFull, manager.submit, "third", "base")
+
+        self.worker.release()
+        first.future.result(timeout=5)
+        second.future.result(timeout=5)
+        self.assertGreater(manager.drain_rate(), 0)
+        manager.submit("third", "base").future.result(timeout=5)
+
+    def test_retry_after_follows_the_drain_rate(self):
+        manager = self.manager(max_queued=1)
+        self.worker.release()
+        for url in ["a", "b", "c"]:
+            manager.submit(url, "base").future.result(timeout=5)
+        self.worker.gate.clear()
+        self.start_blocking_job(manager, "blocking")
+        manager.submit("waiting", "base")
+        with self.assertRaises(QueueFull) as caught:
+            manager.submit("turned away", "base")
+        self.assertGreaterEqual(caught.exception.retry_after, MIN_RETRY_AFTER)
+        self.assertLessEqual(caught.exception.retry_after, MAX_RETRY_AFTER)
+
+    def test_per_client_limit(self):
+        manager = self.manager(max_per_client=2)
+        self.start_blocking_job(manager, client="1.2.3.4")
+        manager.submit("second", "base", client="1.2.3.4")
+
+        with self.assertRaises(QueueFull) as caught:
+            manager.submit("third", "base", client="1.2.3.4")
+        self.assertEqual(caught.exception.reason, 'client_limit')
+        self.assertEqual(manager.rejected['client_limit'], 1)
+        # Other clients, and callers without one, aren't held back
+        manager.submit("other", "base", client="5.6.7.8")
+        manager.submit("anonymous", "base")
+
+
+class CoalescingTest(JobQueueTest):
+    def test_duplicates_share_one_run(self):
+        manager = self.manager(coalesce_key=lambda job: job.url)
+        leader = self.start_blocking_job(manager, "reel")
+        followers = [manager.submit("reel", "base") for _ in range(4)]
+        self.assertEqual(manager.queue_depth(), 0)
+        self.assertEqual(manager.in_flight(), 1)
+
+        self.worker.release()
+        results = [job.future.result(timeout=5) for job in [leader] + followers]
+        self.assertEqual(self.worker.ran, ["reel"])
+        self.assertEqual(manager.coalesced, 4)
+        self.assertEqual({result['transcription'] for result in results}, {"text of reel"})
+        # Each follower gets its own copy of the result to change
+        self.assertIsNot(followers[0].result, leader.result)
+        wait_until(lambda: all(job.state == 'done' for job in followers))
+
+    def test_failure_reaches_followers(self):
+        manager = self.manager(FailingWorker(), coalesce_key=lambda job: job.url)
+        leader = self.start_blocking_job(manager, "reel")
+        follower = manager.submit("reel", "base")
+        self.worker.release()
+        self.assertRaises(RuntimeError, leader.future.result, 5)
+        self.assertRaises(RuntimeError, follower.future.result, 5)
+        wait_until(lambda: follower.state == 'failed')
+
+    def test_runs_again_after_the_first_one_finished(self):
+        manager = self.manager(coalesce_key=lambda job: job.url)
+        self.worker.release()
+        manager.submit("reel", "base").future.result(timeout=5)
+        manager.submit("reel", "base").future.result(timeout=5)
+        self.assertEqual(self.worker.ran, ["reel", "reel"])
+
+    def test_jobs_without_a_key_run_on_their_own(self):
+        manager = self.manager(coalesce_key=lambda job: None if job.streaming else job.url)
+        self.start_blocking_job(manager, "reel", streaming=True)
+        manager.submit("reel", "base", streaming=True)
+        self.assertEqual(manager.coalesced, 0)
+        self.assertEqual(manager.queue_depth(), 1)
+
+
+class SchedulingTest(JobQueueTest):
+    costs = {'long': 100.0, 'short': 10.0, 'medium': 50.0}
+
+    def run_in_order(self, manager, urls):
+        self.start_blocking_job(manager)
+        jobs = []
+        for url in urls:
+            jobs.append(manager.submit(url, "base"))
+            time.sleep(0.01)
+        # Estimates run on their own threads, the jobs are ready once they're all in
+        wait_until(lambda: manager.queue_depth() == len(urls) and len(manager._ready) == len(urls))
+        self.worker.release()
+        for job in jobs:
+            job.future.result(timeout=5)
+        return self.worker.ran[1:]
+
+    def test_cheapest_job_first(self):
+        manager = self.manager(estimate_cost=lambda job: self.costs[job.url], aging_rate=0)
+        order = self.run_in_order(manager, ["long", "short", "medium"])
+        self.assertEqual(order, ["short", "medium", "long"])
+
+    def test_waiting_makes_up_for_cost(self):
+        # Every second waited is worth far more than the difference in cost here
+        manager = self.manager(estimate_cost=lambda job: self.costs[job.url], aging_rate=1e6)
+        order = self.run_in_order(manager, ["long", "short", "medium"])
+        self.assertEqual(order, ["long", "short", "medium"])
+
+    def test_fifo_without_estimates(self):
+        manager = self.manager()
+        order = self.run_in_order(manager, ["long", "short", "medium"])
+        self.assertEqual(order, ["long", "short", "medium"])
+
+    def test_failed_estimate_still_runs(self):
+        def estimate(job):
+            raise ValueError("no metadata")
+        manager = self.manager(estimate_cost=estimate)
+        order = self.run_in_order(manager, ["long"])
+        self.assertEqual(order, ["long"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+InstaTranscriber tests
+
+The engine is faked and the reels are handed over as samples, so nothing is downloaded.
+
+Usage:
+    python -m unittest discover tests
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.main import InstaTranscriber
+from src.transcript_cache import TranscriptCache
+from config import AUDIO_SAMPLE_RATE
+
+
+class LanguageEngine:
+    # Says every reel is English unless it's told otherwise, and keeps the language it was given
+    name = 'whisper'
+    thread_safe = False
+
+    def __init__(self):
+        self.languages = []
+
+    def transcribe(self, model, audio, options):
+        self.languages.append(options['language'])
+        language = options['language'] or 'en'
+        return {'text': "hello there", 'language': language,
+                'segments': [{'start': 0.0, 'end': 1.0, 'text': "hello there"}]}
+
+
+class LanguageMemoryTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.cache = TranscriptCache(Path(self.folder.name) / "transcripts.db")
+        self.transcriber = InstaTranscriber('base', cache=self.cache)
+        self.transcriber.recognizer.engine = LanguageEngine()
+        self.transcriber.recognizer.model = object()
+        self.transcriber.recognizer.use_vad = False
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def recognize(self, reel_id, seed):
+        # A few seconds of different noise per reel, so the audio hashes differ too
+        samples = (np.random.default_rng(seed).standard_normal(5 * AUDIO_SAMPLE_RATE) * 0.1).astype(np.float32)
+        result = self.transcriber.new_result()
+        result['reel_id'] = reel_id
+        return self.transcriber.recognize(samples, result, 0.0)
+
+    def test_known_language_does_not_carry_over(self):
+        self.cache.put_language('es', 'REELA')
+        first = self.recognize('REELA', 1)
+        second = self.recognize('REELB', 2)
+
+        self.assertEqual(self.transcriber.recognizer.engine.languages, ['es', None])
+        self.assertEqual(first['language'], 'es')
+        self.assertEqual(second['language'], 'en')
+        self.assertEqual(self.cache.get_language('REELB'), 'en')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+Media extractor tests
+
+Format selection only looks at probed metadata, so these use hand-written format lists.
+
+Usage:
+    python -m unittest discover tests
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.media_extractor import MediaExtractor
+
+
+def audio_only(format_id, abr, asr=44100, filesize=None):
+    return {'format_id': format_id, 'vcodec': 'none', 'acodec': 'mp4a', 'abr': abr, 'asr': asr,
+            'filesize': filesize}
+
+
+def muxed(format_id, tbr, abr=64, asr=44100):
+    return {'format_id': format_id, 'vcodec': 'avc1', 'acodec': 'mp4a', 'tbr': tbr, 'abr': abr, 'asr': asr}
+
+
+def video_only(format_id, tbr):
+    return {'format_id': format_id, 'vcodec': 'avc1', 'acodec': 'none', 'tbr': tbr}
+
+
+class ChooseFormatTest(unittest.TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.extractor = MediaExtractor(temp_dir=Path(folder.name))
+
+    def choose(self, formats, duration=60):
+        chosen = self.extractor.choose_format({'duration': duration, 'formats': formats},
+                                              min_sample_rate=16000, min_bitrate=32)
+        return chosen['format_id'] if chosen else None
+
+    def test_smallest_audio_only_stream(self):
+        formats = [audio_only('high', 128), audio_only('low', 48), audio_only('mid', 96), muxed('video', 500)]
+        self.assertEqual(self.choose(formats), 'low')
+
+    def test_size_beats_bitrate_when_known(self):
+        formats = [audio_only('big', 48, filesize=2_000_000), audio_only('small', 96, filesize=500_000)]
+        self.assertEqual(self.choose(formats), 'small')
+
+    def test_streams_below_the_floor_are_skipped(self):
+        formats = [audio_only('too quiet', 16), audio_only('narrowband', 48, asr=8000), audio_only('ok', 64)]
+        self.assertEqual(self.choose(formats), 'ok')
+
+    def test_smallest_muxed_file_without_audio_only_streams(self):
+        formats = [video_only('no audio', 100), muxed('720p', 2000), muxed('360p', 600), muxed('1080p', 4000)]
+        self.assertEqual(self.choose(formats), '360p')
+
+    def test_best_stream_below_the_floor_as_a_last_resort(self):
+        formats = [audio_only('worse', 16, asr=8000), audio_only('better', 24, asr=8000)]
+        self.assertEqual(self.choose(formats), 'better')
+
+    def test_unknown_quality_counts_as_good_enough(self):
+        formats = [audio_only('unknown', None, asr=None, filesize=300_000), muxed('video', 500)]
+        self.assertEqual(self.choose(formats), 'unknown')
+
+    def test_no_format_list(self):
+        self.assertIsNone(self.choose([]))
+        self.assertIsNone(self.choose([video_only('no audio', 100)]))
+
+
+if __name__ == "__main__":
+    unittest.main()
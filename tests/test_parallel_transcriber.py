@@ -0,0 +1,83 @@
+"""
+Parallel transcriber tests
+
+Only the chunking and merging, which don't need a model or worker processes.
+
+Usage:
+    python -m unittest discover tests
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.parallel_transcriber import split_at_silence, merge_texts, SEARCH_SECONDS
+from config import AUDIO_SAMPLE_RATE
+
+
+def noise(seconds, silences=()):
+    # Steady noise with (start, end) seconds of silence cut into it
+    samples = (np.random.default_rng(0).standard_normal(int(seconds * AUDIO_SAMPLE_RATE)) * 0.1).astype(np.float32)
+    for start, end in silences:
+        samples[int(start * AUDIO_SAMPLE_RATE):int(end * AUDIO_SAMPLE_RATE)] = 0.0
+    return samples
+
+
+class SplitAtSilenceTest(unittest.TestCase):
+    def test_short_audio_is_one_chunk(self):
+        samples = noise(50)
+        self.assertEqual(split_at_silence(samples, chunk_seconds=60), [(0, len(samples))])
+
+    def test_cuts_go_in_the_quiet_spots(self):
+        samples = noise(150, silences=[(57.0, 58.0), (121.0, 122.0)])
+        chunks = split_at_silence(samples, chunk_seconds=60, overlap_seconds=2)
+        starts = [start / AUDIO_SAMPLE_RATE for start, _ in chunks]
+        self.assertEqual(len(chunks), 3)
+        self.assertTrue(57.0 <= starts[1] <= 58.0)
+        self.assertTrue(121.0 <= starts[2] <= 122.0)
+
+    def test_chunks_cover_the_audio_with_overlap(self):
+        samples = noise(200)
+        overlap = 2 * AUDIO_SAMPLE_RATE
+        chunks = split_at_silence(samples, chunk_seconds=60, overlap_seconds=2)
+        self.assertEqual(chunks[0][0], 0)
+        self.assertEqual(chunks[-1][1], len(samples))
+        for (start, end), (next_start, _) in zip(chunks, chunks[1:]):
+            self.assertEqual(end, next_start + overlap)
+        # A cut moves at most SEARCH_SECONDS away from where it would ideally go
+        for start, end in chunks:
+            self.assertLessEqual(end - start, (60 + SEARCH_SECONDS) * AUDIO_SAMPLE_RATE + overlap)
+
+    def test_windows_fit_in_whisper_without_overlap(self):
+        # The batch decoder cuts 25 second windows this way and needs them under 30 seconds
+        for start, end in split_at_silence(noise(200), chunk_seconds=25, overlap_seconds=0):
+            self.assertLess(end - start, 30 * AUDIO_SAMPLE_RATE)
+
+
+class MergeTextsTest(unittest.TestCase):
+    def test_overlap_is_removed(self):
+        texts = ["so we went down to the", "down to the beach and then", "and then it rained"]
+        self.assertEqual(merge_texts(texts), "so we went down to the beach and then it rained")
+
+    def test_case_and_punctuation_are_ignored_when_matching(self):
+        self.assertEqual(merge_texts(["I said hello there.", "Hello there, friend"]), "I said hello there. friend")
+
+    def test_no_overlap_keeps_everything(self):
+        self.assertEqual(merge_texts(["first part", "second part"]), "first part second part")
+
+    def test_overlap_only_looked_for_near_the_join(self):
+        texts = ["a b c d e", "a b c"]
+        self.assertEqual(merge_texts(texts, max_overlap_words=2), "a b c d e a b c")
+
+    def test_empty_chunks(self):
+        self.assertEqual(merge_texts([]), "")
+        self.assertEqual(merge_texts(["", "hello", ""]), "hello")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+Speech recognizer tests
+
+Uses a fake engine that records what it was asked, so no model is needed.
+
+Usage:
+    python -m unittest discover tests
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.speech_recognizer import SpeechRecognizer
+from config import AUDIO_SAMPLE_RATE
+
+
+class RecordingEngine:
+    # Answers every window with the same text and keeps the options it got
+    name = 'whisper'
+    thread_safe = False
+
+    def __init__(self):
+        self.calls = []
+
+    def transcribe(self, model, audio, options):
+        self.calls.append(options)
+        return {'text': "hello there", 'language': 'en',
+                'segments': [{'start': 0.0, 'end': 1.0, 'text': "hello there"}]}
+
+
+class WindowedDecodingTest(unittest.TestCase):
+    def transcribe_windows(self, preset):
+        recognizer = SpeechRecognizer('base', use_vad=False, parallel=False, batched=False, preset=preset)
+        recognizer.engine = RecordingEngine()
+        recognizer.model = object()
+        # 70 seconds is at least three windows
+        samples = np.zeros(70 * AUDIO_SAMPLE_RATE, dtype=np.float32)
+        result = recognizer._transcribe_windows(samples, recognizer.decoding_options())
+        return recognizer.engine.calls, result
+
+    def test_fast_preset_decodes_windows_on_their_own(self):
+        calls, result = self.transcribe_windows('fast')
+        self.assertGreaterEqual(len(calls), 3)
+        self.assertEqual({options['initial_prompt'] for options in calls}, {None})
+
+    def test_balanced_preset_carries_text_over(self):
+        calls, result = self.transcribe_windows('balanced')
+        self.assertIsNone(calls[0]['initial_prompt'])
+        self.assertEqual(calls[1]['initial_prompt'], "hello there")
+        self.assertEqual(result['text'], " ".join(["hello there"] * len(calls)))
+
+    def test_time_limit_changes_cache_key(self):
+        recognizer = SpeechRecognizer('base', use_vad=False)
+        recognizer.time_multiplier = 0
+        unlimited = recognizer.cache_options()
+        recognizer.time_multiplier = 3
+        self.assertNotEqual(unlimited, recognizer.cache_options())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+Transcript cache tests
+
+Each test gets its own SQLite file, and the clock is moved by hand.
+
+Usage:
+    python -m unittest discover tests
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.transcript_cache import TranscriptCache
+
+
+class TranscriptCacheTest(unittest.TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.path = Path(folder.name) / "transcripts.db"
+        self.now = 1000.0
+        clock = mock.patch('src.transcript_cache.time.time', lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def cache(self, ttl=3600, max_bytes=1024 * 1024):
+        return TranscriptCache(self.path, ttl=ttl, max_bytes=max_bytes)
+
+    def test_round_trip(self):
+        cache = self.cache()
+        cache.put("REEL", "base", "hello there", {'language': None})
+        self.assertEqual(cache.get("REEL", "base", {'language': None}), "hello there")
+        # The model and the options are part of the key
+        self.assertIsNone(cache.get("REEL", "small", {'language': None}))
+        self.assertIsNone(cache.get("REEL", "base", {'language': 'en'}))
+
+    def test_survives_a_restart(self):
+        self.cache().put("REEL", "base", "hello there")
+        self.assertEqual(self.cache().get("REEL", "base"), "hello there")
+
+    def test_entries_expire(self):
+        cache = self.cache(ttl=60)
+        cache.put("REEL", "base", "hello there")
+        self.now += 59
+        self.assertEqual(cache.get("REEL", "base"), "hello there")
+        self.now += 2
+        self.assertIsNone(cache.get("REEL", "base"))
+        self.assertEqual(cache.get_stats()['entries'], 0)
+
+    def test_no_ttl_keeps_entries(self):
+        cache = self.cache(ttl=0)
+        cache.put("REEL", "base", "hello there")
+        self.now += 10 ** 9
+        self.assertEqual(cache.get("REEL", "base"), "hello there")
+
+    def test_least_recently_used_evicted_first(self):
+        # Room for two 4 byte transcriptions
+        cache = self.cache(max_bytes=10)
+        cache.put("A", "base", "aaaa")
+        self.now += 1
+        cache.put("B", "base", "bbbb")
+        self.now += 1
+        cache.get("A", "base")  # A is now the more recently used
+        self.now += 1
+        cache.put("C", "base", "cccc")
+
+        self.assertEqual(cache.get("A", "base"), "aaaa")
+        self.assertIsNone(cache.get("B", "base"))
+        self.assertEqual(cache.get("C", "base"), "cccc")
+
+    def test_languages_expire(self):
+        cache = self.cache(ttl=60)
+        cache.put_language("es", "REEL", "abc123")
+        self.assertEqual(cache.get_language("REEL"), "es")
+        self.assertEqual(cache.get_language(audio_hash="abc123"), "es")
+        self.now += 61
+        self.assertIsNone(cache.get_language("REEL", "abc123"))
+
+
+if __name__ == "__main__":
+    unittest.main()
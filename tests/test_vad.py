@@ -0,0 +1,82 @@
+"""
+Voice activity detection tests
+
+Run on synthetic audio: noise bursts stand in for speech.
+
+Usage:
+    python -m unittest discover tests
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.vad import SpeechOnlyAudio, keep_speech
+from config import AUDIO_SAMPLE_RATE
+
+RATE = AUDIO_SAMPLE_RATE
+
+
+def seconds(*pairs):
+    # (start, end) seconds -> sample regions
+    return [(int(start * RATE), int(end * RATE)) for start, end in pairs]
+
+
+class OriginalTimeTest(unittest.TestCase):
+    def setUp(self):
+        # 10 seconds of audio, speech at 2-4 and 7-8
+        self.speech = SpeechOnlyAudio(np.zeros(10 * RATE, dtype=np.float32), seconds((2, 4), (7, 8)))
+
+    def test_joined_audio_is_only_the_speech(self):
+        self.assertAlmostEqual(self.speech.speech_seconds, 3.0)
+        self.assertAlmostEqual(self.speech.original_seconds, 10.0)
+
+    def test_times_map_back_to_their_region(self):
+        self.assertAlmostEqual(self.speech.original_time(0.0), 2.0)
+        self.assertAlmostEqual(self.speech.original_time(1.5), 3.5)
+        # The second region starts 2 seconds into the joined audio
+        self.assertAlmostEqual(self.speech.original_time(2.0), 7.0)
+        self.assertAlmostEqual(self.speech.original_time(2.5), 7.5)
+
+    def test_times_past_the_end_stay_in_the_last_region(self):
+        self.assertAlmostEqual(self.speech.original_time(5.0), 8.0)
+
+    def test_restore_segment(self):
+        segment = {'start': 1.0, 'end': 2.5, 'text': "hi"}
+        self.assertEqual(self.speech.restore_segment(segment), {'start': 3.0, 'end': 7.5, 'text': "hi"})
+        # The original isn't changed
+        self.assertEqual(segment['start'], 1.0)
+
+    def test_no_speech(self):
+        speech = SpeechOnlyAudio(np.zeros(RATE, dtype=np.float32), [])
+        self.assertFalse(speech.has_speech)
+        self.assertEqual(speech.original_time(0.5), 0.5)
+
+
+class KeepSpeechTest(unittest.TestCase):
+    def test_silence_is_cut_out(self):
+        samples = np.zeros(10 * RATE, dtype=np.float32)
+        samples[3 * RATE:6 * RATE] = np.random.default_rng(0).standard_normal(3 * RATE) * 0.1
+        speech = keep_speech(samples)
+        self.assertTrue(speech.has_speech)
+        # The burst plus a little padding on each side
+        self.assertGreater(speech.speech_seconds, 3.0)
+        self.assertLess(speech.speech_seconds, 4.0)
+        self.assertAlmostEqual(speech.original_time(0.0), 3.0, delta=0.35)
+
+    def test_steady_music_is_kept(self):
+        # Loudness only: a tone at speech level all the way through counts as speech
+        samples = (0.1 * np.sin(2 * np.pi * 440 * np.arange(5 * RATE) / RATE)).astype(np.float32)
+        self.assertAlmostEqual(keep_speech(samples).speech_seconds, 5.0, delta=0.05)
+
+    def test_all_silence(self):
+        self.assertFalse(keep_speech(np.zeros(5 * RATE, dtype=np.float32)).has_speech)
+
+
+if __name__ == "__main__":
+    unittest.main()